@@ -0,0 +1,77 @@
+"""
+JSON renderers shared by the DRF and django-ninja stacks.
+
+Both renderers encode through `dumps()`, which uses orjson when it is
+installed (and `JSON_RENDERER_BACKEND` allows it) and the stdlib encoder
+otherwise. orjson handles the plain dict/list/str/number bulk of a payload;
+datetimes, Decimals and anything else it would format differently are handed
+back to the stack's own encoder class, so the wire format does not change
+when the backend does.
+"""
+import json
+
+from django.conf import settings
+from ninja.renderers import BaseRenderer
+from ninja.responses import NinjaJSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# orjson would format datetimes itself (full microseconds, "+00:00"); route
+# them through the encoder's default() instead so both backends agree.
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    if orjson else 0
+)
+
+_defaults = {}
+
+
+def get_backend():
+    backend = getattr(settings, 'JSON_RENDERER_BACKEND', 'orjson')
+    if backend == 'orjson' and orjson is not None:
+        return 'orjson'
+    return 'json'
+
+
+def dumps(data, encoder_class):
+    """Encode `data` to compact UTF-8 JSON bytes using `encoder_class` for non-native types."""
+    if get_backend() == 'orjson':
+        default = _defaults.get(encoder_class)
+        if default is None:
+            default = _defaults[encoder_class] = encoder_class().default
+        return orjson.dumps(data, default=default, option=ORJSON_OPTIONS)
+    return json.dumps(
+        data, cls=encoder_class, ensure_ascii=False, separators=(',', ':')
+    ).encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """DRF JSON renderer that encodes through `dumps()`."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            # Pretty printing (browsable API, `; indent=`) is not a hot path
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = dumps(data, self.encoder_class)
+        # Keep the output a strict javascript subset, as JSONRenderer does
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class NinjaFastJSONRenderer(BaseRenderer):
+    """django-ninja JSON renderer that encodes through `dumps()`."""
+    media_type = "application/json"
+    encoder_class = NinjaJSONEncoder
+
+    def render(self, request, data, *, response_status):
+        return dumps(data, self.encoder_class)
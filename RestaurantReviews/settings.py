@@ -44,6 +44,8 @@ INSTALLED_APPS = [
     'users',
     'restaurants',
     'menus',
+    'mediafiles',
+    'reviews',
     'corsheaders',
 ]
 
@@ -95,6 +97,19 @@ DATABASES = {
     }
 }
 
+# Per-process memory cache by default; set REDIS_URL to share the cache (and
+# its invalidations) between workers
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -140,10 +155,46 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Add REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'RestaurantReviews.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
+    # Reverse proxies in front of the app. IP rate limits only trust that many
+    # X-Forwarded-For entries; at 0 they key on REMOTE_ADDR, since a client can
+    # send any X-Forwarded-For it likes.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', '0')),
 }
 
+# JSON encoding backend for API responses: 'orjson' (falls back to the
+# stdlib encoder when orjson is not installed) or 'json'
+JSON_RENDERER_BACKEND = os.environ.get('JSON_RENDERER_BACKEND', 'orjson')
+
+# Build menus read responses straight from .values() rows and cache them
+# pre-encoded per restaurant instead of validating through the ninja schemas
+MENUS_TRUSTED_SERIALIZATION = os.environ.get('MENUS_TRUSTED_SERIALIZATION', 'False') == 'True'
+MENUS_CACHE_TIMEOUT = 300
+
+# Token buckets for the endpoints that hash passwords or accept uploads, as
+# "<tokens>/<period>" per scope (see RestaurantReviews/throttling.py). A scope
+# set to None is not limited.
+RATE_LIMITS = {
+    'login_ip': '20/min',
+    'login_account': '5/min',
+    'register_ip': '10/hour',
+    'refresh_ip': '60/min',
+    'upload_ip': '60/min',
+    'upload_account': '30/min',
+}
+
+# Users resolved by token authentication are cached for this long; writes to
+# a user invalidate the entry immediately (see users/cache.py). Invalidations
+# only reach other workers through a shared cache, so without REDIS_URL an
+# entry is kept briefly: that is how long other workers may serve a user
+# from before a change.
+AUTH_USER_CACHE_TIMEOUT = 300 if os.environ.get('REDIS_URL') else 5
+
 
 # During development only
 CORS_ALLOW_ALL_ORIGINS = True  # Only use this in development!
@@ -196,8 +247,47 @@ SIMPLE_JWT = {
 
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+
+    # Checks refresh tokens against users.revocation
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.RevocableTokenRefreshSerializer',
 }
 
+# Restaurants are ranked by their average rating shrunk towards
+# RATING_PRIOR_MEAN as if they had RATING_PRIOR_WEIGHT more reviews at that
+# rating, so a single 5-star review doesn't top a city; the best
+# TOP_RATED_SIZE of each city and cuisine are kept ranked (see
+# reviews/leaderboards.py). Run reconcile_ratings after changing these.
+RATING_PRIOR_MEAN = 3.5
+RATING_PRIOR_WEIGHT = 10
+TOP_RATED_SIZE = 100
+
+# Keywords each owner can be alerted on (see reviews/alerts.py)
+REVIEW_ALERT_MAX_KEYWORDS = 100
+
+# Platforms reviews are ingested from, per Review.source (see reviews/sources.py
+# and `python manage.py ingest_reviews`)
+REVIEW_SOURCES = {}
+
+# Mail backend for review digests (see reviews/digests.py); None uses EMAIL_BACKEND
+DIGEST_EMAIL_BACKEND = None
+
+# Reviews whose moderation score (the summed weights of the ModerationTerms
+# they contain) reaches this are flagged (see reviews/moderation.py)
+MODERATION_FLAG_THRESHOLD = 1.0
+
+# Flags must be forwarded or resolved this long after being raised; a claimed
+# flag returns to the moderation queue if its lease isn't renewed in time
+# (see reviews/flagqueue.py)
+MODERATION_FLAG_SLA = timedelta(hours=1)
+MODERATION_CLAIM_LEASE = timedelta(minutes=10)
+
+# How often each process checks the database for revocations made elsewhere
+REVOCATION_POLL_INTERVAL = 1
+
+# How often each process checks the database for changed alert keywords and
+# moderation terms before matching reviews against them
+MATCHER_POLL_INTERVAL = 1
+
 # Specify custom user model
 AUTH_USER_MODEL = 'users.User'
 
@@ -210,6 +300,30 @@ ADMIN_INDEX_TITLE = "Welcome to Restaurant Reviews Admin Portal"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are stored once per distinct content and shared by reference;
+# unreferenced files are removed by `python manage.py sweep_media`
+STORAGES = {
+    'default': {
+        'BACKEND': 'mediafiles.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Resized variants served from MEDIA_URL/resize/<w>x<h>/<path>, cached on disk
+# (under MEDIA_ROOT/.variants unless MEDIA_VARIANTS_ROOT is set) and evicted
+# least recently used first once the cache passes MEDIA_VARIANTS_MAX_BYTES
+MEDIA_VARIANTS_MAX_BYTES = 512 * 1024 * 1024
+MEDIA_RESIZE_MAX_DIMENSION = 2048
+
+# Media is served by mediafiles.views.serve_media. Behind nginx set
+# MEDIA_ACCEL_REDIRECT_PREFIX to an `internal` location aliased to MEDIA_ROOT;
+# behind Apache/lighttpd with mod_xsendfile set MEDIA_X_SENDFILE = True
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX') or None
+MEDIA_X_SENDFILE = os.environ.get('MEDIA_X_SENDFILE', 'False') == 'True'
+MEDIA_CACHE_MAX_AGE = 60 * 60
+
 # Add to your existing settings
 STATICFILES_DIRS = [
     BASE_DIR / "static",
@@ -0,0 +1,108 @@
+"""
+Soft delete for models that are expensive to delete inside a request.
+
+A soft-deletable model declares `is_deleted`/`deleted_at`, uses
+`SoftDeleteManager` as its default `objects` manager (so every read path
+skips deleted rows) and keeps a plain `all_objects` manager for the purge.
+
+`purge_deleted()` removes soft-deleted rows later, in bounded chunks. Rather
+than Django's Collector, which loads every cascaded row into memory and fires
+per-row signals, each chunk is deleted with one DELETE per related table,
+deepest tables first (`DELETE FROM price WHERE menu_item_id IN (SELECT ...)`).
+The storage names of files referenced by the deleted rows are returned so
+the caller can release them (see `mediafiles`).
+"""
+from django.db import models, router, transaction
+from django.utils import timezone
+
+# Guards against relation cycles; real cascades here are 3-4 levels deep
+MAX_CASCADE_DEPTH = 8
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+    def soft_delete(self):
+        """Flag every row in the queryset as deleted in one UPDATE"""
+        return self.update(is_deleted=True, deleted_at=timezone.now())
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """Default manager that hides soft-deleted rows"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+def _file_fields(model):
+    return [field.attname for field in model._meta.concrete_fields if isinstance(field, models.FileField)]
+
+
+def _collect_files(queryset, files):
+    fields = _file_fields(queryset.model)
+    if fields:
+        for row in queryset.values_list(*fields):
+            files.extend(name for name in row if name)
+
+
+def _delete_related(model, lookup, ids, using, files, depth=0):
+    """Delete rows that depend on `model` rows matching `{lookup}__in=ids`, children first"""
+    if depth > MAX_CASCADE_DEPTH:
+        raise RuntimeError(f"Cascade from {model.__name__} is deeper than {MAX_CASCADE_DEPTH} levels")
+
+    # Auto-created m2m through rows
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        if through._meta.auto_created:
+            path = f"{field.m2m_field_name()}__{lookup}" if lookup else field.m2m_field_name()
+            through._base_manager.using(using).filter(**{f"{path}__in": ids})._raw_delete(using)
+
+    for relation in model._meta.related_objects:
+        related_model = relation.related_model
+        if relation.many_to_many:
+            if relation.through._meta.auto_created:
+                through = relation.through
+                path = relation.field.m2m_reverse_field_name()
+                path = f"{path}__{lookup}" if lookup else path
+                through._base_manager.using(using).filter(**{f"{path}__in": ids})._raw_delete(using)
+            continue
+
+        path = f"{relation.field.name}__{lookup}" if lookup else relation.field.name
+        queryset = related_model._base_manager.using(using).filter(**{f"{path}__in": ids})
+        if relation.on_delete is models.CASCADE:
+            _delete_related(related_model, path, ids, using, files, depth + 1)
+            _collect_files(queryset, files)
+            queryset._raw_delete(using)
+        elif relation.on_delete is models.SET_NULL:
+            queryset.update(**{relation.field.name: None})
+        # PROTECT/RESTRICT/DO_NOTHING are left for the database to enforce
+
+
+def purge_chunk(model, ids):
+    """Hard-delete the given rows and everything that cascades from them
+
+    Returns the storage names of files the deleted rows referenced.
+    """
+    using = router.db_for_write(model)
+    files = []
+    with transaction.atomic(using=using):
+        _delete_related(model, '', ids, using, files)
+        queryset = model._base_manager.using(using).filter(pk__in=ids)
+        _collect_files(queryset, files)
+        queryset._raw_delete(using)
+    return files
+
+
+def purge_deleted(model, chunk_size=500, older_than=None):
+    """Purge soft-deleted rows of `model` chunk by chunk
+
+    Yields (ids, files) per committed chunk. Only rows deleted before
+    `older_than` (a datetime) are purged when it is given.
+    """
+    queryset = model.all_objects.filter(is_deleted=True)
+    if older_than is not None:
+        queryset = queryset.filter(deleted_at__lt=older_than)
+    while True:
+        ids = list(queryset.order_by('deleted_at', 'pk').values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids, purge_chunk(model, ids)
+
@@ -0,0 +1,184 @@
+"""
+Token-bucket rate limits for the auth and upload endpoints, kept in the
+default cache so every worker shares them.
+
+Rates are set per scope in `RATE_LIMITS` as "<tokens>/<period>": the bucket
+holds that many tokens and refills at that rate. Each bucket is a single
+integer, the time (in ms) at which it will be full again (the "generic cell
+rate algorithm" form of a token bucket). Taking a token is one atomic incr
+of a token's worth of time, and the request is allowed while that time is at
+most a full bucket ahead of now, so concurrent workers can never both take
+the last token.
+
+The throttles are DRF throttle classes; `NinjaThrottle` runs them on
+django-ninja operations. Both frameworks answer 429 with `Retry-After`, and
+in both a request refused by one bucket takes no token from the others.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from ninja.throttling import BaseThrottle as NinjaBaseThrottle
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {
+    's': 1, 'sec': 1, 'second': 1,
+    'm': 60, 'min': 60, 'minute': 60,
+    'h': 3600, 'hour': 3600,
+    'd': 86400, 'day': 86400,
+}
+
+
+def parse_rate(rate):
+    """'10/min' -> (10 tokens, 6000 ms per token)"""
+    tokens, period = rate.split('/')
+    tokens = int(tokens)
+    return tokens, PERIODS[period] * 1000 // tokens
+
+
+def take_token(key, rate):
+    """Take a token from the bucket at `key`; returns 0 if allowed, else seconds to wait"""
+    burst, interval = parse_rate(rate)
+    capacity = burst * interval
+    timeout = math.ceil(capacity / 1000) + 1
+    now = int(time.time() * 1000)
+    try:
+        full_at = cache.incr(key, interval)
+    except ValueError:
+        full_at = None
+
+    if full_at is None or full_at - interval < now:
+        # New, expired or already full bucket: start from now. Two requests
+        # racing here may both get through, but only on a full bucket.
+        full_at = now + interval
+        cache.set(key, full_at, timeout)
+        return 0
+    if full_at - now <= capacity:
+        cache.touch(key, timeout)
+        return 0
+
+    # Over the limit: give the token back and report when one frees up
+    cache.decr(key, interval)
+    return (full_at - capacity - now) / 1000
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Base class: subclasses set `scope` and return the bucket's identity from `get_ident_key`"""
+    scope = None
+
+    def get_ident_key(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view=None):
+        self.wait_seconds = None
+        if getattr(request, '_rate_limited', False):
+            # DRF checks every throttle even after one refused the request;
+            # later buckets keep their tokens (a None wait is ignored)
+            return False
+        rate = getattr(settings, 'RATE_LIMITS', {}).get(self.scope)
+        ident = self.get_ident_key(request)
+        if rate is None or ident is None:
+            return True
+        self.wait_seconds = take_token(f'ratelimit:{self.scope}:{ident}', rate)
+        if self.wait_seconds:
+            request._rate_limited = True
+        return self.wait_seconds == 0
+
+    def wait(self):
+        # Retry-After is sent in whole seconds
+        return math.ceil(self.wait_seconds) if self.wait_seconds else None
+
+
+class IPThrottle(TokenBucketThrottle):
+    """Keyed by the client address; X-Forwarded-For is only used behind REST_FRAMEWORK['NUM_PROXIES'] proxies"""
+
+    def get_ident_key(self, request):
+        return self.get_ident(request)
+
+
+class AccountThrottle(TokenBucketThrottle):
+    """Keyed by the signed-in user, so one account can't spread requests over many IPs"""
+
+    def get_ident_key(self, request):
+        user = getattr(request, 'user', None)
+        return user.pk if user is not None and user.is_authenticated else None
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = 'login_ip'
+
+
+class LoginAccountThrottle(TokenBucketThrottle):
+    """Keyed by the account being logged into, to slow down guessing one password from many IPs"""
+    scope = 'login_account'
+
+    def get_ident_key(self, request):
+        identifier = request.data.get('email_or_username')
+        if not isinstance(identifier, str) or not identifier.strip():
+            return None
+        return hashlib.sha1(identifier.strip().lower().encode()).hexdigest()
+
+
+class RegisterIPThrottle(IPThrottle):
+    scope = 'register_ip'
+
+
+class RefreshIPThrottle(IPThrottle):
+    scope = 'refresh_ip'
+
+
+class UploadIPThrottle(IPThrottle):
+    scope = 'upload_ip'
+
+
+class UploadAccountThrottle(AccountThrottle):
+    scope = 'upload_account'
+
+
+UPLOAD_THROTTLES = [UploadAccountThrottle, UploadIPThrottle]
+
+
+def authenticate(request):
+    """Set request.user from a bearer token, as DRF does before its throttles run"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authentication_class().authenticate(request)
+        except APIException:
+            # Invalid or revoked token: throttle the request as anonymous
+            return
+        if result is not None:
+            request.user = result[0]
+            return
+
+
+class NinjaThrottle(NinjaBaseThrottle):
+    """Apply DRF throttle classes to a django-ninja operation: `throttle=NinjaThrottle(...)`"""
+
+    def __init__(self, *throttle_classes):
+        self.throttle_classes = throttle_classes
+        # One instance serves every request, so keep the wait per thread
+        self._local = threading.local()
+
+    def allow_request(self, request):
+        # Operations without `auth=` only have the session user, which API
+        # clients never have; resolve their token so account buckets apply
+        authenticate(request)
+        # Stop at the first denial, so a refused request takes no tokens from later buckets
+        self._local.wait = None
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not throttle.allow_request(request):
+                self._local.wait = throttle.wait()
+                return False
+        return True
+
+    def wait(self):
+        return getattr(self._local, 'wait', None)
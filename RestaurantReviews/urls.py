@@ -17,26 +17,42 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenRefreshView
-from users.views import RegisterView, CustomTokenObtainPairView, UserProfileView
+from users.views import RegisterView, CustomTokenObtainPairView, LogoutView, UserProfileView
 from ninja import NinjaAPI
+from ninja.errors import Throttled
 from menus.api import router as menus_router
+from menus.async_api import router as async_menus_router
+from RestaurantReviews.renderers import NinjaFastJSONRenderer
+from RestaurantReviews.throttling import RefreshIPThrottle
 
 # Customize admin site
 admin.site.site_header = 'Restaurant Reviews Administration'
 admin.site.site_title = 'Restaurant Reviews Admin Portal'
 admin.site.index_title = 'Welcome to Restaurant Reviews Admin Portal'
 
-api = NinjaAPI()
+api = NinjaAPI(renderer=NinjaFastJSONRenderer())
 api.add_router("/menus/", menus_router)
+api.add_router("/async/menus/", async_menus_router)
+
+
+@api.exception_handler(Throttled)
+def throttled(request, exc):
+    response = api.create_response(request, {"detail": str(exc)}, status=429)
+    if exc.wait:
+        response['Retry-After'] = str(exc.wait)
+    return response
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/register/', RegisterView.as_view(), name='register'),
     path('api/auth/login/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('api/auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/auth/refresh/', TokenRefreshView.as_view(throttle_classes=(RefreshIPThrottle,)), name='token_refresh'),
+    path('api/auth/logout/', LogoutView.as_view(), name='logout'),
     path('api/profile/', UserProfileView.as_view(), name='user-profile'),
+    path('api/', include('reviews.urls')),
     path('api/restaurants/', include('restaurants.urls')),
     path('api/', api.urls),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path(settings.MEDIA_URL.lstrip('/'), include('mediafiles.urls')),
+]
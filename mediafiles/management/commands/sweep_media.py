@@ -0,0 +1,91 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from mediafiles.models import StoredFile
+from mediafiles.signals import tracked_models
+
+
+def count_references(names=None):
+    """Count the rows (soft-deleted ones included) that reference each file name"""
+    counts = Counter()
+    for model, fields in tracked_models():
+        for attname in fields:
+            queryset = model._base_manager.exclude(**{attname: ''}).exclude(**{f'{attname}__isnull': True})
+            if names is not None:
+                queryset = queryset.filter(**{f'{attname}__in': names})
+            for name, count in queryset.values_list(attname).annotate(count=Count('pk')).order_by():
+                counts[name] += count
+    return counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete media files no row references any more, in batches. "
+        "Reference counts are re-checked against the tables before each delete."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help='Leave files touched within this window alone (uploads in flight)')
+        parser.add_argument('--reconcile', action='store_true',
+                            help='Recount references of every stored file first')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['reconcile']:
+            self.reconcile(options['batch_size'])
+
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+        candidates = StoredFile.objects.filter(ref_count__lte=0, updated_at__lt=cutoff).order_by('id')
+        removed = last_id = 0
+        while True:
+            batch = list(candidates.filter(id__gt=last_id).values_list('id', 'name')[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            references = count_references([name for _, name in batch])
+
+            with transaction.atomic():
+                # Counts drift when rows change without signals (queryset
+                # updates, the soft-delete purge); trust the tables
+                for name, count in references.items():
+                    StoredFile.objects.filter(name=name).update(ref_count=count)
+                orphans = [file_id for file_id, name in batch if name not in references]
+                names = list(StoredFile.objects
+                             .select_for_update()
+                             .filter(id__in=orphans, ref_count__lte=0, updated_at__lt=cutoff)
+                             .values_list('name', flat=True))
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+                else:
+                    StoredFile.objects.filter(name__in=names).delete()
+                    # Still under the row locks: an upload of the same content
+                    # waits for them, then finds the file gone and writes it again
+                    for name in names:
+                        default_storage.delete(name)
+            removed += len(names)
+
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} unreferenced files"))
+
+    def reconcile(self, batch_size):
+        references = count_references()
+        stale = []
+        for stored in StoredFile.objects.only('id', 'name', 'ref_count').iterator(chunk_size=batch_size):
+            count = references.pop(stored.name, 0)
+            if stored.ref_count != count:
+                stored.ref_count = count
+                stale.append(stored)
+        StoredFile.objects.bulk_update(stale, ['ref_count'], batch_size=batch_size)
+        # Referenced files that were stored before this app existed
+        StoredFile.objects.bulk_create([
+            StoredFile(name=name, ref_count=count) for name, count in references.items()
+        ], batch_size=batch_size, ignore_conflicts=True)
+        self.stdout.write(f"Reconciled {len(stale)} counts, registered {len(references)} files")
@@ -0,0 +1,23 @@
+from django.db import models
+
+
+class StoredFile(models.Model):
+    """A content-addressed file in media storage and how many rows use it"""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # The sweep only ever looks at unreferenced files
+            models.Index(
+                fields=['updated_at'],
+                condition=models.Q(ref_count__lte=0),
+                name='storedfile_sweep_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
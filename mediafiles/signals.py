@@ -0,0 +1,95 @@
+from collections import Counter
+
+from django.apps import apps
+from django.db.models import F, FileField
+from django.db.models.signals import post_init, post_save, post_delete
+from django.utils import timezone
+
+from .models import StoredFile
+
+
+def tracked_fields(model):
+    """attnames of the model's file fields"""
+    return [field.attname for field in model._meta.concrete_fields if isinstance(field, FileField)]
+
+
+def tracked_models():
+    for model in apps.get_models():
+        fields = tracked_fields(model)
+        if fields:
+            yield model, fields
+
+
+def _file_name(value):
+    name = getattr(value, 'name', value)
+    return name or ''
+
+
+def acquire_files(names):
+    """Add one reference per occurrence of each name"""
+    _adjust(Counter(name for name in names if name), 1)
+
+
+def release_files(names):
+    """Drop one reference per occurrence of each name"""
+    _adjust(Counter(name for name in names if name), -1)
+
+
+def _adjust(counts, sign):
+    # One UPDATE per distinct count rather than one per file
+    by_count = {}
+    for name, count in counts.items():
+        by_count.setdefault(count, []).append(name)
+    now = timezone.now()
+    for count, names in by_count.items():
+        updated = StoredFile.objects.filter(name__in=names).update(
+            ref_count=F('ref_count') + sign * count, updated_at=now
+        )
+        if sign > 0 and updated < len(names):
+            # Files stored before this app existed have no row yet
+            existing = set(StoredFile.objects.filter(name__in=names).values_list('name', flat=True))
+            StoredFile.objects.bulk_create([
+                StoredFile(name=name, ref_count=count)
+                for name in names if name not in existing
+            ], ignore_conflicts=True)
+
+
+def remember_files(sender, instance, **kwargs):
+    """Snapshot the file names loaded with the row, so saves can diff them without a query"""
+    instance._stored_files = {
+        attname: _file_name(instance.__dict__[attname])
+        for attname in sender._stored_file_fields
+        if attname in instance.__dict__
+    }
+
+
+def update_file_references(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_stored_files', {})
+    acquired, released = [], []
+    for attname in sender._stored_file_fields:
+        if attname not in instance.__dict__:
+            continue  # Deferred and not assigned, so unchanged
+        name = _file_name(instance.__dict__[attname])
+        old = '' if created else previous.get(attname, name)
+        if name != old:
+            acquired.append(name)
+            released.append(old)
+        previous[attname] = name
+    instance._stored_files = previous
+    acquire_files(acquired)
+    release_files(released)
+
+
+def release_deleted_files(sender, instance, **kwargs):
+    release_files(
+        _file_name(instance.__dict__.get(attname)) for attname in sender._stored_file_fields
+    )
+
+
+def connect_signals():
+    # Connected per model so models without files pay nothing on init
+    for model, fields in tracked_models():
+        model._stored_file_fields = fields
+        post_init.connect(remember_files, sender=model, dispatch_uid=f'mediafiles_init_{model._meta.label}')
+        post_save.connect(update_file_references, sender=model, dispatch_uid=f'mediafiles_save_{model._meta.label}')
+        post_delete.connect(release_deleted_files, sender=model, dispatch_uid=f'mediafiles_delete_{model._meta.label}')
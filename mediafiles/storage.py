@@ -0,0 +1,82 @@
+"""
+Content-addressed media storage.
+
+Uploads are stored under the SHA-256 of their content
+(`cas/ab/cd/abcd....jpg`) instead of the upload name, so uploading the same
+photo twice, from any model, reuses the existing file and costs no disk.
+Django's collision renaming (`profile_kPjmbdz.jpg`) never happens: two files
+with the same name are the same file.
+
+Files are shared, so neither the storage nor the models remove them when a
+row changes or goes away. `mediafiles.signals` keeps `StoredFile.ref_count`
+up to date and the `sweep_media` command removes unreferenced files in
+batches. The sweep deletes a file while holding its `StoredFile` row lock,
+and an upload takes the same lock before checking the file is there, so an
+upload racing the sweep of the same content writes the file again. Files
+saved before this backend was enabled keep their old names and are served
+as before.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+HASH_PREFIX = 'cas'
+
+
+@deconstructible(path='mediafiles.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()[:10]
+        return posixpath.join(HASH_PREFIX, digest[:2], digest[2:4], digest + extension)
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is derived from the content in _save
+        return name
+
+    def _save(self, name, content):
+        from .models import StoredFile
+
+        name = self.content_name(name, content)
+        with transaction.atomic():
+            # Register the file, or touch it so a running sweep leaves it
+            # alone until the row that references it has been saved. The row
+            # lock waits out a sweep removing the file right now; the file is
+            # then written again below.
+            stored, created = StoredFile.objects.select_for_update().get_or_create(
+                name=name, defaults={'size': content.size}
+            )
+            if not created:
+                stored.save(update_fields=['updated_at'])
+            self._write(name, content)
+        return name
+
+    def _write(self, name, content):
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            return
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, mode=self.directory_permissions_mode or 0o777, exist_ok=True)
+        # Write to a temporary file and rename it into place, so a
+        # concurrent upload of the same content never sees a partial file
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                for chunk in content.chunks():
+                    handle.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
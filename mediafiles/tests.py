@@ -0,0 +1,232 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from menus.models import MenuItemImage
+from menus.tests import MenuTestMixin
+from users.models import User
+
+from . import variants
+from .models import StoredFile
+
+
+class ContentAddressedStorageTests(MenuTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_menu()
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def upload(self, item, content=b'photo'):
+        return MenuItemImage.objects.create(menu_item=item, image=SimpleUploadedFile('dish.jpg', content))
+
+    def sweep(self):
+        call_command('sweep_media', grace_minutes=0, stdout=StringIO())
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.upload(self.items[0])
+        second = self.upload(self.items[1])
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('cas/'))
+        self.assertEqual(StoredFile.objects.get().ref_count, 2)
+
+        first.delete()
+        self.sweep()
+        self.assertTrue(default_storage.exists(second.image.name))
+        self.assertEqual(StoredFile.objects.get().ref_count, 1)
+
+    def test_replaced_profile_picture_is_swept(self):
+        user = User.objects.create_user('diner', 'diner@example.com', 'testpass123', user_type='CUSTOMER')
+        user.profile_picture = SimpleUploadedFile('me.jpg', b'old face')
+        user.save()
+        old_name = user.profile_picture.name
+
+        user = User.objects.get(pk=user.pk)
+        user.profile_picture = SimpleUploadedFile('me.jpg', b'new face')
+        with CaptureQueriesContext(connection) as captured:
+            user.save()
+        # No re-read of the old row and no inline file removal
+        self.assertFalse([query for query in captured if 'FROM "users_user"' in query['sql']])
+        self.assertTrue(default_storage.exists(old_name))
+
+        self.sweep()
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertTrue(default_storage.exists(user.profile_picture.name))
+
+    def test_sweep_trusts_the_tables_over_counts(self):
+        image = self.upload(self.items[0])
+        # A queryset update bypasses the signals and leaves the count at 0
+        StoredFile.objects.update(ref_count=0)
+        self.sweep()
+        self.assertTrue(default_storage.exists(image.image.name))
+        self.assertEqual(StoredFile.objects.get().ref_count, 1)
+
+
+    def test_files_are_deleted_under_the_row_locks(self):
+        image = self.upload(self.items[0])
+        image.delete()
+        depths = []
+        delete = default_storage.delete
+
+        def delete_and_record(name):
+            depths.append(len(connection.savepoint_ids))
+            delete(name)
+
+        outside = len(connection.savepoint_ids)
+        with mock.patch.object(default_storage, 'delete', delete_and_record):
+            self.sweep()
+        # Inside the sweep's transaction
+        self.assertEqual(depths, [outside + 1])
+        self.assertFalse(default_storage.exists(image.image.name))
+
+    def test_upload_restores_a_registered_file_missing_from_disk(self):
+        image = self.upload(self.items[0])
+        # Swept from disk after the upload read the row, before it touched it
+        os.remove(default_storage.path(image.image.name))
+        again = self.upload(self.items[1])
+        self.assertTrue(default_storage.exists(again.image.name))
+        self.assertEqual(StoredFile.objects.get().ref_count, 2)
+
+
+class ResizeImageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.name = default_storage.save('photo.jpg', ContentFile(self.jpeg(800, 600)))
+
+    def jpeg(self, width, height, color='red'):
+        buffer = BytesIO()
+        Image.new('RGB', (width, height), color).save(buffer, 'JPEG')
+        return buffer.getvalue()
+
+    def get(self, size, name=None):
+        return self.client.get(f'/media/resize/{size}/{name or self.name}')
+
+    def test_variant_fits_within_the_box_and_is_cached(self):
+        with mock.patch('mediafiles.variants.render_variant', wraps=variants.render_variant) as render:
+            first = self.get('200x200')
+            second = self.get('200x200')
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('immutable', first['Cache-Control'])
+        with Image.open(BytesIO(b''.join(second.streaming_content))) as image:
+            self.assertEqual(image.size, (200, 150))
+
+    def test_concurrent_requests_render_once(self):
+        cache = variants.VariantCache()
+        started = threading.Barrier(8)
+        render_variant = variants.render_variant
+
+        def slow_render(*args):
+            time.sleep(0.05)
+            return render_variant(*args)
+
+        def fetch():
+            started.wait()
+            cache.get(self.name, 100, 100)
+
+        with mock.patch('mediafiles.variants.render_variant', side_effect=slow_render) as render:
+            threads = [threading.Thread(target=fetch) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(render.call_count, 1)
+
+    def test_least_recently_used_variants_are_evicted(self):
+        cache = variants.VariantCache()
+        first = cache.get(self.name, 300, 300)
+        size = os.path.getsize(first)
+        os.utime(first, (time.time() - 3600, time.time() - 3600))
+        with override_settings(MEDIA_VARIANTS_MAX_BYTES=size * 2):
+            cache.get(self.name, 310, 310)
+            cache.get(self.name, 320, 320)
+        self.assertFalse(os.path.exists(first))
+        self.assertLessEqual(cache.disk_usage(), size * 2)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.get('100x100', 'missing.jpg').status_code, 404)
+        self.assertEqual(self.get('5000x100').status_code, 400)
+        self.assertEqual(self.get('100x100', '../secret.jpg').status_code, 400)
+
+
+class ServeMediaTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.name = default_storage.save('menu.pdf', ContentFile(b'0123456789'))
+        self.url = f'/media/{self.name}'
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_response_with_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        since = response['Last-Modified']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=since).status_code, 304)
+
+    def test_byte_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(self.body(response), b'789')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+        # A stale If-Range gets the whole, current file
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_offload_to_front_server(self):
+        with override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.name}')
+        self.assertEqual(response.content, b'')
+
+        with override_settings(MEDIA_X_SENDFILE=True):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media_root, self.name))
+
+    def test_hidden_and_missing_files_are_not_served(self):
+        variant = variants.VariantCache().variant_path('photo.jpg', 10, 10)
+        os.makedirs(os.path.dirname(variant))
+        open(variant, 'wb').close()
+        relative = os.path.relpath(variant, self.media_root)
+        self.assertEqual(self.client.get(f'/media/{relative}').status_code, 404)
+        self.assertEqual(self.client.get('/media/missing.pdf').status_code, 404)
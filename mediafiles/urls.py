@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'mediafiles'
+
+urlpatterns = [
+    path('resize/<int:width>x<int:height>/<path:path>', views.resize_image, name='resize'),
+    path('<path:path>', views.serve_media, name='serve'),
+]
@@ -0,0 +1,200 @@
+"""
+Resized image variants, generated on first request and kept in a bounded
+disk cache.
+
+Variants live under MEDIA_VARIANTS_ROOT, one file per (size, source path).
+A variant's mtime records its last access, and when the cache grows past
+MEDIA_VARIANTS_MAX_BYTES the least recently used files are evicted. The
+running size is tracked per process and re-measured from disk on eviction,
+so several workers sharing the directory stay roughly within the cap.
+
+Concurrent requests for the same variant are coalesced: one thread renders
+it while the others wait on its lock (and, where fcntl exists, a lock file
+stripe does the same across processes), then everyone serves the same file.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils._os import safe_join
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalesce within the process only
+    fcntl = None
+
+FORMATS = {
+    '.jpg': 'JPEG',
+    '.jpeg': 'JPEG',
+    '.png': 'PNG',
+    '.webp': 'WEBP',
+    '.gif': 'GIF',
+}
+
+# Don't rewrite a variant's mtime on every hit, just often enough for LRU
+TOUCH_INTERVAL = 60
+
+
+class VariantError(Exception):
+    pass
+
+
+def variants_root():
+    return str(getattr(settings, 'MEDIA_VARIANTS_ROOT', os.path.join(settings.MEDIA_ROOT, '.variants')))
+
+
+def max_cache_bytes():
+    return getattr(settings, 'MEDIA_VARIANTS_MAX_BYTES', 512 * 1024 * 1024)
+
+
+def max_dimension():
+    return getattr(settings, 'MEDIA_RESIZE_MAX_DIMENSION', 2048)
+
+
+class VariantCache:
+    def __init__(self):
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._size = None
+        self._size_guard = threading.Lock()
+
+    def variant_path(self, source_name, width, height):
+        extension = os.path.splitext(source_name)[1].lower()
+        key = hashlib.sha1(f'{width}x{height}/{source_name}'.encode()).hexdigest()
+        return os.path.join(variants_root(), key[:2], key + extension)
+
+    def get(self, source_name, width, height):
+        """Return the path of the variant, rendering it if needed"""
+        extension = os.path.splitext(source_name)[1].lower()
+        if extension not in FORMATS:
+            raise VariantError(f"Cannot resize {extension or 'extensionless'} files")
+        if not (0 < width <= max_dimension() and 0 < height <= max_dimension()):
+            raise VariantError(f"Sizes must be between 1 and {max_dimension()}")
+
+        path = self.variant_path(source_name, width, height)
+        if self._touch(path):
+            return path
+
+        with self._lock(path):
+            # Another request may have rendered it while we waited
+            if self._touch(path):
+                return path
+            source = safe_join(default_storage.location, source_name)
+            if not os.path.isfile(source):
+                raise FileNotFoundError(source_name)
+            size = render_variant(source, path, width, height, FORMATS[extension])
+        self._record(size)
+        return path
+
+    def _touch(self, path):
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return False
+        now = time.time()
+        if now - mtime > TOUCH_INTERVAL:
+            try:
+                os.utime(path, (now, now))
+            except FileNotFoundError:
+                return False  # Evicted under us
+        return True
+
+    @contextmanager
+    def _lock(self, path):
+        with self._locks_guard:
+            lock, waiters = self._locks.get(path, (None, 0))
+            lock = lock or threading.Lock()
+            self._locks[path] = (lock, waiters + 1)
+        try:
+            with lock:
+                if fcntl is None:
+                    yield
+                else:
+                    # A fixed set of lock files, striped by the variant's hash prefix
+                    lock_dir = os.path.join(variants_root(), '.locks')
+                    os.makedirs(lock_dir, exist_ok=True)
+                    with open(os.path.join(lock_dir, os.path.basename(path)[:2] + '.lock'), 'w') as handle:
+                        fcntl.flock(handle, fcntl.LOCK_EX)
+                        try:
+                            yield
+                        finally:
+                            fcntl.flock(handle, fcntl.LOCK_UN)
+        finally:
+            with self._locks_guard:
+                lock, waiters = self._locks[path]
+                if waiters == 1:
+                    del self._locks[path]
+                else:
+                    self._locks[path] = (lock, waiters - 1)
+
+    def _record(self, size):
+        with self._size_guard:
+            if self._size is None:
+                self._size = self.disk_usage()
+            else:
+                self._size += size
+            if self._size > max_cache_bytes():
+                self._size = self.evict(int(max_cache_bytes() * 0.9))
+
+    def disk_usage(self):
+        return sum(size for _, _, size in self._scan())
+
+    def evict(self, target_bytes):
+        """Delete least recently used variants until the cache fits target_bytes"""
+        entries = sorted(self._scan(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total <= target_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        return total
+
+    def _scan(self):
+        for directory, _, files in os.walk(variants_root()):
+            for name in files:
+                if name.endswith('.lock') or name.startswith('.tmp-'):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+
+def render_variant(source, destination, width, height, image_format):
+    """Resize `source` to fit within width x height and write it atomically"""
+    try:
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((width, height), Image.LANCZOS)
+            if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            directory = os.path.dirname(destination)
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as handle:
+                    options = {'quality': 85, 'optimize': True} if image_format in ('JPEG', 'WEBP') else {}
+                    image.save(handle, image_format, **options)
+                os.replace(temp_path, destination)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+    except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+        raise VariantError(str(e))
+    return os.path.getsize(destination)
+
+
+variant_cache = VariantCache()
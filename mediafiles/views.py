@@ -0,0 +1,158 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+from .storage import HASH_PREFIX
+from .variants import VariantError, variant_cache
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+ONE_YEAR = 365 * 24 * 60 * 60
+
+
+def _etag(stat, suffix=''):
+    return quote_etag(f'{stat.st_size:x}-{stat.st_mtime_ns:x}{suffix}')
+
+
+def _byte_range(header, size):
+    """Parse a single `bytes=` range into (start, end) inclusive
+
+    Returns None to serve the whole file (no header, or several ranges,
+    which clients fall back from) and raises ValueError when unsatisfiable.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _offload_header(full_path):
+    """X-Accel-Redirect/X-Sendfile header for the front server, if configured"""
+    accel_prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', None)
+    if accel_prefix:
+        relative = os.path.relpath(full_path, default_storage.location)
+        if not relative.startswith('..'):
+            return 'X-Accel-Redirect', accel_prefix.rstrip('/') + '/' + relative.replace(os.sep, '/')
+    if getattr(settings, 'MEDIA_X_SENDFILE', False):
+        return 'X-Sendfile', full_path
+    return None
+
+
+def file_response(request, full_path, immutable=False, validators=None):
+    """Serve a file with conditional GET, byte ranges and sendfile offload
+
+    `validators` overrides the (etag, last_modified) derived from the file,
+    for files whose mtime doesn't reflect their content.
+    """
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("No such file")
+
+    etag, last_modified = validators or (_etag(stat), int(stat.st_mtime))
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        offload = _offload_header(full_path)
+        byte_range = None
+        if offload is None and request.headers.get('Range') and _if_range_matches(request, etag, last_modified):
+            try:
+                byte_range = _byte_range(request.headers['Range'], stat.st_size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{stat.st_size}'
+                return response
+
+        if offload is not None:
+            # The front server streams the file (and handles Range itself)
+            response = HttpResponse(content_type=content_type)
+            response[offload[0]] = offload[1]
+        elif byte_range is not None:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(full_path, start, end - start + 1), status=206, content_type=content_type
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = str(end - start + 1)
+        else:
+            # Handed to wsgi.file_wrapper, which uses sendfile() where available
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if immutable:
+        # Content-addressed names never change content
+        patch_cache_control(response, public=True, max_age=ONE_YEAR, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600))
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve an uploaded file from MEDIA_ROOT"""
+    # Dot-directories hold variants, locks and in-progress uploads
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404("No such file")
+    full_path = safe_join(default_storage.location, path)
+    if not os.path.isfile(full_path):
+        raise Http404("No such file")
+    return file_response(request, full_path, immutable=path.startswith(f'{HASH_PREFIX}/'))
+
+
+@require_safe
+def resize_image(request, width, height, path):
+    """Serve `path` resized to fit within width x height"""
+    try:
+        variant = variant_cache.get(path, width, height)
+        source = os.stat(safe_join(default_storage.location, path))
+    except FileNotFoundError:
+        raise Http404("No such image")
+    except VariantError as e:
+        return HttpResponseBadRequest(str(e))
+    # A variant's own mtime tracks its last access, so validate against the source
+    validators = (_etag(source, f'-{width}x{height}'), int(source.st_mtime))
+    return file_response(request, variant, immutable=path.startswith(f'{HASH_PREFIX}/'), validators=validators)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import MenuCategory, PricingTitle, MenuDesign, MenuDesignCategory, MenuDesignPricing, SpiceLevel, DietaryRequirement, ReligiousRestriction, Allergen, PortionSize, MenuItem, MenuItemPortion, MenuItemPrice, MenuItemImage
+from .models import MenuCategory, PricingTitle, MenuDesign, MenuDesignCategory, MenuDesignPricing, SpiceLevel, DietaryRequirement, ReligiousRestriction, Allergen, PortionSize, MenuItem, MenuItemPortion, MenuItemPrice, MenuItemImage, PriceAdjustment
 
 @admin.register(MenuCategory)
 class MenuCategoryAdmin(admin.ModelAdmin):
@@ -207,3 +207,10 @@ class MenuItemAdmin(admin.ModelAdmin):
 
     class Media:
         js = ('admin/js/menu_item.js',)
+
+@admin.register(PriceAdjustment)
+class PriceAdjustmentAdmin(admin.ModelAdmin):
+    list_display = ('restaurant', 'mode', 'value', 'rounding', 'affected_count', 'created_at', 'undone_at')
+    list_filter = ('mode', 'rounding')
+    search_fields = ('restaurant__name',)
+    readonly_fields = ('previous_prices', 'affected_count', 'created_at', 'undone_at')
@@ -1,15 +1,29 @@
+import logging
+
 from ninja import Router, Schema
-from typing import List
+from typing import List, Literal
 from django.shortcuts import get_object_or_404
-from .models import MenuCategory, PricingTitle, MenuDesign, MenuDesignCategory, MenuDesignPricing, SpiceLevel, DietaryRequirement, ReligiousRestriction, Allergen, PortionSize, MenuItem, MenuItemPortion, MenuItemPrice, MenuItemImage
+from .models import MenuCategory, PricingTitle, MenuDesign, MenuDesignCategory, MenuDesignPricing, SpiceLevel, DietaryRequirement, ReligiousRestriction, Allergen, PortionSize, MenuItem, MenuItemPortion, MenuItemPrice, MenuItemImage, PriceAdjustment
+from django.utils import timezone
 from django.utils.timezone import datetime
 from restaurants.models import Restaurant
 from rest_framework.response import Response
 from rest_framework import status
 from ninja.errors import HttpError
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
+from django.conf import settings
+from django.db import transaction
+from . import fastpath
+from .cache import bump_menu_version
+from .cloning import clone_menu, MenuCloneError
+from .pricing import adjust_prices, undo_price_adjustment, PriceAdjustmentError
+from RestaurantReviews.throttling import UPLOAD_THROTTLES, NinjaThrottle
+from users.authentication import NinjaJWTAuth
+
+logger = logging.getLogger(__name__)
 
 router = Router()
+jwt_auth = NinjaJWTAuth()
 
 # Schemas
 class MenuCategoryOut(Schema):
@@ -120,18 +134,75 @@ class MenuItemUpdate(Schema):
     display_order: int | None = None
     is_active: bool | None = None
 
+class MenuCloneRequest(Schema):
+    target_restaurant_ids: List[int]
+    replace: bool = False
+
+class MenuCloneOut(Schema):
+    restaurants: int
+    menu_designs: int
+    menu_items: int
+    portions: int
+    prices: int
+    tags: int
+
+class MenuItemPatch(Schema):
+    id: int
+    menu_category_id: int | None = None
+    spice_level_id: int | None = None
+    has_multiple_prices: bool | None = None
+    has_multiple_portions: bool | None = None
+    display_order: int | None = None
+    is_active: bool | None = None
+
+class MenuItemBulkPatch(Schema):
+    restaurant_id: int
+    items: List[MenuItemPatch]
+
+class MenuItemBulkPatchOut(Schema):
+    updated: int
+    ids: List[int]
+
+class PriceAdjustmentCreate(Schema):
+    restaurant_id: int
+    mode: Literal['PERCENT', 'AMOUNT']
+    value: float
+    rounding: Literal['CENT', 'FIVE_CENTS', 'TEN_CENTS', 'WHOLE'] = 'CENT'
+    menu_category_id: int | None = None
+    pricing_title_id: int | None = None
+
+class PriceAdjustmentOut(Schema):
+    id: int
+    restaurant_id: int
+    menu_category_id: int | None
+    pricing_title_id: int | None
+    mode: str
+    value: float
+    rounding: str
+    affected_count: int
+    created_at: datetime
+    undone_at: datetime | None
+
 class MenuItemPortionOut(Schema):
     id: int
     portion_size: str
     quantity: int
     display_order: int
 
+    @staticmethod
+    def resolve_portion_size(obj):
+        return obj.portion_size.name
+
 class MenuItemPriceOut(Schema):
     id: int
     portion: MenuItemPortionOut | None = None
     pricing_title: str | None = None
     price: float
 
+    @staticmethod
+    def resolve_pricing_title(obj):
+        return obj.pricing_title.name if obj.pricing_title_id else None
+
 class MenuItemImageOut(Schema):
     id: int
     image: str
@@ -156,10 +227,85 @@ class MenuItemOut(Schema):
     created_at: datetime
     updated_at: datetime
 
+    @staticmethod
+    def resolve_menu_category(obj):
+        return obj.menu_category.name
+
+    @staticmethod
+    def resolve_spice_level(obj):
+        return obj.spice_level.name if obj.spice_level_id else None
+
+    @staticmethod
+    def resolve_dietary_requirements(obj):
+        return [requirement.name for requirement in obj.dietary_requirements.all()]
+
+    @staticmethod
+    def resolve_religious_restrictions(obj):
+        return [restriction.name for restriction in obj.religious_restrictions.all()]
+
+    @staticmethod
+    def resolve_allergens(obj):
+        return [allergen.name for allergen in obj.allergens.all()]
+
+def menu_item_queryset():
+    """Menu items with every relation MenuItemOut reads loaded up front.
+
+    The async router relies on this: nothing may hit the database lazily
+    while the response is being serialized.
+    """
+    return (MenuItem.objects
+            .select_related('menu_category', 'spice_level')
+            .prefetch_related(
+                'dietary_requirements',
+                'religious_restrictions',
+                'allergens',
+                'portions__portion_size',
+                'prices__portion__portion_size',
+                'prices__pricing_title',
+                'images',
+            ))
+
+def restaurant_pricing_titles_queryset(restaurant_id):
+    return PricingTitle.objects.filter(
+        menu_designs__menu_design__restaurant_id=restaurant_id,
+        menu_designs__menu_design__is_active=True,
+        menu_designs__menu_design__is_multiple_pricing=True,
+        menu_designs__menu_design__restaurant__is_deleted=False
+    ).distinct()
+
+def active_menu_design_queryset():
+    return (MenuDesign.objects
+            .filter(is_active=True, restaurant__is_deleted=False)
+            .prefetch_related('categories__category', 'pricing_titles__pricing_title'))
+
+def owned_restaurant(request, restaurant_id):
+    """The restaurant, if the signed-in user owns it (or is staff)"""
+    restaurant = get_object_or_404(Restaurant, id=restaurant_id)
+    if restaurant.owner_id != request.auth.pk and not request.auth.is_staff:
+        raise HttpError(403, "You do not own this restaurant")
+    return restaurant
+
+def build_menu_design_data(design):
+    """Build the MenuDesignOut payload from a design loaded by active_menu_design_queryset()"""
+    return {
+        "id": design.id,
+        "is_multiple_pricing": design.is_multiple_pricing,
+        "categories": [
+            {"id": category.category.id, "name": category.category.name}
+            for category in design.categories.all()
+        ],
+        "pricing_titles": [
+            {"id": pricing.pricing_title.id, "name": pricing.pricing_title.name}
+            for pricing in design.pricing_titles.all()
+        ],
+    }
+
 # API Endpoints
 @router.get("/categories/", response=List[MenuCategoryOut])
 def list_categories(request):
     """Get all active menu categories"""
+    if settings.MENUS_TRUSTED_SERIALIZATION:
+        return fastpath.list_categories_response()
     return MenuCategory.objects.filter(is_active=True)
 
 @router.post("/categories/", response=MenuCategoryOut)
@@ -177,6 +323,8 @@ def get_category(request, category_id: int):
 @router.get("/pricing-titles/", response=List[PricingTitleOut])
 def list_pricing_titles(request):
     """Get all active pricing titles"""
+    if settings.MENUS_TRUSTED_SERIALIZATION:
+        return fastpath.list_pricing_titles_response()
     return PricingTitle.objects.filter(is_active=True)
 
 @router.post("/pricing-titles/", response=PricingTitleOut)
@@ -226,51 +374,22 @@ def create_menu_design(request, payload: MenuDesignCreate):
 
 @router.get("/menu-designs/{restaurant_id}/", response={200: MenuDesignOut, 404: dict, 500: dict})
 def get_restaurant_menu_design(request, restaurant_id: int):
+    if settings.MENUS_TRUSTED_SERIALIZATION:
+        response = fastpath.menu_design_response(restaurant_id)
+        if response is None:
+            return 404, {"detail": "No active menu design found"}
+        return response
     try:
         # Fix the query to use prefetch_related before get()
-        design = (MenuDesign.objects
-                 .prefetch_related('categories__category', 'pricing_titles__pricing_title')
-                 .get(restaurant_id=restaurant_id, is_active=True))
-        
-        # Add debug logging
-        categories = list(design.categories.all())  # Force evaluation to check data
-        pricing_titles = list(design.pricing_titles.all())
-        
-        response_data = {
-            "id": design.id,
-            "is_multiple_pricing": design.is_multiple_pricing,
-            "categories": [],
-            "pricing_titles": []
-        }
-        
-        # Safely build categories list
-        for category in categories:
-            try:
-                if category.category:  # Check if category relation exists
-                    response_data["categories"].append({
-                        "id": category.category.id,
-                        "name": category.category.name
-                    })
-            except Exception as category_error:
-                print(f"Error processing category: {category_error}")
-        
-        # Safely build pricing titles list
-        for pricing in pricing_titles:
-            try:
-                if pricing.pricing_title:  # Check if pricing_title relation exists
-                    response_data["pricing_titles"].append({
-                        "id": pricing.pricing_title.id,
-                        "name": pricing.pricing_title.name
-                    })
-            except Exception as pricing_error:
-                print(f"Error processing pricing: {pricing_error}")
+        design = active_menu_design_queryset().get(restaurant_id=restaurant_id)
         
+        response_data = build_menu_design_data(design)
         return 200, response_data
         
     except MenuDesign.DoesNotExist:
         return 404, {"detail": "No active menu design found"}
     except Exception as e:
-        print(f"Error in get_restaurant_menu_design: {str(e)}")  # Debug log
+        logger.exception("Error building the menu design of restaurant %s", restaurant_id)
         return 500, {"detail": f"Server error: {str(e)}"}
 
 @router.put("/menu-designs/{restaurant_id}/categories/order/", response=List[MenuDesignCategoryOut])
@@ -283,6 +402,7 @@ def update_category_order(request, restaurant_id: int, payload: List[MenuDesignC
             menu_design=menu_design,
             category_id=cat.category_id
         ).update(display_order=cat.display_order)
+    bump_menu_version(restaurant_id)
     
     return MenuDesignCategory.objects.filter(menu_design=menu_design)
 
@@ -296,23 +416,40 @@ def update_pricing_order(request, restaurant_id: int, payload: List[MenuDesignPr
             menu_design=menu_design,
             pricing_title_id=price.pricing_title_id
         ).update(display_order=price.display_order)
+    bump_menu_version(restaurant_id)
     
     return MenuDesignPricing.objects.filter(menu_design=menu_design)
 
+@router.post("/menu-designs/{restaurant_id}/clone/", response={200: MenuCloneOut, 400: dict}, auth=jwt_auth)
+def clone_restaurant_menu(request, restaurant_id: int, payload: MenuCloneRequest):
+    """Copy a restaurant's menu to other restaurants of the same owner"""
+    source = owned_restaurant(request, restaurant_id)
+    targets = Restaurant.objects.filter(id__in=payload.target_restaurant_ids, owner_id=source.owner_id)
+    found = set(targets.values_list('id', flat=True))
+    missing = set(payload.target_restaurant_ids) - found
+    if missing:
+        return 400, {"detail": "Target restaurants must belong to the same owner", "ids": sorted(missing)}
+
+    try:
+        return 200, clone_menu(restaurant_id, found, replace=payload.replace)
+    except MenuCloneError as e:
+        return 400, {"detail": str(e)}
+
 @router.get("/menu-designs/{restaurant_id}/pricing-titles/", response=List[PricingTitleOut])
 def get_restaurant_pricing_titles(request, restaurant_id: int):
     """Get pricing titles for a restaurant's active menu design"""
-    return PricingTitle.objects.filter(
-        menudesignpricing__menu_design__restaurant_id=restaurant_id,
-        menudesignpricing__menu_design__is_active=True,
-        menudesignpricing__menu_design__is_multiple_pricing=True
-    ).distinct()
+    queryset = restaurant_pricing_titles_queryset(restaurant_id)
+    if settings.MENUS_TRUSTED_SERIALIZATION:
+        return fastpath.restaurant_pricing_titles_response(queryset, restaurant_id)
+    return queryset
 
 # Menu Item Endpoints
 @router.get("/menu-items/", response=List[MenuItemOut])
 def list_menu_items(request, restaurant_id: int | None = None):
     """Get all menu items, optionally filtered by restaurant"""
-    queryset = MenuItem.objects.all()
+    if settings.MENUS_TRUSTED_SERIALIZATION:
+        return fastpath.menu_items_response(restaurant_id)
+    queryset = menu_item_queryset()
     if restaurant_id:
         queryset = queryset.filter(restaurant_id=restaurant_id)
     return queryset
@@ -363,10 +500,62 @@ def create_menu_item(request, payload: MenuItemCreate):
     
     return menu_item
 
+@router.patch("/menu-items/bulk/", response={200: MenuItemBulkPatchOut, 400: dict, 404: dict}, auth=jwt_auth)
+def bulk_patch_menu_items(request, payload: MenuItemBulkPatch):
+    """Update scalar fields of many menu items at once"""
+    owned_restaurant(request, payload.restaurant_id)
+    changes = {}
+    for patch in payload.items:
+        fields = patch.dict(exclude_unset=True)
+        item_id = fields.pop('id')
+        # spice_level is the only nullable field; None means "unchanged" elsewhere
+        fields = {field: value for field, value in fields.items()
+                  if value is not None or field == 'spice_level_id'}
+        changes.setdefault(item_id, {}).update(fields)
+
+    negative = sorted(item_id for item_id, fields in changes.items() if fields.get('display_order', 0) < 0)
+    if negative:
+        return 400, {"detail": "display_order cannot be negative", "ids": negative}
+
+    items = list(MenuItem.objects.filter(restaurant_id=payload.restaurant_id, id__in=changes))
+    missing = set(changes) - {item.id for item in items}
+    if missing:
+        return 404, {"detail": "Menu items not found", "ids": sorted(missing)}
+
+    # A bad id would otherwise only fail as an IntegrityError, on some backends at commit
+    for field, model, name in [('menu_category_id', MenuCategory, "Menu categories"),
+                               ('spice_level_id', SpiceLevel, "Spice levels")]:
+        ids = {fields[field] for fields in changes.values() if fields.get(field) is not None}
+        missing = ids - set(model.objects.filter(id__in=ids).values_list('id', flat=True)) if ids else set()
+        if missing:
+            return 404, {"detail": f"{name} not found", "ids": sorted(missing)}
+
+    # Items are written grouped by the fields they change, so no item's
+    # other fields are overwritten with the values loaded above. bulk_update
+    # skips auto_now, so stamp updated_at ourselves.
+    now = timezone.now()
+    groups = {}
+    for item in items:
+        for field, value in changes[item.id].items():
+            setattr(item, field, value)
+        item.updated_at = now
+        groups.setdefault(tuple(sorted(changes[item.id])), []).append(item)
+
+    with transaction.atomic():
+        for fields, group in groups.items():
+            MenuItem.objects.bulk_update(group, [*fields, 'updated_at'], batch_size=500)
+        bump_menu_version(payload.restaurant_id)
+    return 200, {"updated": len(items), "ids": sorted(changes)}
+
 @router.get("/menu-items/{item_id}/", response=MenuItemOut)
 def get_menu_item(request, item_id: int):
     """Get a specific menu item"""
-    return get_object_or_404(MenuItem, id=item_id)
+    if settings.MENUS_TRUSTED_SERIALIZATION:
+        response = fastpath.menu_item_response(item_id)
+        if response is None:
+            raise Http404("No MenuItem matches the given query.")
+        return response
+    return get_object_or_404(menu_item_queryset(), id=item_id)
 
 @router.put("/menu-items/{item_id}/", response=MenuItemOut)
 def update_menu_item(request, item_id: int, payload: MenuItemUpdate):
@@ -389,10 +578,10 @@ def update_menu_item(request, item_id: int, payload: MenuItemUpdate):
 def delete_menu_item(request, item_id: int):
     """Delete a menu item"""
     menu_item = get_object_or_404(MenuItem, id=item_id)
-    menu_item.delete()
+    menu_item.soft_delete()
     return {"success": True}
 
-@router.post("/menu-items/{item_id}/images/")
+@router.post("/menu-items/{item_id}/images/", throttle=NinjaThrottle(*UPLOAD_THROTTLES))
 def upload_menu_item_images(request, item_id: int):
     """Upload images for a menu item"""
     menu_item = get_object_or_404(MenuItem, id=item_id)
@@ -414,4 +603,30 @@ def update_menu_item_order(request, item_id: int, display_order: int):
     menu_item = get_object_or_404(MenuItem, id=item_id)
     menu_item.display_order = display_order
     menu_item.save()
-    return menu_item 
\ No newline at end of file
+    return menu_item 
+
+# Price Adjustment Endpoints
+@router.post("/price-adjustments/", response={200: PriceAdjustmentOut, 400: dict}, auth=jwt_auth)
+def create_price_adjustment(request, payload: PriceAdjustmentCreate):
+    """Raise or lower prices of a restaurant's menu in one update"""
+    owned_restaurant(request, payload.restaurant_id)
+    try:
+        return 200, adjust_prices(**payload.dict())
+    except PriceAdjustmentError as e:
+        return 400, {"detail": str(e)}
+
+@router.get("/price-adjustments/", response=List[PriceAdjustmentOut], auth=jwt_auth)
+def list_price_adjustments(request, restaurant_id: int):
+    """Get the price adjustment history of a restaurant"""
+    owned_restaurant(request, restaurant_id)
+    return PriceAdjustment.objects.filter(restaurant_id=restaurant_id)
+
+@router.post("/price-adjustments/{adjustment_id}/undo/", response={200: PriceAdjustmentOut, 409: dict}, auth=jwt_auth)
+def undo_adjustment(request, adjustment_id: int):
+    """Restore the prices changed by a price adjustment"""
+    adjustment = get_object_or_404(PriceAdjustment, id=adjustment_id)
+    owned_restaurant(request, adjustment.restaurant_id)
+    try:
+        return 200, undo_price_adjustment(adjustment_id)
+    except PriceAdjustmentError as e:
+        return 409, {"detail": str(e)}
@@ -0,0 +1,52 @@
+from ninja import Router
+from typing import List
+from django.shortcuts import aget_object_or_404
+from .models import MenuCategory, PricingTitle, MenuDesign
+from .api import (
+    MenuCategoryOut, PricingTitleOut, MenuDesignOut, MenuItemOut,
+    menu_item_queryset, restaurant_pricing_titles_queryset,
+    active_menu_design_queryset, build_menu_design_data,
+)
+
+# Native async versions of the menus read endpoints. Under ASGI these run on
+# the event loop instead of each request holding a thread from the sync bridge.
+# Every view materialises its result before returning, because ninja validates
+# the response synchronously and a lazy queryset cannot be evaluated there.
+router = Router()
+
+@router.get("/categories/", response=List[MenuCategoryOut])
+async def list_categories(request):
+    """Get all active menu categories"""
+    return [category async for category in MenuCategory.objects.filter(is_active=True)]
+
+@router.get("/pricing-titles/", response=List[PricingTitleOut])
+async def list_pricing_titles(request):
+    """Get all active pricing titles"""
+    return [title async for title in PricingTitle.objects.filter(is_active=True)]
+
+@router.get("/menu-designs/{restaurant_id}/", response={200: MenuDesignOut, 404: dict})
+async def get_restaurant_menu_design(request, restaurant_id: int):
+    """Get the active menu design for a restaurant"""
+    try:
+        design = await active_menu_design_queryset().aget(restaurant_id=restaurant_id)
+    except MenuDesign.DoesNotExist:
+        return 404, {"detail": "No active menu design found"}
+    return 200, build_menu_design_data(design)
+
+@router.get("/menu-designs/{restaurant_id}/pricing-titles/", response=List[PricingTitleOut])
+async def get_restaurant_pricing_titles(request, restaurant_id: int):
+    """Get pricing titles for a restaurant's active menu design"""
+    return [title async for title in restaurant_pricing_titles_queryset(restaurant_id)]
+
+@router.get("/menu-items/", response=List[MenuItemOut])
+async def list_menu_items(request, restaurant_id: int | None = None):
+    """Get all menu items, optionally filtered by restaurant"""
+    queryset = menu_item_queryset()
+    if restaurant_id:
+        queryset = queryset.filter(restaurant_id=restaurant_id)
+    return [item async for item in queryset]
+
+@router.get("/menu-items/{item_id}/", response=MenuItemOut)
+async def get_menu_item(request, item_id: int):
+    """Get a specific menu item"""
+    return await aget_object_or_404(menu_item_queryset(), id=item_id)
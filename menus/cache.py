@@ -0,0 +1,64 @@
+"""
+Version counters for cached menu responses.
+
+Cached menu payloads are keyed by a per-restaurant version and a global
+version (for the shared lookup tables such as categories and allergens).
+Writes bump the version instead of deleting keys, so invalidation is one
+cache operation no matter how many fragments a restaurant has. Bumps run
+on transaction commit: bumping earlier would let a concurrent reader cache
+the pre-commit rows under the new version.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+GLOBAL_VERSION_KEY = 'menus:version:global'
+
+
+def _restaurant_version_key(restaurant_id):
+    return f'menus:version:{restaurant_id}'
+
+
+def _initial_version():
+    # Seeded from the clock so an evicted counter never restarts at a value
+    # that older cached fragments were written under.
+    return int(time.time() * 1000)
+
+
+def get_menu_versions(restaurant_id):
+    """Return the (global, restaurant) version pair used in cache keys."""
+    restaurant_key = _restaurant_version_key(restaurant_id)
+    versions = cache.get_many([GLOBAL_VERSION_KEY, restaurant_key])
+    for key in (GLOBAL_VERSION_KEY, restaurant_key):
+        if key not in versions:
+            cache.add(key, _initial_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return versions[GLOBAL_VERSION_KEY], versions[restaurant_key]
+
+
+def menu_cache_key(kind, restaurant_id):
+    global_version, restaurant_version = get_menu_versions(restaurant_id)
+    return f'menus:{kind}:{restaurant_id}:{global_version}:{restaurant_version}'
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=None)
+
+
+def bump_menu_version(*restaurant_ids):
+    """Invalidate every cached menu fragment of the given restaurants."""
+    keys = [_restaurant_version_key(restaurant_id) for restaurant_id in set(restaurant_ids)]
+
+    def bump():
+        for key in keys:
+            _bump(key)
+    transaction.on_commit(bump)
+
+
+def bump_global_menu_version():
+    """Invalidate cached menu fragments of every restaurant."""
+    transaction.on_commit(lambda: _bump(GLOBAL_VERSION_KEY))
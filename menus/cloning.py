@@ -0,0 +1,131 @@
+"""
+Copy a restaurant's menu to other restaurants of the same owner.
+
+Every table is copied with one bulk_create over all targets, so the number of
+queries depends on the number of tables, not on items x targets. The new
+primary keys come back from bulk_create in input order, which is how source
+ids are remapped to the copies (item -> portions -> prices, item -> tags).
+Images are not copied; they still belong to the source restaurant's items.
+"""
+from django.db import transaction
+
+from .cache import bump_menu_version
+from .models import (
+    MenuDesign, MenuDesignCategory, MenuDesignPricing, MenuItem, MenuItemPortion, MenuItemPrice
+)
+
+BATCH_SIZE = 1000
+
+TAG_RELATIONS = (
+    (MenuItem.dietary_requirements.through, 'dietaryrequirement_id'),
+    (MenuItem.religious_restrictions.through, 'religiousrestriction_id'),
+    (MenuItem.allergens.through, 'allergen_id'),
+)
+
+
+class MenuCloneError(Exception):
+    pass
+
+
+def _copy(instance, **changes):
+    """Unsaved copy of a model instance with some fields replaced"""
+    values = {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+        if not field.primary_key
+    }
+    values.update(changes)
+    return type(instance)(**values)
+
+
+def _clone_rows(rows, target_ids, **parents):
+    """bulk_create a copy of `rows` for every target and map (target, source id) to the copy
+
+    Each entry of `parents` maps a foreign key attname to a
+    {(target, source id): copy} dict from an earlier step.
+    """
+    if not rows:
+        return {}
+    model = type(rows[0])
+    scoped = any(field.attname == 'restaurant_id' for field in model._meta.concrete_fields)
+
+    keys = []
+    copies = []
+    for target_id in target_ids:
+        for row in rows:
+            changes = {
+                attname: mapping[target_id, getattr(row, attname)].id
+                for attname, mapping in parents.items()
+                if getattr(row, attname) is not None
+            }
+            if scoped:
+                changes['restaurant_id'] = target_id
+            keys.append((target_id, row.id))
+            copies.append(_copy(row, **changes))
+    model.objects.bulk_create(copies, batch_size=BATCH_SIZE)
+    return dict(zip(keys, copies))
+
+
+def clone_menu(source_restaurant_id, target_restaurant_ids, replace=False):
+    """Copy the menu design, items, portions, prices and tags to the targets
+
+    Targets that already have a menu are rejected unless `replace` is set,
+    in which case their current items are soft-deleted and design replaced.
+    """
+    target_ids = sorted(set(target_restaurant_ids) - {source_restaurant_id})
+    if not target_ids:
+        raise MenuCloneError("No target restaurants to clone to")
+
+    with transaction.atomic():
+        existing = (
+            set(MenuDesign.objects.filter(restaurant_id__in=target_ids).values_list('restaurant_id', flat=True))
+            | set(MenuItem.objects.filter(restaurant_id__in=target_ids).values_list('restaurant_id', flat=True))
+        )
+        if existing and not replace:
+            raise MenuCloneError(f"Restaurants already have a menu: {sorted(existing)}")
+        if existing:
+            MenuItem.objects.filter(restaurant_id__in=existing).soft_delete()
+            MenuDesign.objects.filter(restaurant_id__in=existing).delete()
+
+        designs = {}
+        design = MenuDesign.objects.filter(restaurant_id=source_restaurant_id).first()
+        if design:
+            designs = _clone_rows([design], target_ids)
+            _clone_rows(list(MenuDesignCategory.objects.filter(menu_design=design)), target_ids,
+                        menu_design_id=designs)
+            _clone_rows(list(MenuDesignPricing.objects.filter(menu_design=design)), target_ids,
+                        menu_design_id=designs)
+
+        source_items = MenuItem.objects.filter(restaurant_id=source_restaurant_id)
+        items = _clone_rows(list(source_items.order_by('id')), target_ids)
+        portions = _clone_rows(
+            list(MenuItemPortion.objects.filter(menu_item__in=source_items).order_by('id')),
+            target_ids, menu_item_id=items,
+        )
+        prices = _clone_rows(
+            list(MenuItemPrice.objects.filter(menu_item__in=source_items).order_by('id')),
+            target_ids, menu_item_id=items, portion_id=portions,
+        )
+
+        tags = 0
+        for through, tag_field in TAG_RELATIONS:
+            rows = list(through.objects
+                        .filter(menuitem__in=source_items)
+                        .values_list('menuitem_id', tag_field))
+            links = through.objects.bulk_create([
+                through(menuitem_id=items[target_id, item_id].id, **{tag_field: tag_id})
+                for target_id in target_ids
+                for item_id, tag_id in rows
+            ], batch_size=BATCH_SIZE)
+            tags += len(links)
+
+        bump_menu_version(*target_ids)
+
+    return {
+        'restaurants': len(target_ids),
+        'menu_designs': len(designs),
+        'menu_items': len(items),
+        'portions': len(portions),
+        'prices': len(prices),
+        'tags': tags,
+    }
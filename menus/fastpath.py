@@ -0,0 +1,215 @@
+"""
+Trusted fast path for the menus read endpoints.
+
+Enabled with `MENUS_TRUSTED_SERIALIZATION = True`. Instead of loading model
+instances and letting pydantic validate MenuItemOut/MenuDesignOut attribute
+by attribute, the payload is assembled from `.values()` rows, which the
+server wrote itself and which already have the schema's shape. Restaurant
+scoped payloads are cached pre-encoded and keyed by the menu version from
+`menus.cache`, so a warm request is one cache read.
+
+The endpoints keep their `response=` declarations, so the OpenAPI schema is
+unchanged; only the runtime path differs.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.http import HttpResponse
+
+from RestaurantReviews.renderers import NinjaFastJSONRenderer, dumps
+from .cache import menu_cache_key
+from .models import (
+    MenuCategory, PricingTitle, MenuDesign, MenuDesignCategory, MenuDesignPricing,
+    MenuItem, MenuItemPortion, MenuItemPrice, MenuItemImage
+)
+
+renderer = NinjaFastJSONRenderer()
+
+CATEGORY_FIELDS = ('id', 'name', 'code', 'description', 'special_notes', 'is_active')
+PRICING_TITLE_FIELDS = ('id', 'name', 'code', 'description', 'display_order', 'is_active')
+
+
+def json_response(body, status=200):
+    return HttpResponse(
+        body, status=status,
+        content_type=f"{renderer.media_type}; charset={renderer.charset}"
+    )
+
+
+def encode(data):
+    return dumps(data, renderer.encoder_class)
+
+
+def cached_body(kind, restaurant_id, build):
+    """Return the encoded payload for `kind`, building it on a cache miss.
+
+    `build` may return None (e.g. no active design), which is not cached.
+    """
+    key = menu_cache_key(kind, restaurant_id)
+    body = cache.get(key)
+    if body is None:
+        data = build()
+        if data is None:
+            return None
+        body = encode(data)
+        cache.set(key, body, getattr(settings, 'MENUS_CACHE_TIMEOUT', 300))
+    return body
+
+
+def category_rows(queryset):
+    return list(queryset.values(*CATEGORY_FIELDS))
+
+
+def pricing_title_rows(queryset):
+    return list(queryset.values(*PRICING_TITLE_FIELDS))
+
+
+def menu_design_data(restaurant_id):
+    design = (MenuDesign.objects
+              .filter(restaurant_id=restaurant_id, is_active=True, restaurant__is_deleted=False)
+              .values('id', 'is_multiple_pricing')
+              .first())
+    if design is None:
+        return None
+
+    design['categories'] = [
+        {'id': category_id, 'name': name}
+        for category_id, name in MenuDesignCategory.objects
+        .filter(menu_design_id=design['id'])
+        .values_list('category_id', 'category__name')
+    ]
+    design['pricing_titles'] = [
+        {'id': title_id, 'name': name}
+        for title_id, name in MenuDesignPricing.objects
+        .filter(menu_design_id=design['id'])
+        .values_list('pricing_title_id', 'pricing_title__name')
+    ]
+    return design
+
+
+def menu_item_rows(queryset):
+    """Build MenuItemOut-shaped dicts with one query per relation."""
+    items = list(queryset.values(
+        'id', 'restaurant_id', 'menu_category__name', 'name', 'description',
+        'spice_level__name', 'has_multiple_portions', 'display_order',
+        'is_active', 'created_at', 'updated_at',
+    ))
+    if not items:
+        return []
+
+    ids = [item['id'] for item in items]
+    tags = {
+        'dietary_requirements': _tag_names(
+            MenuItem.dietary_requirements.through, 'dietaryrequirement',
+            ids, ('display_order', 'name')),
+        'religious_restrictions': _tag_names(
+            MenuItem.religious_restrictions.through, 'religiousrestriction', ids, ('name',)),
+        'allergens': _tag_names(MenuItem.allergens.through, 'allergen', ids, ('name',)),
+    }
+
+    portions_by_id = {}
+    portions = defaultdict(list)
+    for row in (MenuItemPortion.objects.filter(menu_item_id__in=ids)
+                .values('id', 'menu_item_id', 'portion_size__name', 'quantity', 'display_order')):
+        portion = {
+            'id': row['id'],
+            'portion_size': row['portion_size__name'],
+            'quantity': row['quantity'],
+            'display_order': row['display_order'],
+        }
+        portions_by_id[row['id']] = portion
+        portions[row['menu_item_id']].append(portion)
+
+    prices = defaultdict(list)
+    for row in (MenuItemPrice.objects.filter(menu_item_id__in=ids).order_by('id')
+                .values('id', 'menu_item_id', 'portion_id', 'pricing_title__name', 'price')):
+        prices[row['menu_item_id']].append({
+            'id': row['id'],
+            'portion': portions_by_id.get(row['portion_id']),
+            'pricing_title': row['pricing_title__name'],
+            'price': float(row['price']),
+        })
+
+    images = defaultdict(list)
+    for row in (MenuItemImage.objects.filter(menu_item_id__in=ids)
+                .values('id', 'menu_item_id', 'image', 'display_order')):
+        images[row['menu_item_id']].append({
+            'id': row['id'],
+            'image': default_storage.url(row['image']),
+            'display_order': row['display_order'],
+        })
+
+    return [
+        {
+            'id': item['id'],
+            'restaurant_id': item['restaurant_id'],
+            'menu_category': item['menu_category__name'],
+            'name': item['name'],
+            'description': item['description'],
+            'spice_level': item['spice_level__name'],
+            'dietary_requirements': tags['dietary_requirements'][item['id']],
+            'religious_restrictions': tags['religious_restrictions'][item['id']],
+            'allergens': tags['allergens'][item['id']],
+            'has_multiple_portions': item['has_multiple_portions'],
+            'portions': portions[item['id']],
+            'prices': prices[item['id']],
+            'images': images[item['id']],
+            'display_order': item['display_order'],
+            'is_active': item['is_active'],
+            'created_at': item['created_at'],
+            'updated_at': item['updated_at'],
+        }
+        for item in items
+    ]
+
+
+def _tag_names(through, target, item_ids, ordering):
+    names = defaultdict(list)
+    rows = (through.objects
+            .filter(menuitem_id__in=item_ids)
+            .order_by(*[f'{target}__{field}' for field in ordering])
+            .values_list('menuitem_id', f'{target}__name'))
+    for item_id, name in rows:
+        names[item_id].append(name)
+    return names
+
+
+# Endpoint bodies
+
+def list_categories_response():
+    return json_response(encode(category_rows(MenuCategory.objects.filter(is_active=True))))
+
+
+def list_pricing_titles_response():
+    return json_response(encode(pricing_title_rows(PricingTitle.objects.filter(is_active=True))))
+
+
+def restaurant_pricing_titles_response(queryset, restaurant_id):
+    return json_response(cached_body(
+        'pricing-titles', restaurant_id, lambda: pricing_title_rows(queryset)
+    ))
+
+
+def menu_design_response(restaurant_id):
+    body = cached_body('design', restaurant_id, lambda: menu_design_data(restaurant_id))
+    if body is None:
+        return None
+    return json_response(body)
+
+
+def menu_items_response(restaurant_id=None):
+    if restaurant_id:
+        queryset = MenuItem.objects.filter(restaurant_id=restaurant_id)
+        body = cached_body('items', restaurant_id, lambda: menu_item_rows(queryset))
+    else:
+        body = encode(menu_item_rows(MenuItem.objects.all()))
+    return json_response(body)
+
+
+def menu_item_response(item_id):
+    rows = menu_item_rows(MenuItem.objects.filter(id=item_id))
+    if not rows:
+        return None
+    return json_response(encode(rows[0]))
@@ -0,0 +1,195 @@
+import json
+import random
+import re
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from menus.models import (
+    MenuCategory, PricingTitle, MenuDesign, MenuDesignCategory, MenuDesignPricing,
+    PortionSize, MenuItem, MenuItemPortion, MenuItemPrice
+)
+from restaurants.models import Restaurant
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the hot menus/restaurants endpoints, capture their SQL and record "
+        "EXPLAIN output and timings. With --seed a synthetic dataset is created "
+        "inside a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true', help='Create a rolled-back synthetic dataset')
+        parser.add_argument('--restaurants', type=int, default=2000)
+        parser.add_argument('--owners', type=int, default=200)
+        parser.add_argument('--items', type=int, default=60, help='Menu items per restaurant')
+        parser.add_argument('--restaurant', type=int, help='Restaurant id to probe (default: a seeded one)')
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--output', help='Write the plans and timings as JSON to this file')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['seed']:
+                restaurant = self.seed(options)
+            else:
+                restaurant = Restaurant.objects.get(pk=options['restaurant'])
+            report = self.audit(restaurant, options['runs'])
+            transaction.set_rollback(True)
+
+        for entry in report:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{entry['endpoint']}  median {entry['median_ms']:.2f} ms, "
+                f"{sum(query['count'] for query in entry['queries'])} queries"
+            ))
+            for query in entry['queries']:
+                self.stdout.write(f"  [{query['ms']:.2f} ms x{query['count']}] {query['sql'][:160]}")
+                for line in query['plan']:
+                    self.stdout.write(f"      {line}")
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def endpoints(self, restaurant):
+        item = MenuItem.objects.filter(restaurant=restaurant).first()
+        owner_token = str(RefreshToken.for_user(restaurant.owner).access_token)
+        return [
+            ('menu items by restaurant', f'/api/menus/menu-items/?restaurant_id={restaurant.id}', {}),
+            ('menu item detail', f'/api/menus/menu-items/{item.id}/', {}),
+            ('menu design', f'/api/menus/menu-designs/{restaurant.id}/', {}),
+            ('restaurant pricing titles', f'/api/menus/menu-designs/{restaurant.id}/pricing-titles/', {}),
+            ('approved restaurants', '/api/restaurants/', {}),
+            ('owner restaurants', '/api/restaurants/', {'HTTP_AUTHORIZATION': f'Bearer {owner_token}'}),
+        ]
+
+    def audit(self, restaurant, runs):
+        client = Client(HTTP_HOST='localhost')
+        report = []
+        for name, url, headers in self.endpoints(restaurant):
+            client.get(url, **headers)
+            timings = []
+            for _ in range(runs):
+                # CaptureQueriesContext slices the bounded query log, which
+                # comes back empty once the log is full
+                reset_queries()
+                started = time.perf_counter()
+                with CaptureQueriesContext(connection) as captured:
+                    response = client.get(url, **headers)
+                timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, (url, response.status_code)
+
+            # Explain each distinct query shape once; N+1 loops repeat the
+            # same statement with different ids
+            queries = {}
+            for query in captured.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                shape = re.sub(r'\b\d+\b', '?', sql)
+                if shape in queries:
+                    queries[shape]['count'] += 1
+                    continue
+                queries[shape] = {
+                    'sql': sql,
+                    'count': 1,
+                    'ms': self.time_query(sql),
+                    'plan': self.explain(sql),
+                }
+            report.append({
+                'endpoint': name,
+                'url': url,
+                'median_ms': statistics.median(timings),
+                'queries': list(queries.values()),
+            })
+        return report
+
+    def time_query(self, sql, repeat=5):
+        best = None
+        with connection.cursor() as cursor:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                cursor.execute(sql)
+                cursor.fetchall()
+                elapsed = (time.perf_counter() - started) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def explain(self, sql):
+        if connection.vendor == 'postgresql':
+            prefix = 'EXPLAIN (ANALYZE, BUFFERS)'
+        elif connection.vendor == 'sqlite':
+            prefix = 'EXPLAIN QUERY PLAN'
+        else:
+            prefix = 'EXPLAIN'
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}')
+            return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+
+    def seed(self, options):
+        rng = random.Random(42)
+        now = timezone.now()
+        owners = User.objects.bulk_create([
+            User(username=f'audit-owner-{index}', email=f'audit-owner-{index}@example.com',
+                 user_type='OWNER')
+            for index in range(options['owners'])
+        ])
+        restaurants = Restaurant.objects.bulk_create([
+            Restaurant(
+                owner=owners[index % len(owners)], name=f'Audit Restaurant {index}',
+                phone='0200000000', email=f'audit-{index}@example.com', country='Australia',
+                street_address=f'{index} George St', city=rng.choice(['Sydney', 'Melbourne', 'Perth']),
+                state='NSW', postal_code='2000', is_approved=rng.random() < 0.1,
+            )
+            for index in range(options['restaurants'])
+        ])
+        # Spread creation times so created_at ordering is meaningful
+        for index, restaurant in enumerate(restaurants):
+            restaurant.created_at = now - timedelta(minutes=index)
+        Restaurant.objects.bulk_update(restaurants, ['created_at'])
+
+        categories = [MenuCategory.objects.create(name=f'Audit Category {index}') for index in range(8)]
+        titles = [PricingTitle.objects.create(name=f'Audit Title {index}') for index in range(3)]
+        size = PortionSize.objects.create(name='Audit Large', code='audit-large')
+
+        designs = MenuDesign.objects.bulk_create([
+            MenuDesign(restaurant=restaurant, is_multiple_pricing=True)
+            for restaurant in restaurants
+        ])
+        MenuDesignCategory.objects.bulk_create([
+            MenuDesignCategory(menu_design=design, category=category, display_order=order)
+            for design in designs for order, category in enumerate(categories)
+        ])
+        MenuDesignPricing.objects.bulk_create([
+            MenuDesignPricing(menu_design=design, pricing_title=title, display_order=order)
+            for design in designs for order, title in enumerate(titles)
+        ])
+
+        items = MenuItem.objects.bulk_create([
+            MenuItem(
+                restaurant=restaurant, menu_category=rng.choice(categories),
+                name=f'Dish {index}', description='Audit dish', display_order=index,
+            )
+            for restaurant in restaurants for index in range(options['items'])
+        ], batch_size=5000)
+        portions = MenuItemPortion.objects.bulk_create([
+            MenuItemPortion(menu_item=item, portion_size=size, quantity=2) for item in items
+        ], batch_size=5000)
+        MenuItemPrice.objects.bulk_create([
+            MenuItemPrice(menu_item=portion.menu_item, portion=portion, pricing_title=title,
+                          price=Decimal('9.50') + order)
+            for portion in portions for order, title in enumerate(titles)
+        ], batch_size=5000)
+
+        approved = [restaurant for restaurant in restaurants if restaurant.is_approved]
+        return approved[len(approved) // 2]
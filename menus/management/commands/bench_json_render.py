@@ -0,0 +1,91 @@
+import timeit
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils import timezone
+from ninja.renderers import JSONRenderer as NinjaJSONRenderer
+from rest_framework.renderers import JSONRenderer
+
+from RestaurantReviews.renderers import FastJSONRenderer, NinjaFastJSONRenderer
+
+
+class Command(BaseCommand):
+    help = "Benchmark JSON encode time for a list of MenuItemOut payloads with the stdlib and fast renderers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        items = build_menu_items(options['items'])
+        # ninja hands its renderer MenuItemOut dumps, where price is a float
+        ninja_payload = [
+            {**item, 'prices': [{**price, 'price': float(price['price'])} for price in item['prices']]}
+            for item in items
+        ]
+        drf_payload = items
+
+        repeat = options['repeat']
+        ninja_stdlib = NinjaJSONRenderer()
+        ninja_fast = NinjaFastJSONRenderer()
+        drf_stdlib = JSONRenderer()
+        drf_fast = FastJSONRenderer()
+
+        cases = [
+            ('ninja stdlib', None, lambda: ninja_stdlib.render(None, ninja_payload, response_status=200)),
+            ('ninja fast', 'orjson', lambda: ninja_fast.render(None, ninja_payload, response_status=200)),
+            ('ninja fast', 'json', lambda: ninja_fast.render(None, ninja_payload, response_status=200)),
+            ('drf stdlib', None, lambda: drf_stdlib.render(drf_payload)),
+            ('drf fast', 'orjson', lambda: drf_fast.render(drf_payload)),
+            ('drf fast', 'json', lambda: drf_fast.render(drf_payload)),
+        ]
+
+        self.stdout.write(f"{options['items']} MenuItemOut items, best of {repeat} runs")
+        for label, backend, render in cases:
+            with override_settings(JSON_RENDERER_BACKEND=backend or 'json'):
+                best = min(timeit.repeat(render, number=1, repeat=repeat))
+                size = len(render())
+            name = f'{label} ({backend})' if backend else label
+            self.stdout.write(f"{name:<24} {best * 1000:>8.2f} ms  {size:>9} bytes")
+
+
+def build_menu_items(count):
+    now = timezone.now()
+    items = []
+    for index in range(count):
+        portions = [
+            {'id': index * 3 + offset, 'portion_size': size, 'quantity': offset + 2, 'display_order': offset}
+            for offset, size in enumerate(('Small', 'Regular', 'Large'))
+        ]
+        items.append({
+            'id': index,
+            'restaurant_id': 1,
+            'menu_category': 'Mains',
+            'name': f'Menu item {index}',
+            'description': 'Slow cooked with garlic, chilli and seasonal vegetables.',
+            'spice_level': 'Medium',
+            'dietary_requirements': ['Vegetarian', 'Gluten Free'],
+            'religious_restrictions': ['Halal'],
+            'allergens': ['Peanuts', 'Soy'],
+            'has_multiple_portions': True,
+            'portions': portions,
+            'prices': [
+                {
+                    'id': index * 6 + position,
+                    'portion': portion,
+                    'pricing_title': title,
+                    'price': Decimal('12.50') + Decimal(position),
+                }
+                for position, (portion, title) in enumerate(
+                    (portion, title) for portion in portions for title in ('Dine In', 'Takeaway')
+                )
+            ],
+            'images': [{'id': index, 'image': f'/media/menu_items/{index}.jpg', 'display_order': 0}],
+            'display_order': index,
+            'is_active': True,
+            'created_at': now - timedelta(days=index),
+            'updated_at': now,
+        })
+    return items
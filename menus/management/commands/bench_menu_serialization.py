@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from menus.cache import bump_menu_version
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput of the menus read endpoints with schema validation "
+        "and with MENUS_TRUSTED_SERIALIZATION (cold and warm cache)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant', type=int, required=True,
+                            help='Restaurant id with an active menu design and items')
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        restaurant_id = options['restaurant']
+        total = options['requests']
+        client = Client(HTTP_HOST='localhost')
+        paths = [
+            f'/api/menus/menu-items/?restaurant_id={restaurant_id}',
+            f'/api/menus/menu-designs/{restaurant_id}/',
+            f'/api/menus/menu-designs/{restaurant_id}/pricing-titles/',
+        ]
+
+        self.stdout.write(f"{'endpoint':<52} {'mode':<14} {'req/s':>9} {'ms/req':>8}")
+        for path in paths:
+            modes = [
+                ('schema', False, False),
+                ('trusted cold', True, True),
+                ('trusted warm', True, False),
+            ]
+            for label, trusted, cold in modes:
+                with override_settings(MENUS_TRUSTED_SERIALIZATION=trusted):
+                    client.get(path)  # warm up imports and the cache
+                    started = time.perf_counter()
+                    for _ in range(total):
+                        if cold:
+                            bump_menu_version(restaurant_id)
+                        response = client.get(path)
+                        assert response.status_code == 200, response.content
+                    elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{path:<52} {label:<14} {total / elapsed:>9.1f} {elapsed / total * 1000:>8.2f}"
+                )
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare req/s and latency of the sync and async menus read endpoints "
+        "against a running ASGI server, e.g. "
+        "`uvicorn RestaurantReviews.asgi:application --workers 1`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--restaurant', type=int, required=True,
+                            help='Restaurant id with an active menu design')
+        parser.add_argument('--item', type=int, required=True, help='Menu item id')
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--concurrency', type=int, default=256)
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['base_url'])
+        if url.scheme != 'http':
+            raise CommandError('Only plain http:// targets are supported')
+
+        restaurant_id = options['restaurant']
+        paths = [
+            '/menus/categories/',
+            '/menus/pricing-titles/',
+            f'/menus/menu-designs/{restaurant_id}/',
+            f'/menus/menu-designs/{restaurant_id}/pricing-titles/',
+            f'/menus/menu-items/?restaurant_id={restaurant_id}',
+            f'/menus/menu-items/{options["item"]}/',
+        ]
+
+        self.stdout.write(f"{'endpoint':<48} {'mode':<6} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for path in paths:
+            for mode, prefix in (('sync', '/api'), ('async', '/api/async')):
+                stats = asyncio.run(run_load(
+                    url.hostname, url.port or 80, prefix + path,
+                    options['requests'], options['concurrency'],
+                ))
+                self.stdout.write(
+                    f"{path:<48} {mode:<6} {stats['rps']:>9.1f} "
+                    f"{stats['p50']:>8.1f} {stats['p99']:>8.1f} {stats['errors']:>7}"
+                )
+
+
+async def run_load(host, port, path, total, concurrency):
+    """Fire `total` keep-alive GETs over `concurrency` connections."""
+    request = (
+        f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: application/json\r\n\r\n"
+    ).encode()
+    remaining = [total]
+    latencies = []
+    errors = [0]
+
+    async def worker():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                started = time.perf_counter()
+                writer.write(request)
+                status = await read_response(reader)
+                latencies.append(time.perf_counter() - started)
+                if status != 200:
+                    errors[0] += 1
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50': latencies[len(latencies) // 2] * 1000,
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        'errors': errors[0],
+    }
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    status = int(status_line.split()[1])
+    length = 0
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.5 on 2026-10-19 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menus', '0002_menudesign_is_active'),
+        ('restaurants', '0002_alter_restaurant_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='menuitem',
+            options={'ordering': ['menu_category_id', 'display_order', 'name'], 'verbose_name': 'Menu Item', 'verbose_name_plural': 'Menu Items'},
+        ),
+        migrations.AddIndex(
+            model_name='menudesigncategory',
+            index=models.Index(fields=['menu_design', 'display_order'], name='menudesigncat_design_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menudesignpricing',
+            index=models.Index(fields=['menu_design', 'display_order'], name='menudesignprice_design_ord_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['restaurant', 'menu_category', 'display_order', 'name'], name='menuitem_restaurant_order_idx'),
+        ),
+    ]
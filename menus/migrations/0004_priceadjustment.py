@@ -0,0 +1,35 @@
+# Generated by Django 5.1.5 on 2026-10-19 07:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menus', '0003_alter_menuitem_options_and_more'),
+        ('restaurants', '0002_alter_restaurant_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceAdjustment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mode', models.CharField(choices=[('PERCENT', 'Percentage'), ('AMOUNT', 'Fixed amount')], max_length=10)),
+                ('value', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('rounding', models.CharField(choices=[('CENT', 'Nearest 0.01'), ('FIVE_CENTS', 'Nearest 0.05'), ('TEN_CENTS', 'Nearest 0.10'), ('WHOLE', 'Nearest 1.00')], default='CENT', max_length=10)),
+                ('affected_count', models.PositiveIntegerField(default=0)),
+                ('previous_prices', models.JSONField(default=dict, help_text='Prices before the adjustment, as {price: [MenuItemPrice ids]}')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('undone_at', models.DateTimeField(blank=True, null=True)),
+                ('menu_category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='menus.menucategory')),
+                ('pricing_title', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='menus.pricingtitle')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_adjustments', to='restaurants.restaurant')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['restaurant', '-created_at'], name='priceadjust_restaurant_idx')],
+            },
+        ),
+    ]
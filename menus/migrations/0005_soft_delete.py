@@ -0,0 +1,36 @@
+# Generated by Django 5.1.5 on 2026-10-19 07:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menus', '0004_priceadjustment'),
+        ('restaurants', '0003_soft_delete'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='menuitem',
+            name='menuitem_restaurant_order_idx',
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['restaurant', 'menu_category', 'display_order', 'name'], name='menuitem_restaurant_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at'], name='menuitem_purge_idx'),
+        ),
+    ]
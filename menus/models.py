@@ -1,7 +1,9 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 from restaurants.models import Restaurant
 from django.core.validators import MinValueValidator, MaxValueValidator
+from RestaurantReviews.softdelete import SoftDeleteManager
 
 # Create your models here.
 
@@ -81,6 +83,9 @@ class MenuDesignCategory(models.Model):
         ordering = ['display_order']
         verbose_name = "Menu Design Category"
         verbose_name_plural = "Menu Design Categories"
+        indexes = [
+            models.Index(fields=['menu_design', 'display_order'], name='menudesigncat_design_order_idx'),
+        ]
 
     def __str__(self):
         try:
@@ -100,6 +105,9 @@ class MenuDesignPricing(models.Model):
         ordering = ['display_order']
         verbose_name = "Menu Design Pricing"
         verbose_name_plural = "Menu Design Pricing Options"
+        indexes = [
+            models.Index(fields=['menu_design', 'display_order'], name='menudesignprice_design_ord_idx'),
+        ]
 
     def __str__(self):
         return f"{self.pricing_title.name} - {self.menu_design.restaurant.name}"
@@ -195,13 +203,39 @@ class MenuItem(models.Model):
     has_multiple_portions = models.BooleanField(default=False)
     display_order = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
+    is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
+
     class Meta:
-        ordering = ['menu_category', 'display_order', 'name']
+        # Order by the category id rather than 'menu_category', which would
+        # join MenuCategory to sort by its name on every menu query
+        ordering = ['menu_category_id', 'display_order', 'name']
         verbose_name = "Menu Item"
         verbose_name_plural = "Menu Items"
+        indexes = [
+            # Partial on is_deleted, which the default manager always filters on
+            models.Index(
+                fields=['restaurant', 'menu_category', 'display_order', 'name'],
+                condition=models.Q(is_deleted=False),
+                name='menuitem_restaurant_order_idx',
+            ),
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(is_deleted=True),
+                name='menuitem_purge_idx',
+            ),
+        ]
+
+    def soft_delete(self):
+        """Hide the item now; purge_deleted removes it and its rows later"""
+        self.is_deleted = True
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['is_deleted', 'deleted_at'])
 
     def __str__(self):
         return f"{self.name} - {self.restaurant.name}"
@@ -233,3 +267,39 @@ class MenuItemImage(models.Model):
 
     class Meta:
         ordering = ['display_order']
+
+class PriceAdjustment(models.Model):
+    MODE_CHOICES = [
+        ('PERCENT', 'Percentage'),
+        ('AMOUNT', 'Fixed amount'),
+    ]
+
+    ROUNDING_CHOICES = [
+        ('CENT', 'Nearest 0.01'),
+        ('FIVE_CENTS', 'Nearest 0.05'),
+        ('TEN_CENTS', 'Nearest 0.10'),
+        ('WHOLE', 'Nearest 1.00'),
+    ]
+
+    restaurant = models.ForeignKey('restaurants.Restaurant', on_delete=models.CASCADE, related_name='price_adjustments')
+    menu_category = models.ForeignKey(MenuCategory, on_delete=models.SET_NULL, null=True, blank=True)
+    pricing_title = models.ForeignKey(PricingTitle, on_delete=models.SET_NULL, null=True, blank=True)
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES)
+    value = models.DecimalField(max_digits=10, decimal_places=2)
+    rounding = models.CharField(max_length=10, choices=ROUNDING_CHOICES, default='CENT')
+    affected_count = models.PositiveIntegerField(default=0)
+    previous_prices = models.JSONField(
+        default=dict,
+        help_text="Prices before the adjustment, as {price: [MenuItemPrice ids]}"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    undone_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['restaurant', '-created_at'], name='priceadjust_restaurant_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_mode_display()} {self.value} - {self.restaurant.name}"
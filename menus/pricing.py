@@ -0,0 +1,127 @@
+"""
+Bulk price adjustments for a restaurant's menu.
+
+An adjustment is a single UPDATE over the matching MenuItemPrice rows, with
+the new price computed and rounded in SQL. Previous prices are stored on the
+PriceAdjustment grouped by value ({"12.50": [ids]}), which is much smaller
+than one entry per row since menus reuse the same handful of price points,
+and lets undo restore them with one CASE ... WHEN UPDATE.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Value, When
+from django.db.models.functions import Greatest, Round
+from django.utils import timezone
+
+from .cache import bump_menu_version
+from .models import MenuItemPrice, PriceAdjustment
+
+ROUNDING_STEPS = {
+    'CENT': Decimal('0.01'),
+    'FIVE_CENTS': Decimal('0.05'),
+    'TEN_CENTS': Decimal('0.10'),
+    'WHOLE': Decimal('1.00'),
+}
+
+PRICE_FIELD = DecimalField(max_digits=10, decimal_places=2)
+# Percentage factors keep their fractional digits: 12.5% is 1.125, not 1.13
+FACTOR_FIELD = DecimalField(max_digits=12, decimal_places=6)
+
+
+class PriceAdjustmentError(Exception):
+    pass
+
+
+def _price_queryset(restaurant_id, menu_category_id=None, pricing_title_id=None):
+    queryset = MenuItemPrice.objects.filter(
+        menu_item__restaurant_id=restaurant_id, menu_item__is_deleted=False
+    )
+    if menu_category_id:
+        queryset = queryset.filter(menu_item__menu_category_id=menu_category_id)
+    if pricing_title_id:
+        queryset = queryset.filter(pricing_title_id=pricing_title_id)
+    return queryset
+
+
+def adjusted_price_expression(mode, value, rounding):
+    """SQL expression for the new price: adjust, round to the step, floor at 0"""
+    value = Decimal(str(value))
+    if mode == 'PERCENT':
+        raw = F('price') * Value((Decimal(100) + value) / Decimal(100), output_field=FACTOR_FIELD)
+    else:
+        raw = F('price') + Value(value, output_field=PRICE_FIELD)
+
+    step = ROUNDING_STEPS[rounding]
+    rounded = Round(ExpressionWrapper(raw / Value(step), output_field=PRICE_FIELD)) * Value(step)
+    return Greatest(
+        ExpressionWrapper(rounded, output_field=PRICE_FIELD),
+        Value(Decimal('0.00'), output_field=PRICE_FIELD),
+        output_field=PRICE_FIELD,
+    )
+
+
+def adjust_prices(restaurant_id, mode, value, rounding='CENT',
+                  menu_category_id=None, pricing_title_id=None):
+    """Apply a percentage or fixed-amount change to the matching prices"""
+    if mode not in ('PERCENT', 'AMOUNT'):
+        raise PriceAdjustmentError(f"Unknown mode: {mode}")
+    if rounding not in ROUNDING_STEPS:
+        raise PriceAdjustmentError(f"Unknown rounding: {rounding}")
+
+    queryset = _price_queryset(restaurant_id, menu_category_id, pricing_title_id)
+    with transaction.atomic():
+        # Lock the rows so the snapshot matches exactly what the UPDATE changes
+        previous = defaultdict(list)
+        for price_id, price in queryset.select_for_update().values_list('id', 'price').order_by('id'):
+            previous[str(price)].append(price_id)
+
+        updated = 0
+        if previous:
+            updated = queryset.update(price=adjusted_price_expression(mode, value, rounding))
+            bump_menu_version(restaurant_id)
+
+        return PriceAdjustment.objects.create(
+            restaurant_id=restaurant_id,
+            menu_category_id=menu_category_id,
+            pricing_title_id=pricing_title_id,
+            mode=mode,
+            value=value,
+            rounding=rounding,
+            affected_count=updated,
+            previous_prices=dict(previous),
+        )
+
+
+def undo_price_adjustment(adjustment_id):
+    """Restore the prices recorded by an adjustment
+
+    Only the restaurant's most recent adjustment can be undone, otherwise a
+    later adjustment's changes would be silently overwritten.
+    """
+    with transaction.atomic():
+        adjustment = PriceAdjustment.objects.select_for_update().get(id=adjustment_id)
+        if adjustment.undone_at:
+            raise PriceAdjustmentError("This price adjustment has already been undone")
+        latest = (PriceAdjustment.objects
+                  .filter(restaurant_id=adjustment.restaurant_id, undone_at__isnull=True)
+                  .order_by('-created_at', '-id')
+                  .values_list('id', flat=True)
+                  .first())
+        if latest != adjustment.id:
+            raise PriceAdjustmentError("Only the most recent price adjustment can be undone")
+
+        groups = adjustment.previous_prices
+        ids = [price_id for price_ids in groups.values() for price_id in price_ids]
+        if ids:
+            MenuItemPrice.objects.filter(id__in=ids).update(price=Case(
+                *[When(id__in=price_ids, then=Value(Decimal(price)))
+                  for price, price_ids in groups.items()],
+                output_field=PRICE_FIELD,
+            ))
+            bump_menu_version(adjustment.restaurant_id)
+
+        adjustment.undone_at = timezone.now()
+        adjustment.save(update_fields=['undone_at'])
+        return adjustment
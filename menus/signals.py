@@ -0,0 +1,61 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import (
+    MenuCategory, PricingTitle, MenuDesign, MenuDesignCategory, MenuDesignPricing,
+    SpiceLevel, DietaryRequirement, ReligiousRestriction, Allergen, PortionSize,
+    MenuItem, MenuItemPortion, MenuItemPrice, MenuItemImage
+)
+from .cache import bump_menu_version, bump_global_menu_version
+from restaurants.models import Restaurant
+
+SHARED_MODELS = (
+    MenuCategory, PricingTitle, SpiceLevel, DietaryRequirement,
+    ReligiousRestriction, Allergen, PortionSize,
+)
+
+
+def _restaurant_id(instance):
+    """Find the restaurant a menu row belongs to"""
+    if isinstance(instance, (MenuItem, MenuDesign)):
+        return instance.restaurant_id
+    if isinstance(instance, (MenuDesignCategory, MenuDesignPricing)):
+        return instance.menu_design.restaurant_id
+    return instance.menu_item.restaurant_id
+
+
+@receiver([post_save, post_delete])
+def invalidate_menu_cache(sender, instance, **kwargs):
+    """
+    Bump the cached menu version when a menu row changes
+    """
+    if sender in SHARED_MODELS:
+        bump_global_menu_version()
+    elif sender in (MenuItem, MenuItemPortion, MenuItemPrice, MenuItemImage,
+                    MenuDesign, MenuDesignCategory, MenuDesignPricing):
+        try:
+            bump_menu_version(_restaurant_id(instance))
+        except (MenuItem.DoesNotExist, MenuDesign.DoesNotExist):
+            # Parent already gone in a cascade; its own signal covers it
+            pass
+
+
+@receiver(m2m_changed, sender=MenuItem.dietary_requirements.through)
+@receiver(m2m_changed, sender=MenuItem.religious_restrictions.through)
+@receiver(m2m_changed, sender=MenuItem.allergens.through)
+def invalidate_menu_item_tags(sender, instance, action, reverse, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        bump_global_menu_version()
+    else:
+        bump_menu_version(instance.restaurant_id)
+
+
+@receiver(post_save, sender=Restaurant)
+def hide_deleted_restaurant_menu(sender, instance, **kwargs):
+    """
+    Soft-delete the menu items of a soft-deleted restaurant
+    """
+    if instance.is_deleted:
+        MenuItem.objects.filter(restaurant=instance).soft_delete()
+        bump_menu_version(instance.id)
@@ -1,3 +1,461 @@
-from django.test import TestCase
+import json
+from decimal import Decimal
+from unittest import skipIf
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Value
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from RestaurantReviews import renderers
+from RestaurantReviews.renderers import FastJSONRenderer, NinjaFastJSONRenderer
+from restaurants.models import Restaurant
+from users.models import User
+from .pricing import adjusted_price_expression
+from .models import (
+    MenuCategory, PricingTitle, MenuDesign, MenuDesignCategory, MenuDesignPricing,
+    SpiceLevel, Allergen, PortionSize, MenuItem, MenuItemPortion, MenuItemPrice, PriceAdjustment
+)
+
+
+class MenuTestMixin:
+    """Seed one restaurant with an active, multi-priced menu"""
+
+    @classmethod
+    def create_menu(cls, item_count=3):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'testpass123', user_type='OWNER')
+        cls.restaurant = Restaurant.objects.create(
+            owner=cls.owner, name='Test Bistro', phone='0200000000', email='bistro@example.com',
+            country='Australia', street_address='1 George St', city='Sydney',
+            state='NSW', postal_code='2000'
+        )
+        cls.category = MenuCategory.objects.create(name='Mains')
+        cls.takeaway = PricingTitle.objects.create(name='Takeaway')
+        design = MenuDesign.objects.create(restaurant=cls.restaurant, is_multiple_pricing=True)
+        MenuDesignCategory.objects.create(menu_design=design, category=cls.category)
+        MenuDesignPricing.objects.create(menu_design=design, pricing_title=cls.takeaway)
+
+        spice = SpiceLevel.objects.create(name='Hot')
+        nuts = Allergen.objects.create(name='Nuts', code='nuts')
+        large = PortionSize.objects.create(name='Large', code='large')
+        cls.items = []
+        for index in range(item_count):
+            item = MenuItem.objects.create(
+                restaurant=cls.restaurant, menu_category=cls.category,
+                name=f'Dish {index}', description='Tasty', spice_level=spice,
+                display_order=index
+            )
+            item.allergens.add(nuts)
+            portion = MenuItemPortion.objects.create(menu_item=item, portion_size=large, quantity=2)
+            MenuItemPrice.objects.create(menu_item=item, price=Decimal('10.00'))
+            MenuItemPrice.objects.create(
+                menu_item=item, portion=portion, pricing_title=cls.takeaway, price=Decimal('12.50')
+            )
+            cls.items.append(item)
+
+    def sign_in(self, user):
+        """Send user's access token with every request of self.client"""
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(user).access_token}'
+
+
+@skipIf(renderers.orjson is None, 'orjson is not installed')
+class FastJSONRendererTests(SimpleTestCase):
+    def setUp(self):
+        self.payload = [{
+            'id': 1,
+            'name': 'Café special\u2028',
+            'price': Decimal('12.50'),
+            'created_at': timezone.now(),
+            'tags': ['Halal', 'Vegan'],
+        }]
+
+    def render_both(self, render):
+        with override_settings(JSON_RENDERER_BACKEND='json'):
+            stdlib = render()
+        with override_settings(JSON_RENDERER_BACKEND='orjson'):
+            fast = render()
+        return stdlib, fast
+
+    def test_drf_backends_match(self):
+        renderer = FastJSONRenderer()
+        stdlib, fast = self.render_both(lambda: renderer.render(self.payload))
+        self.assertEqual(stdlib, fast)
+        self.assertIn(b'"price":12.5', fast)
+        self.assertIn(b'\\u2028', fast)
+
+    def test_ninja_backends_match(self):
+        renderer = NinjaFastJSONRenderer()
+        stdlib, fast = self.render_both(
+            lambda: renderer.render(None, self.payload, response_status=200)
+        )
+        self.assertEqual(stdlib, fast)
+        self.assertIn(b'"price":"12.50"', fast)
+        self.assertRegex(fast.decode(), r'"created_at":"[0-9T:.-]+\.\d{3}Z"')
+
+
+class TrustedSerializationTests(MenuTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_menu()
+
+    def setUp(self):
+        cache.clear()
+
+    def get_both(self, url):
+        schema = self.client.get(url)
+        with override_settings(MENUS_TRUSTED_SERIALIZATION=True):
+            trusted = self.client.get(url)
+        self.assertEqual(schema.status_code, trusted.status_code)
+        return json.loads(schema.content), json.loads(trusted.content)
+
+    def test_payloads_match_schema_path(self):
+        restaurant_id = self.restaurant.id
+        for url in [
+            '/api/menus/categories/',
+            '/api/menus/pricing-titles/',
+            f'/api/menus/menu-designs/{restaurant_id}/',
+            f'/api/menus/menu-designs/{restaurant_id}/pricing-titles/',
+            f'/api/menus/menu-items/?restaurant_id={restaurant_id}',
+            f'/api/menus/menu-items/{self.items[0].id}/',
+        ]:
+            with self.subTest(url=url):
+                schema, trusted = self.get_both(url)
+                self.assertEqual(schema, trusted)
+
+    @override_settings(MENUS_TRUSTED_SERIALIZATION=True)
+    def test_cached_menu_is_invalidated_on_write(self):
+        url = f'/api/menus/menu-items/?restaurant_id={self.restaurant.id}'
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.items[0].allergens.clear()
+        payload = json.loads(self.client.get(url).content)
+        self.assertEqual(payload[0]['allergens'], [])
+
+
+class AsyncReadTests(MenuTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_menu()
+
+    async def test_payloads_match_sync_endpoints(self):
+        restaurant_id = self.restaurant.id
+        for path in [
+            'categories/',
+            'pricing-titles/',
+            f'menu-designs/{restaurant_id}/',
+            f'menu-designs/{restaurant_id}/pricing-titles/',
+            f'menu-items/?restaurant_id={restaurant_id}',
+            f'menu-items/{self.items[0].id}/',
+            'menu-designs/0/',
+        ]:
+            with self.subTest(path=path):
+                sync = await self.async_client.get(f'/api/menus/{path}')
+                native = await self.async_client.get(f'/api/async/menus/{path}')
+                self.assertEqual(native.status_code, sync.status_code)
+                self.assertEqual(json.loads(native.content), json.loads(sync.content))
+        design = json.loads((await self.async_client.get(f'/api/async/menus/menu-designs/{restaurant_id}/')).content)
+        self.assertEqual(design['categories'], [{'id': self.category.id, 'name': 'Mains'}])
+
+
+class ReadQueryTests(MenuTestMixin, TestCase):
+    """The menu reads load their relations in a fixed number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_menu()
+
+    def test_menu_design_query_count(self):
+        # Design, then categories and pricing titles with their definitions
+        with self.assertNumQueries(5):
+            response = self.client.get(f'/api/menus/menu-designs/{self.restaurant.id}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_menu_items_query_count_does_not_grow_with_items(self):
+        url = f'/api/menus/menu-items/?restaurant_id={self.restaurant.id}'
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        type(self).create_more_items(5)
+        with self.assertNumQueries(len(few)):
+            response = self.client.get(url)
+        self.assertEqual(len(json.loads(response.content)), 8)
+        with self.assertNumQueries(len(few)):
+            self.client.get(f'/api/menus/menu-items/{self.items[0].id}/')
+        # Sorted by the category id, which the index covers, not the category name
+        self.assertNotIn('"menus_menucategory"."name" ASC', few[0]['sql'])
+        self.assertIn('ORDER BY "menus_menuitem"."menu_category_id" ASC', few[0]['sql'])
+
+    @classmethod
+    def create_more_items(cls, count):
+        for index in range(count):
+            item = MenuItem.objects.create(
+                restaurant=cls.restaurant, menu_category=cls.category, name=f'Extra {index}', description='Tasty',
+                display_order=10 + index,
+            )
+            MenuItemPrice.objects.create(menu_item=item, price=Decimal('9.00'))
+
+    def test_hot_path_indexes_exist(self):
+        with connection.cursor() as cursor:
+            names = {
+                table: connection.introspection.get_constraints(cursor, table)
+                for table in ('menus_menuitem', 'menus_menudesigncategory', 'menus_menudesignpricing')
+            }
+        self.assertIn('menuitem_restaurant_order_idx', names['menus_menuitem'])
+        self.assertIn('menudesigncat_design_order_idx', names['menus_menudesigncategory'])
+        self.assertIn('menudesignprice_design_ord_idx', names['menus_menudesignpricing'])
+
+
+class PriceAdjustmentTests(MenuTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_menu()
+
+    def setUp(self):
+        self.sign_in(self.owner)
+
+    def adjust(self, **payload):
+        payload.setdefault('restaurant_id', self.restaurant.id)
+        return self.client.post('/api/menus/price-adjustments/', payload, content_type='application/json')
+
+    def prices(self):
+        return sorted(MenuItemPrice.objects.values_list('price', flat=True))
+
+    def test_percent_adjustment_rounds_and_can_be_undone(self):
+        response = self.adjust(mode='PERCENT', value=7, rounding='TEN_CENTS')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['affected_count'], 6)
+        # 10.00 * 1.07 = 10.70, 12.50 * 1.07 = 13.375 -> 13.40
+        self.assertEqual(self.prices(), [Decimal('10.70')] * 3 + [Decimal('13.40')] * 3)
+
+        adjustment = PriceAdjustment.objects.get()
+        self.assertEqual(sorted(adjustment.previous_prices), ['10.00', '12.50'])
+
+        response = self.client.post(f'/api/menus/price-adjustments/{adjustment.id}/undo/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.prices(), [Decimal('10.00')] * 3 + [Decimal('12.50')] * 3)
+
+        response = self.client.post(f'/api/menus/price-adjustments/{adjustment.id}/undo/')
+        self.assertEqual(response.status_code, 409)
+
+    def test_fractional_percentage_is_not_rounded(self):
+        response = self.adjust(mode='PERCENT', value=12.5)
+        self.assertEqual(response.status_code, 200)
+        # A factor rounded to 1.13 would give 11.30 and 14.13
+        self.assertEqual(self.prices(), [Decimal('11.25')] * 3 + [Decimal('14.06')] * 3)
+
+    def test_literals_fit_their_declared_precision(self):
+        # Backends may quantize a bound decimal to its output field's places
+        def values(expression):
+            if isinstance(expression, Value):
+                yield expression
+            for source in getattr(expression, 'get_source_expressions', list)():
+                yield from values(source)
+
+        for value in values(adjusted_price_expression('PERCENT', 12.5, 'CENT')):
+            if getattr(value.output_field, 'decimal_places', None) is None:
+                continue
+            places = Decimal(1).scaleb(-value.output_field.decimal_places)
+            self.assertEqual(value.value.quantize(places), value.value)
+
+    def test_amount_adjustment_filters_by_pricing_title(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.adjust(mode='AMOUNT', value=-20, pricing_title_id=self.takeaway.id)
+        updates = [query for query in captured if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(response.json()['affected_count'], 3)
+        # Takeaway prices floor at zero, the others are untouched
+        self.assertEqual(self.prices(), [Decimal('0.00')] * 3 + [Decimal('10.00')] * 3)
+
+    def test_only_latest_adjustment_can_be_undone(self):
+        first = self.adjust(mode='AMOUNT', value=1).json()
+        self.adjust(mode='AMOUNT', value=1)
+        response = self.client.post(f"/api/menus/price-adjustments/{first['id']}/undo/")
+        self.assertEqual(response.status_code, 409)
+
+
+class MenuItemBulkPatchTests(MenuTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_menu()
+
+    def setUp(self):
+        self.sign_in(self.owner)
+
+    def patch(self, items, restaurant_id=None):
+        return self.client.patch('/api/menus/menu-items/bulk/', {
+            'restaurant_id': restaurant_id or self.restaurant.id,
+            'items': items,
+        }, content_type='application/json')
+
+    def test_reorder_and_deactivate_in_one_request(self):
+        first, second, third = self.items
+        with CaptureQueriesContext(connection) as captured:
+            response = self.patch([
+                {'id': first.id, 'display_order': 2},
+                {'id': second.id, 'display_order': 0, 'is_active': False},
+                {'id': third.id, 'display_order': 1},
+            ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'updated': 3, 'ids': sorted(item.id for item in self.items)})
+        updates = [query['sql'] for query in captured if query['sql'].startswith('UPDATE')]
+        # One per set of changed fields; is_active is only written to the item changing it
+        self.assertEqual(len(updates), 2)
+        [deactivate] = [sql for sql in updates if '"is_active"' in sql]
+        self.assertTrue(deactivate.endswith(f'IN ({second.id}))'))
+
+        rows = dict(MenuItem.objects.values_list('id', 'display_order'))
+        self.assertEqual(rows, {first.id: 2, second.id: 0, third.id: 1})
+        self.assertEqual(
+            list(MenuItem.objects.filter(is_active=False).values_list('id', flat=True)), [second.id]
+        )
+
+    def test_items_of_another_restaurant_are_rejected(self):
+        other = Restaurant.objects.create(
+            owner=self.restaurant.owner, name='Other', phone='0200000000', email='other@example.com',
+            country='Australia', street_address='2 George St', city='Sydney',
+            state='NSW', postal_code='2000'
+        )
+        response = self.patch([{'id': self.items[0].id, 'is_active': False}], restaurant_id=other.id)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['ids'], [self.items[0].id])
+        self.assertTrue(MenuItem.objects.get(id=self.items[0].id).is_active)
+
+
+    def test_unknown_category_or_spice_level_is_rejected(self):
+        first, second = self.items[:2]
+        for field, label in [('menu_category_id', 'Menu categories'), ('spice_level_id', 'Spice levels')]:
+            with self.subTest(field=field):
+                response = self.patch([{'id': first.id, 'display_order': 5}, {'id': second.id, field: 999999}])
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json(), {'detail': f'{label} not found', 'ids': [999999]})
+        self.assertEqual(MenuItem.objects.get(id=first.id).display_order, 0)
+
+    def test_negative_display_order_is_rejected(self):
+        response = self.patch([{'id': self.items[0].id, 'display_order': -1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['ids'], [self.items[0].id])
+        self.assertEqual(MenuItem.objects.get(id=self.items[0].id).display_order, 0)
+
+class BulkWriteAccessTests(MenuTestMixin, TestCase):
+    """The endpoints that rewrite many rows need the restaurant's owner"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_menu()
+        cls.stranger = User.objects.create_user('stranger', 'stranger@example.com', 'testpass123',
+                                                user_type='OWNER')
+        cls.stranger_restaurant = Restaurant.objects.create(
+            owner=cls.stranger, name='Elsewhere', phone='0200000000', email='elsewhere@example.com',
+            country='Australia', street_address='9 King St', city='Sydney', state='NSW', postal_code='2000'
+        )
+        cls.adjustment = PriceAdjustment.objects.create(restaurant=cls.restaurant, mode='AMOUNT', value=1)
+
+    def requests(self):
+        restaurant_id = self.restaurant.id
+        return [
+            ('post', f'/api/menus/menu-designs/{restaurant_id}/clone/',
+             {'target_restaurant_ids': [self.stranger_restaurant.id]}),
+            ('patch', '/api/menus/menu-items/bulk/',
+             {'restaurant_id': restaurant_id, 'items': [{'id': self.items[0].id, 'is_active': False}]}),
+            ('post', '/api/menus/price-adjustments/', {'restaurant_id': restaurant_id, 'mode': 'AMOUNT', 'value': 5}),
+            ('get', f'/api/menus/price-adjustments/?restaurant_id={restaurant_id}', None),
+            ('post', f'/api/menus/price-adjustments/{self.adjustment.id}/undo/', None),
+        ]
+
+    def send_all(self):
+        return [
+            getattr(self.client, method)(url, payload, content_type='application/json').status_code
+            for method, url, payload in self.requests()
+        ]
+
+    def test_anonymous_callers_are_rejected(self):
+        self.assertEqual(self.send_all(), [401] * 5)
+        self.client.defaults['HTTP_AUTHORIZATION'] = 'Bearer not-a-token'
+        self.assertEqual(self.send_all(), [401] * 5)
+
+    def test_other_owners_are_forbidden(self):
+        self.sign_in(self.stranger)
+        self.assertEqual(self.send_all(), [403] * 5)
+        self.assertFalse(MenuItem.objects.filter(restaurant=self.stranger_restaurant).exists())
+        self.assertTrue(MenuItem.objects.get(id=self.items[0].id).is_active)
+        self.assertEqual(MenuItemPrice.objects.filter(price=Decimal('10.00')).count(), 3)
+
+
+class MenuCloneTests(MenuTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_menu()
+
+    def setUp(self):
+        self.sign_in(self.owner)
+
+    def create_branches(self, count):
+        return [
+            Restaurant.objects.create(
+                owner=self.restaurant.owner, name=f'Branch {index}', phone='0200000000',
+                email=f'branch-{index}@example.com', country='Australia',
+                street_address=f'{index} Pitt St', city='Sydney', state='NSW', postal_code='2000'
+            )
+            for index in range(count)
+        ]
+
+    def clone(self, targets, **payload):
+        payload['target_restaurant_ids'] = [target.id for target in targets]
+        return self.client.post(
+            f'/api/menus/menu-designs/{self.restaurant.id}/clone/', payload, content_type='application/json'
+        )
+
+    def test_clone_copies_the_full_menu(self):
+        branches = self.create_branches(2)
+        response = self.clone(branches)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['menu_items'], 6)
+
+        for branch in branches:
+            design = MenuDesign.objects.get(restaurant=branch)
+            self.assertEqual(list(design.pricing_titles.values_list('pricing_title', flat=True)), [self.takeaway.id])
+            items = MenuItem.objects.filter(restaurant=branch)
+            self.assertEqual(list(items.values_list('name', flat=True)), ['Dish 0', 'Dish 1', 'Dish 2'])
+            for item in items:
+                self.assertEqual(list(item.allergens.values_list('name', flat=True)), ['Nuts'])
+                takeaway = item.prices.get(pricing_title=self.takeaway)
+                # Prices point at the copied portion, not the source one
+                self.assertEqual(takeaway.portion.menu_item, item)
+                self.assertEqual(takeaway.price, Decimal('12.50'))
+
+    def test_soft_deleted_items_are_not_cloned(self):
+        branch, = self.create_branches(1)
+        self.items[0].soft_delete()
+        response = self.clone([branch])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['menu_items'], response.json()['tags']), (2, 2))
+        self.assertEqual(
+            list(MenuItem.objects.filter(restaurant=branch).values_list('name', flat=True)), ['Dish 1', 'Dish 2']
+        )
+
+    def test_query_count_does_not_grow_with_targets(self):
+        branches = self.create_branches(7)
+        with CaptureQueriesContext(connection) as two:
+            self.clone(branches[:2])
+        with CaptureQueriesContext(connection) as five:
+            self.clone(branches[2:])
+        self.assertEqual(len(two), len(five))
+
+    def test_existing_menu_requires_replace(self):
+        branch, = self.create_branches(1)
+        self.clone([branch])
+        self.assertEqual(self.clone([branch]).status_code, 400)
+        self.assertEqual(self.clone([branch], replace=True).status_code, 200)
+        self.assertEqual(MenuItem.objects.filter(restaurant=branch).count(), 3)
+
+    def test_targets_must_share_the_owner(self):
+        stranger = User.objects.create_user('stranger', 'stranger@example.com', 'testpass123', user_type='OWNER')
+        other = Restaurant.objects.create(
+            owner=stranger, name='Elsewhere', phone='0200000000', email='elsewhere@example.com',
+            country='Australia', street_address='9 King St', city='Sydney', state='NSW', postal_code='2000'
+        )
+        response = self.clone([other])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(MenuItem.objects.filter(restaurant=other).exists())
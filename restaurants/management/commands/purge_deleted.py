@@ -0,0 +1,51 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from menus.models import MenuItem
+from restaurants.models import Restaurant
+from mediafiles.signals import release_files
+from RestaurantReviews.softdelete import purge_deleted
+
+# Menu items first: a deleted restaurant's items are flagged too, and purging
+# them in their own chunks keeps each restaurant chunk small
+PURGE_MODELS = (MenuItem, Restaurant)
+
+
+class Command(BaseCommand):
+    help = (
+        "Hard-delete soft-deleted menu items and restaurants in bounded chunks, "
+        "together with their cascaded rows, and release their media files. Run "
+        "it from cron, or with --loop as a long-running worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--grace-minutes', type=int, default=0,
+                            help='Only purge rows deleted at least this many minutes ago')
+        parser.add_argument('--loop', action='store_true', help='Keep running, purging every --interval seconds')
+        parser.add_argument('--interval', type=int, default=60)
+
+    def handle(self, *args, **options):
+        while True:
+            self.purge(options)
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    def purge(self, options):
+        older_than = timezone.now() - timedelta(minutes=options['grace_minutes'])
+        for model in PURGE_MODELS:
+            rows = files = 0
+            for ids, names in purge_deleted(model, options['chunk_size'], older_than):
+                # The purge bypasses signals, so release the chunk's files
+                # here; sweep_media removes the ones nothing else uses
+                release_files(names)
+                rows += len(ids)
+                files += len(names)
+            if rows:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Purged {rows} {model._meta.verbose_name_plural} and released {files} files"
+                ))
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.5 on 2026-10-19 07:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='restaurant',
+            options={'ordering': ['-created_at']},
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['-created_at'], name='restaurant_approved_new_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['owner', '-created_at'], name='restaurant_owner_new_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.5 on 2026-10-19 07:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0002_alter_restaurant_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='restaurant',
+            name='restaurant_approved_new_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='restaurant',
+            name='restaurant_owner_new_idx',
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(condition=models.Q(('is_approved', True), ('is_deleted', False)), fields=['-created_at'], name='restaurant_approved_new_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['owner', '-created_at'], name='restaurant_owner_new_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at'], name='restaurant_purge_idx'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.core.validators import URLValidator, RegexValidator
+from django.utils import timezone
 from users.models import User
+from RestaurantReviews.softdelete import SoftDeleteManager
 
 class VenueType(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -118,12 +120,44 @@ class Restaurant(models.Model):
     # Media
     logo = models.ImageField(upload_to='restaurant_logos/', null=True, blank=True)
     is_approved = models.BooleanField(default=False)
+    is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
+
     def __str__(self):
         return self.name
 
+    def soft_delete(self):
+        """Hide the restaurant now; purge_deleted removes it and its rows later"""
+        self.is_deleted = True
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['is_deleted', 'deleted_at'])
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Public listing only ever reads approved restaurants
+            models.Index(
+                fields=['-created_at'],
+                condition=models.Q(is_approved=True, is_deleted=False),
+                name='restaurant_approved_new_idx',
+            ),
+            models.Index(
+                fields=['owner', '-created_at'],
+                condition=models.Q(is_deleted=False),
+                name='restaurant_owner_new_idx',
+            ),
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(is_deleted=True),
+                name='restaurant_purge_idx',
+            ),
+        ]
+
 class RestaurantImage(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='restaurant_images/')
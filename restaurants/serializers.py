@@ -1,4 +1,7 @@
+from django.core.exceptions import ObjectDoesNotExist
 from rest_framework import serializers
+from reviews.models import RatingSummary
+from reviews.serializers import RatingSummarySerializer
 from .models import (
     Restaurant, RestaurantImage, OperatingHours, 
     HolidayHours, RestaurantAmenities, VenueType, CuisineType, Amenity, Holiday
@@ -75,6 +78,7 @@ class RestaurantSerializer(serializers.ModelSerializer):
     amenities = RestaurantAmenitiesSerializer(read_only=True)
     venue_types = VenueTypeSerializer(many=True, read_only=True)
     cuisine_styles = CuisineTypeSerializer(many=True, read_only=True)
+    rating_summary = serializers.SerializerMethodField()
     venue_type_ids = serializers.PrimaryKeyRelatedField(
         many=True, write_only=True, queryset=VenueType.objects.filter(is_active=True),
         source='venue_types'
@@ -89,6 +93,14 @@ class RestaurantSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['owner', 'is_approved', 'created_at', 'updated_at']
 
+    def get_rating_summary(self, obj):
+        # Select the summary with the restaurant (select_related) to keep this query-free
+        try:
+            summary = obj.rating_summary
+        except ObjectDoesNotExist:
+            summary = RatingSummary(restaurant=obj)  # No reviews yet
+        return RatingSummarySerializer(summary).data
+
     def create(self, validated_data):
         request = self.context.get('request')
         validated_data['owner'] = request.user
@@ -1,3 +1,71 @@
-from django.test import TestCase
+import shutil
+from io import StringIO
+import tempfile
+from datetime import time
 
-# Create your tests here.
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from menus.models import MenuDesign, MenuItem, MenuItemImage, MenuItemPortion, MenuItemPrice
+from menus.tests import MenuTestMixin
+from .models import Restaurant, RestaurantImage, OperatingHours
+
+
+class SoftDeleteTests(MenuTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_menu()
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def delete_restaurant(self):
+        client = APIClient()
+        client.force_authenticate(self.restaurant.owner)
+        return client.delete(f'/api/restaurants/{self.restaurant.id}/')
+
+    def test_destroy_hides_restaurant_and_menu(self):
+        response = self.delete_restaurant()
+        self.assertEqual(response.status_code, 204)
+
+        self.assertFalse(Restaurant.objects.filter(id=self.restaurant.id).exists())
+        self.assertTrue(Restaurant.all_objects.filter(id=self.restaurant.id, is_deleted=True).exists())
+        self.assertEqual(self.client.get(f'/api/menus/menu-items/?restaurant_id={self.restaurant.id}').json(), [])
+        self.assertEqual(self.client.get(f'/api/menus/menu-designs/{self.restaurant.id}/').status_code, 404)
+
+    def test_deleted_menu_item_is_hidden(self):
+        item = self.items[0]
+        self.client.delete(f'/api/menus/menu-items/{item.id}/')
+        self.assertEqual(self.client.get(f'/api/menus/menu-items/{item.id}/').status_code, 404)
+        self.assertTrue(MenuItem.all_objects.filter(id=item.id).exists())
+
+    def test_purge_removes_cascades_and_files(self):
+        image = MenuItemImage.objects.create(
+            menu_item=self.items[0], image=SimpleUploadedFile('dish.jpg', b'dish')
+        )
+        photo = RestaurantImage.objects.create(
+            restaurant=self.restaurant, image=SimpleUploadedFile('front.jpg', b'front')
+        )
+        OperatingHours.objects.create(restaurant=self.restaurant, day='MON',
+                                      open_time=time(9), close_time=time(17))
+        self.delete_restaurant()
+
+        call_command('purge_deleted', stdout=StringIO())
+        call_command('sweep_media', grace_minutes=0, stdout=StringIO())
+
+        self.assertFalse(Restaurant.all_objects.exists())
+        self.assertFalse(MenuItem.all_objects.exists())
+        self.assertFalse(MenuItemPrice.objects.exists())
+        self.assertFalse(MenuItemPortion.objects.exists())
+        self.assertFalse(MenuItem.allergens.through.objects.exists())
+        self.assertFalse(MenuDesign.objects.exists())
+        self.assertFalse(OperatingHours.objects.exists())
+        self.assertFalse(default_storage.exists(image.image.name))
+        self.assertFalse(default_storage.exists(photo.image.name))
@@ -2,6 +2,7 @@ from django.shortcuts import render
 from rest_framework import viewsets, status, permissions
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.shortcuts import get_object_or_404
 from .models import (
@@ -14,6 +15,8 @@ from .serializers import (
     RestaurantAmenitiesSerializer
 )
 from .permissions import IsRestaurantOwner
+from RestaurantReviews.throttling import UPLOAD_THROTTLES
+from reviews import leaderboards
 
 # Create your views here.
 
@@ -21,14 +24,40 @@ class RestaurantViewSet(viewsets.ModelViewSet):
     serializer_class = RestaurantSerializer
     parser_classes = (MultiPartParser, FormParser)
     
+    def with_related(self):
+        # Load everything RestaurantSerializer nests up front instead of
+        # several queries per restaurant
+        return Restaurant.objects.select_related('amenities', 'rating_summary').prefetch_related(
+            'images', 'operating_hours', 'holiday_hours__holiday',
+            'venue_types', 'cuisine_styles', 'amenities__selected_amenities__category'
+        )
+
     def get_queryset(self):
+        queryset = self.with_related()
         if self.request.user.is_staff:
-            return Restaurant.objects.all()
+            return queryset
         elif self.request.user.is_authenticated:
             if self.request.user.is_restaurant_owner():
-                return Restaurant.objects.filter(owner=self.request.user)
-            return Restaurant.objects.filter(is_approved=True)
-        return Restaurant.objects.filter(is_approved=True)
+                return queryset.filter(owner=self.request.user)
+            return queryset.filter(is_approved=True)
+        return queryset.filter(is_approved=True)
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('sort') != 'top_rated':
+            return super().list(request, *args, **kwargs)
+        return Response(self.get_serializer(self.top_rated(), many=True).data)
+
+    def top_rated(self):
+        """The public ranking of one city or cuisine, read from its leaderboard"""
+        city, cuisine = (self.request.query_params.get(param) for param in ('city', 'cuisine'))
+        if bool(city) == bool(cuisine):
+            raise ValidationError({'sort': 'top_rated ranks one city or one cuisine; give either city or cuisine'})
+        if cuisine and not cuisine.isdigit():
+            raise ValidationError({'cuisine': 'Give a cuisine type id'})
+        ids = leaderboards.top('CITY', city) if city else leaderboards.top('CUISINE', cuisine)
+        # The boards only hold approved restaurants, whoever is asking
+        restaurants = self.with_related().filter(is_approved=True).in_bulk(ids)
+        return [restaurants[pk] for pk in ids if pk in restaurants]
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -37,7 +66,11 @@ class RestaurantViewSet(viewsets.ModelViewSet):
             permission_classes = [permissions.AllowAny]
         return [permission() for permission in permission_classes]
 
-    @action(detail=True, methods=['post'], parser_classes=[MultiPartParser])
+    def perform_destroy(self, instance):
+        # Cascades and media are removed later by the purge_deleted command
+        instance.soft_delete()
+
+    @action(detail=True, methods=['post'], parser_classes=[MultiPartParser], throttle_classes=UPLOAD_THROTTLES)
     def upload_images(self, request, pk=None):
         restaurant = self.get_object()
         
@@ -1,3 +1,62 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import AlertKeyword, DigestRun, DigestSubscription, ModerationTerm, Review, ReviewAlert, ReviewFlag, ReviewSourceLink
+
+
+@admin.register(Review)
+class ReviewAdmin(admin.ModelAdmin):
+    list_display = ('restaurant', 'author_name', 'rating', 'source', 'status', 'moderation_state', 'created_at')
+    list_filter = ('rating', 'source', 'status', 'moderation_state')
+    search_fields = ('restaurant__name', 'author_name', 'text')
+    raw_id_fields = ('restaurant', 'user')
+
+
+@admin.register(AlertKeyword)
+class AlertKeywordAdmin(admin.ModelAdmin):
+    list_display = ('keyword', 'owner', 'created_at')
+    search_fields = ('keyword', 'owner__username')
+    raw_id_fields = ('owner',)
+
+
+@admin.register(ReviewAlert)
+class ReviewAlertAdmin(admin.ModelAdmin):
+    list_display = ('review', 'owner', 'keywords', 'is_read', 'created_at')
+    list_filter = ('is_read',)
+    raw_id_fields = ('review', 'owner')
+
+
+@admin.register(ModerationTerm)
+class ModerationTermAdmin(admin.ModelAdmin):
+    list_display = ('term', 'weight', 'created_at')
+    search_fields = ('term',)
+
+
+@admin.register(ReviewFlag)
+class ReviewFlagAdmin(admin.ModelAdmin):
+    list_display = ('review', 'source', 'terms', 'score', 'status', 'claimed_by', 'created_at')
+    list_filter = ('source', 'status')
+    raw_id_fields = ('review', 'claimed_by')
+    readonly_fields = ('claim_token', 'lease_expires_at', 'resolved_at')
+
+
+@admin.register(ReviewSourceLink)
+class ReviewSourceLinkAdmin(admin.ModelAdmin):
+    list_display = ('restaurant', 'source', 'place_id', 'is_active', 'last_synced_at')
+    list_filter = ('source', 'is_active')
+    search_fields = ('restaurant__name', 'place_id')
+    raw_id_fields = ('restaurant',)
+    readonly_fields = ('last_synced_at', 'last_error')
+
+
+@admin.register(DigestSubscription)
+class DigestSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ('owner', 'frequency', 'is_active', 'last_sent_at')
+    list_filter = ('frequency', 'is_active')
+    raw_id_fields = ('owner',)
+
+
+@admin.register(DigestRun)
+class DigestRunAdmin(admin.ModelAdmin):
+    list_display = ('frequency', 'first_day', 'last_day', 'status', 'started_at', 'duration', 'owners',
+                    'restaurants', 'reviews', 'emails_sent')
+    list_filter = ('frequency', 'status')
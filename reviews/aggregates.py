@@ -0,0 +1,228 @@
+"""
+Rating aggregates per restaurant (`RatingSummary`) and per restaurant per
+day (`DailyReviewStats`).
+
+Restaurant cards show an average and a 1-5 star breakdown; computing those
+with AVG/COUNT over the reviews of every card on a page is the slow path.
+Instead each review write adjusts its restaurant's summary row with one
+UPDATE of F() expressions, which the database applies atomically, so
+concurrent reviews never lose counts. Writes that skip model signals
+(bulk_create, queryset updates) must call `rebuild_summaries()` and
+`rebuild_daily_stats()` for the restaurants they touched; `reconcile_ratings` rebuilds everything and
+reports drift.
+
+The same UPDATE keeps the summary's ranking score (`bayesian_score`)
+current, and the restaurant's leaderboards are then updated from it (see
+reviews.leaderboards).
+
+The daily rows back the owner dashboard: weekly and monthly figures are sums
+over at most a few hundred daily rows instead of a scan of every review the
+restaurant ever had. Days are taken in TIME_ZONE; rebuilding uses the same
+truncation, so both paths agree on which day a review belongs to.
+"""
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Max, Q, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, Greatest, TruncDate
+from django.utils import timezone
+
+from . import leaderboards
+from .models import DailyReviewStats, RatingSummary, Review
+
+COUNTER_FIELDS = ('review_count', 'rating_sum', 'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5')
+DAILY_FIELDS = COUNTER_FIELDS + ('responded_count',)
+
+
+def bayesian_score(rating_sum, review_count):
+    """The average rating as if RATING_PRIOR_WEIGHT more reviews at RATING_PRIOR_MEAN were counted"""
+    weight = settings.RATING_PRIOR_WEIGHT
+    return (rating_sum + settings.RATING_PRIOR_MEAN * weight) / (review_count + weight)
+
+
+def _score(sum_delta=0, count_delta=0):
+    """bayesian_score after changing the counters by the deltas, for the same UPDATE as the change"""
+    weight = settings.RATING_PRIOR_WEIGHT
+    return (
+        (Cast('rating_sum', FloatField()) + (sum_delta + settings.RATING_PRIOR_MEAN * weight))
+        / (Cast('review_count', FloatField()) + (count_delta + weight))
+    )
+
+
+def _update_summary(restaurant_id, **changes):
+    summaries = RatingSummary.objects.filter(restaurant_id=restaurant_id)
+    if not summaries.update(**changes):
+        # First review of the restaurant: create the row, then apply the same update
+        RatingSummary.objects.bulk_create([RatingSummary(restaurant_id=restaurant_id)], ignore_conflicts=True)
+        summaries.update(**changes)
+
+
+def review_added(restaurant_id, rating, created_at):
+    _update_summary(
+        restaurant_id,
+        review_count=F('review_count') + 1,
+        rating_sum=F('rating_sum') + rating,
+        score=_score(rating, 1),
+        **{f'stars_{rating}': F(f'stars_{rating}') + 1},
+        last_review_at=Greatest(Coalesce('last_review_at', created_at), created_at),
+    )
+
+
+def review_removed(restaurant_id, rating, created_at):
+    changes = {
+        'review_count': F('review_count') - 1,
+        'rating_sum': F('rating_sum') - rating,
+        'score': _score(-rating, -1),
+        f'stars_{rating}': F(f'stars_{rating}') - 1,
+    }
+    RatingSummary.objects.filter(restaurant_id=restaurant_id).update(**changes)
+    # Only removing the latest review moves last_review_at
+    RatingSummary.objects.filter(restaurant_id=restaurant_id, last_review_at__lte=created_at).update(
+        last_review_at=Subquery(
+            Review.objects.filter(restaurant_id=restaurant_id).order_by('-created_at').values('created_at')[:1]
+        )
+    )
+
+
+def rating_changed(restaurant_id, old_rating, new_rating):
+    RatingSummary.objects.filter(restaurant_id=restaurant_id).update(**{
+        'rating_sum': F('rating_sum') + (new_rating - old_rating),
+        'score': _score(new_rating - old_rating),
+        f'stars_{old_rating}': F(f'stars_{old_rating}') - 1,
+        f'stars_{new_rating}': F(f'stars_{new_rating}') + 1,
+    })
+
+
+def compute_summaries(restaurant_ids=None):
+    """Aggregate the reviews table into unsaved RatingSummary rows, keyed by restaurant id"""
+    reviews = Review.objects.all()
+    if restaurant_ids is not None:
+        reviews = reviews.filter(restaurant_id__in=restaurant_ids)
+    rows = reviews.values('restaurant_id').order_by().annotate(
+        review_count=Count('id'),
+        rating_sum=Sum('rating'),
+        last_review_at=Max('created_at'),
+        **{f'stars_{stars}': Count('id', filter=Q(rating=stars)) for stars in range(1, 6)},
+    )
+    return {
+        row['restaurant_id']: RatingSummary(**row, score=bayesian_score(row['rating_sum'], row['review_count']))
+        for row in rows
+    }
+
+
+def _drifted(current, summary, fields):
+    return any(getattr(current, field) != getattr(summary, field) for field in fields) or not math.isclose(
+        current.score, summary.score, rel_tol=1e-9
+    )
+
+
+def rebuild_summaries(restaurant_ids, dry_run=False):
+    """Recompute the summaries of the given restaurants in bulk, updating their leaderboards
+
+    Returns the restaurant ids whose stored summary had drifted (or was missing).
+    """
+    restaurant_ids = list(restaurant_ids)
+    expected = compute_summaries(restaurant_ids)
+    stored = RatingSummary.objects.in_bulk(restaurant_ids)
+
+    fields = COUNTER_FIELDS + ('last_review_at',)
+    stale, missing, drifted = [], [], []
+    for restaurant_id in restaurant_ids:
+        summary = expected.get(restaurant_id) or RatingSummary(restaurant_id=restaurant_id)
+        current = stored.get(restaurant_id)
+        if current is None:
+            if summary.review_count:
+                missing.append(summary)
+                drifted.append(restaurant_id)
+        elif _drifted(current, summary, fields):
+            stale.append(summary)
+            drifted.append(restaurant_id)
+
+    if not dry_run:
+        RatingSummary.objects.bulk_update(stale, fields + ('score',), batch_size=500)
+        RatingSummary.objects.bulk_create(missing, batch_size=500, ignore_conflicts=True)
+        leaderboards.update_restaurants(drifted)
+    return drifted
+
+
+def _add_contribution(deltas, counted, sign):
+    restaurant_id, rating, created_at, responded = counted
+    row = deltas[restaurant_id, timezone.localdate(created_at)]
+    row['review_count'] += sign
+    row['rating_sum'] += sign * rating
+    row[f'stars_{rating}'] += sign
+    row['responded_count'] += sign * responded
+
+
+def update_daily_stats(old=None, new=None):
+    """Move a review's contribution to the daily rows from `old` to `new`
+
+    Both are (restaurant_id, rating, created_at, responded) tuples, or None
+    for a review being added or removed. Changes within one day are a
+    single UPDATE.
+    """
+    deltas = defaultdict(Counter)
+    if old is not None:
+        _add_contribution(deltas, old, -1)
+    if new is not None:
+        _add_contribution(deltas, new, 1)
+
+    for (restaurant_id, day), row in deltas.items():
+        changes = {field: F(field) + delta for field, delta in row.items() if delta}
+        if not changes:
+            continue
+        rows = DailyReviewStats.objects.filter(restaurant_id=restaurant_id, day=day)
+        # A missing row only needs creating for an added review; for anything
+        # else it means the rows have drifted, which reconcile_ratings fixes
+        if not rows.update(**changes) and row['review_count'] > 0:
+            DailyReviewStats.objects.bulk_create(
+                [DailyReviewStats(restaurant_id=restaurant_id, day=day)], ignore_conflicts=True
+            )
+            rows.update(**changes)
+
+
+def compute_daily_stats(restaurant_ids):
+    """Aggregate the reviews table into unsaved DailyReviewStats rows, keyed by (restaurant id, day)"""
+    rows = Review.objects.filter(restaurant_id__in=restaurant_ids).annotate(
+        day=TruncDate('created_at'),
+    ).values('restaurant_id', 'day').order_by().annotate(
+        review_count=Count('id'),
+        rating_sum=Sum('rating'),
+        responded_count=Count('id', filter=Q(status='RESPONDED')),
+        **{f'stars_{stars}': Count('id', filter=Q(rating=stars)) for stars in range(1, 6)},
+    )
+    return {(row['restaurant_id'], row['day']): DailyReviewStats(**row) for row in rows}
+
+
+def rebuild_daily_stats(restaurant_ids, dry_run=False):
+    """Recompute the daily rows of the given restaurants in bulk
+
+    Returns the restaurant ids with any drifted, missing or extra day.
+    """
+    restaurant_ids = list(restaurant_ids)
+    expected = compute_daily_stats(restaurant_ids)
+    stored = {
+        (row.restaurant_id, row.day): row
+        for row in DailyReviewStats.objects.filter(restaurant_id__in=restaurant_ids)
+    }
+
+    drifted = set()
+    for key in expected.keys() | stored.keys():
+        row, current = expected.get(key), stored.get(key)
+        if row is None and not current.review_count:
+            continue  # Emptied by deletes; harmless
+        if row is None or current is None or any(
+            getattr(current, field) != getattr(row, field) for field in DAILY_FIELDS
+        ):
+            drifted.add(key[0])
+
+    if drifted and not dry_run:
+        # Few restaurants drift, so replacing their rows outright is cheap
+        with transaction.atomic():
+            DailyReviewStats.objects.filter(restaurant_id__in=drifted).delete()
+            DailyReviewStats.objects.bulk_create(
+                [row for key, row in expected.items() if key[0] in drifted], batch_size=500
+            )
+    return sorted(drifted)
@@ -0,0 +1,229 @@
+"""
+Keyword alerts on incoming reviews.
+
+Owners keep lists of keywords ("allergy", "food poisoning", ...) and get a
+`ReviewAlert` when a review of one of their restaurants contains any of
+them. Trying every owner's keywords as separate regexes costs a pass over
+the review per keyword; instead every keyword of every owner goes into one
+Aho-Corasick automaton, which finds all of them in a single pass over the
+text's words, and the hits are then filtered down to the review's owner.
+Keywords match whole words, case-insensitively.
+
+The automaton is built once per keyword-set version and kept per process.
+The version is read from the keywords table (count, last id, last change)
+at most every MATCHER_POLL_INTERVAL seconds, so every worker rebuilds
+shortly after keywords change, whether or not workers share a cache.
+Alerts are written in batches with one INSERT per batch.
+"""
+import re
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .models import AlertKeyword, Review, ReviewAlert
+
+WORD_RE = re.compile(r'\w+')
+
+
+def words(text):
+    return WORD_RE.findall(text.lower())
+
+
+def normalize_keyword(keyword):
+    """'Food-Poisoning!' -> 'food poisoning', the form keywords are stored and matched in"""
+    return ' '.join(words(keyword))
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over (keyword, owner id) pairs
+
+    The alphabet is words rather than characters: texts are split into
+    words by one C-level regex, so the Python loop runs once per word and
+    keywords only ever match whole words.
+    """
+
+    def __init__(self, keywords):
+        self.owners = defaultdict(set)
+        for keyword, owner_id in keywords:
+            self.owners[keyword].add(owner_id)
+
+        # State 0 is the root; goto[state] maps a word to the next state
+        self.goto = [{}]
+        self.output = [()]
+        for keyword in self.owners:
+            state = 0
+            for word in keyword.split():
+                if word not in self.goto[state]:
+                    self.goto.append({})
+                    self.output.append(())
+                    self.goto[state][word] = len(self.goto) - 1
+                state = self.goto[state][word]
+            self.output[state] = (keyword,)
+
+        # Breadth first, so a state's fail link is resolved before its children's
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and word not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(word, 0)
+                # A state also reports the keywords ending at its fail state
+                self.output[child] += self.output[self.fail[child]]
+
+    def __len__(self):
+        return len(self.owners)
+
+    def find(self, text):
+        """Every keyword occurring in `text`"""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set()
+        state = 0
+        for word in words(text):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+    def owned(self, keywords, owner_id):
+        """The owner's keywords among those found, sorted"""
+        return sorted(keyword for keyword in keywords if owner_id in self.owners[keyword])
+
+    def match(self, text, owner_id):
+        return self.owned(self.find(text), owner_id)
+
+
+def table_version(queryset):
+    """(row count, last id, last change) of the rows: moves with every insert, update or delete"""
+    return tuple(queryset.aggregate(Count('pk'), Max('pk'), Max('updated_at')).values())
+
+
+class MatcherCache:
+    """A matcher kept per process, rebuilt when `version()` changes
+
+    `version` reads the database: the cache isn't shared between processes by
+    default, so it can't tell them about changes made elsewhere. It's polled
+    at most every MATCHER_POLL_INTERVAL seconds, and right away after a change
+    made in this process.
+    """
+
+    def __init__(self, version, build):
+        self.version_of = version
+        self.build = build
+        self._lock = threading.Lock()
+        self.version = None
+        self.matcher = None
+        self.checked_at = 0.0
+
+    def current_version(self):
+        return self.version_of()
+
+    def get(self, force=False):
+        """The current matcher; `force` checks the version whatever the poll interval"""
+        now = time.monotonic()
+        if force or self.version is None or now - self.checked_at >= getattr(settings, 'MATCHER_POLL_INTERVAL', 1):
+            self.checked_at = now
+            version = self.current_version()
+            if version != self.version:
+                with self._lock:
+                    if version != self.version:
+                        self.matcher = self.build()
+                        self.version = version
+        return self.matcher
+
+    def bump(self):
+        """Have this process look for changes on its next get, once the current transaction commits"""
+        def bump():
+            self.checked_at = 0.0
+        transaction.on_commit(bump)
+
+
+matchers = MatcherCache(
+    lambda: table_version(AlertKeyword.objects),
+    lambda: KeywordMatcher(AlertKeyword.objects.values_list('keyword', 'owner_id').iterator()),
+)
+
+
+class AlertQueue:
+    """Collects alerts and writes them batch_size at a time"""
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.pending = []
+        self.written = 0
+
+    def add(self, review_id, owner_id, keywords):
+        self.pending.append(ReviewAlert(review_id=review_id, owner_id=owner_id, keywords=keywords))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        # A rescan of an edited review replaces its keywords
+        ReviewAlert.objects.bulk_create(
+            self.pending, update_conflicts=True, unique_fields=['review', 'owner'], update_fields=['keywords']
+        )
+        self.written += len(self.pending)
+        self.pending = []
+
+
+def scan_review(review, edited=False):
+    """Alert the owner if a saved review contains their keywords
+
+    An edited review's alert is rewritten with the keywords its new text
+    contains, or withdrawn when it contains none of them any more.
+    """
+    matcher = matchers.get()
+    found = matcher.find(review.text) if matcher else None
+    # Only reviews with some keyword cost the owner lookup
+    keywords = matcher.owned(found, review.restaurant.owner_id) if found else []
+    if keywords:
+        queue = AlertQueue()
+        queue.add(review.id, review.restaurant.owner_id, keywords)
+        queue.flush()
+    elif edited:
+        ReviewAlert.objects.filter(review_id=review.id).delete()
+
+
+def scan_reviews(reviews=None, batch_size=1000, withdraw=False):
+    """Scan a Review queryset in id order and write its alerts in batches
+
+    For reviews written without model signals (imports) and for rescans
+    after keyword changes. With `withdraw`, for edited reviews, the alerts
+    of reviews that no longer contain any keyword are deleted, as
+    scan_review does. Returns the number of alerts written.
+    """
+    matcher = matchers.get()
+    reviews = (Review.objects.all() if reviews is None else reviews).order_by('id')
+    if not matcher:
+        if withdraw:
+            ReviewAlert.objects.filter(review__in=reviews).delete()
+        return 0
+    queue = AlertQueue(batch_size)
+    unmatched = []
+    if not withdraw:
+        reviews = reviews.exclude(text='')
+    rows = reviews.values_list('id', 'text', 'restaurant__owner_id')
+    for review_id, text, owner_id in rows.iterator(chunk_size=batch_size):
+        keywords = matcher.match(text, owner_id)
+        if keywords:
+            queue.add(review_id, owner_id, keywords)
+        elif withdraw:
+            unmatched.append(review_id)
+        if len(unmatched) >= batch_size:
+            ReviewAlert.objects.filter(review_id__in=unmatched).delete()
+            unmatched = []
+    queue.flush()
+    if unmatched:
+        ReviewAlert.objects.filter(review_id__in=unmatched).delete()
+    return queue.written
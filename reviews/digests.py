@@ -0,0 +1,149 @@
+"""
+Daily and weekly review digest emails for restaurant owners.
+
+A digest run covers whole days (yesterday, or the seven days up to
+yesterday) for every owner subscribed at that frequency, with three
+queries whatever the number of owners:
+
+* the subscribers, ordered by owner;
+* per restaurant counts summed from the daily rollups, ordered by owner;
+* the latest few reviews of each restaurant, picked with a ROW_NUMBER()
+  window, ordered by owner.
+
+The three are read with server-side iteration and merged by owner, so one
+owner's digest is in memory at a time. Messages are rendered as they are
+merged and handed to the mail backend chunk_size at a time, over one
+connection. Each run is recorded as a `DigestRun`.
+"""
+import time
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F, Sum, Window
+from django.db.models.functions import RowNumber
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .models import DailyReviewStats, DigestRun, DigestSubscription, Review
+
+PERIOD_DAYS = {'DAILY': 1, 'WEEKLY': 7}
+
+
+def digest_days(frequency, today=None):
+    """(first day, last day) covered by a digest sent today"""
+    last_day = (today or timezone.localdate()) - timedelta(days=1)
+    return last_day - timedelta(days=PERIOD_DAYS[frequency] - 1), last_day
+
+
+def _subscribed(prefix, frequency):
+    return {
+        f'{prefix}digest_subscription__frequency': frequency,
+        f'{prefix}digest_subscription__is_active': True,
+        f'{prefix}is_active': True,
+    }
+
+
+def _by_owner(rows):
+    return groupby(rows, key=itemgetter('owner_id'))
+
+
+def _take(groups, owner_id, pending):
+    """Rows of owner_id from an owner-ordered groupby; `pending` is its current group"""
+    while pending is not None and pending[0] < owner_id:
+        pending = next(groups, None)
+    if pending is None or pending[0] != owner_id:
+        return [], pending
+    return list(pending[1]), next(groups, None)
+
+
+def build_digests(frequency, first_day, last_day, reviews_per_restaurant=3):
+    """Yield (owner, restaurants) for each subscriber with new reviews, one owner at a time"""
+    owners = DigestSubscription.objects.filter(
+        frequency=frequency, is_active=True, owner__is_active=True
+    ).exclude(owner__email='').order_by('owner_id').values(
+        'owner_id', email=F('owner__email'), first_name=F('owner__first_name'), username=F('owner__username'),
+    )
+    restaurants = DailyReviewStats.objects.filter(
+        day__range=(first_day, last_day), restaurant__is_deleted=False,
+        **_subscribed('restaurant__owner__', frequency),
+    ).values(
+        'restaurant_id', owner_id=F('restaurant__owner_id'), name=F('restaurant__name'),
+    ).order_by('owner_id', 'restaurant_id').annotate(
+        review_count=Sum('review_count'), rating_sum=Sum('rating_sum'), responded_count=Sum('responded_count'),
+    ).filter(review_count__gt=0)
+
+    start = timezone.make_aware(datetime.combine(first_day, datetime.min.time()))
+    end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), datetime.min.time()))
+    reviews = Review.objects.filter(
+        created_at__gte=start, created_at__lt=end, restaurant__is_deleted=False,
+        **_subscribed('restaurant__owner__', frequency),
+    ).annotate(
+        rank=Window(RowNumber(), partition_by=F('restaurant_id'), order_by=[F('created_at').desc(), F('id').desc()]),
+    ).filter(rank__lte=reviews_per_restaurant).order_by('restaurant__owner_id', 'restaurant_id', 'rank').values(
+        'restaurant_id', 'rating', 'text', 'author_name', 'status', owner_id=F('restaurant__owner_id'),
+    )
+
+    restaurant_groups, review_groups = _by_owner(restaurants.iterator()), _by_owner(reviews.iterator())
+    pending_restaurants, pending_reviews = next(restaurant_groups, None), next(review_groups, None)
+    for owner in owners.iterator():
+        owner_restaurants, pending_restaurants = _take(restaurant_groups, owner['owner_id'], pending_restaurants)
+        owner_reviews, pending_reviews = _take(review_groups, owner['owner_id'], pending_reviews)
+        if not owner_restaurants:
+            continue
+        by_restaurant = groupby(owner_reviews, key=itemgetter('restaurant_id'))
+        latest = {restaurant_id: list(rows) for restaurant_id, rows in by_restaurant}
+        for restaurant in owner_restaurants:
+            restaurant['average'] = restaurant['rating_sum'] / restaurant['review_count']
+            restaurant['awaiting_count'] = restaurant['review_count'] - restaurant['responded_count']
+            restaurant['reviews'] = latest.get(restaurant['restaurant_id'], [])
+        yield owner, owner_restaurants
+
+
+def send_digests(frequency, today=None, chunk_size=100, connection=None):
+    """Send the digests due today, recording the run; returns the DigestRun"""
+    first_day, last_day = digest_days(frequency, today)
+    run = DigestRun.objects.create(frequency=frequency, first_day=first_day, last_day=last_day)
+    started = time.monotonic()
+    template = get_template('reviews/digest_email.txt')
+    connection = connection or get_connection(getattr(settings, 'DIGEST_EMAIL_BACKEND', None))
+    chunk, owner_ids = [], []
+
+    def flush():
+        run.emails_sent += connection.send_messages(chunk) or 0
+        DigestSubscription.objects.filter(owner_id__in=owner_ids).update(last_sent_at=timezone.now())
+        chunk.clear()
+        owner_ids.clear()
+
+    try:
+        with connection:
+            for owner, restaurants in build_digests(frequency, first_day, last_day):
+                run.owners += 1
+                run.restaurants += len(restaurants)
+                run.reviews += sum(restaurant['review_count'] for restaurant in restaurants)
+                body = template.render({
+                    'name': owner['first_name'] or owner['username'],
+                    'frequency': frequency,
+                    'first_day': first_day,
+                    'last_day': last_day,
+                    'restaurants': restaurants,
+                })
+                chunk.append(EmailMessage(
+                    subject=f"Your {frequency.lower()} review digest", body=body, to=[owner['email']],
+                ))
+                owner_ids.append(owner['owner_id'])
+                if len(chunk) >= chunk_size:
+                    flush()
+            if chunk:
+                flush()
+        run.status = 'SUCCEEDED'
+    except Exception as error:
+        run.status = 'FAILED'
+        run.error = f'{type(error).__name__}: {error}'
+        raise
+    finally:
+        run.duration = timedelta(seconds=time.monotonic() - started)
+        run.save()
+    return run
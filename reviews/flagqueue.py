@@ -0,0 +1,92 @@
+"""
+Work queue over review flags, for moderators and automated workers.
+
+Flags are taken oldest first, since each must be forwarded or resolved
+within MODERATION_FLAG_SLA of being raised. A claim locks a batch of
+claimable flags with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent
+claimers pass over each other's rows instead of queueing behind them, and
+marks the batch UNDER_REVIEW with one UPDATE: a fresh claim token and a
+lease (MODERATION_CLAIM_LEASE).
+
+A flag whose lease runs out, because its claimer crashed or walked away,
+can be claimed again. Completing and releasing only touch flags still
+held under the caller's token, so a claimer whose flags were taken over
+can't overwrite the new claimer's work; it is told which flags it lost.
+The claim UPDATE re-checks claimability too, which keeps backends without
+SKIP LOCKED (SQLite) correct, if slower.
+"""
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import ReviewFlag
+
+FINAL_STATUSES = ('FORWARDED', 'RESOLVED')
+
+
+def _claimable(now):
+    return Q(status='OPEN') | Q(status='UNDER_REVIEW', lease_expires_at__lt=now)
+
+
+def claim(user=None, batch_size=10):
+    """Claim up to batch_size of the oldest claimable flags; returns (token, flags)"""
+    token = uuid.uuid4()
+    flags = ReviewFlag.objects.filter(claim_token=token).select_related('review').order_by('created_at', 'id')
+    while True:
+        now = timezone.now()
+        # Read back in the same transaction, so a failure can't leave flags
+        # claimed under a token nobody was given
+        with transaction.atomic():
+            ids = list(
+                ReviewFlag.objects.filter(_claimable(now)).order_by('created_at', 'id')
+                .select_for_update(skip_locked=True).values_list('id', flat=True)[:batch_size]
+            )
+            # Without SKIP LOCKED all of them may have been claimed since; look again
+            if not ids or ReviewFlag.objects.filter(_claimable(now), id__in=ids).update(
+                status='UNDER_REVIEW', claimed_by=user, claim_token=token,
+                lease_expires_at=now + settings.MODERATION_CLAIM_LEASE,
+            ):
+                return token, list(flags)
+
+
+def _held(token, ids):
+    return ReviewFlag.objects.filter(id__in=ids, claim_token=token, status='UNDER_REVIEW')
+
+
+def _lost(token, ids):
+    held = set(ReviewFlag.objects.filter(id__in=ids, claim_token=token).values_list('id', flat=True))
+    return sorted(set(ids) - held)
+
+
+def complete(token, ids, status, note=''):
+    """Forward or resolve claimed flags in one UPDATE; returns the ids no longer held under token"""
+    if status not in FINAL_STATUSES:
+        raise ValueError(f"Flags are completed as one of {FINAL_STATUSES}, not {status}")
+    _held(token, ids).update(status=status, note=note, resolved_at=timezone.now(), lease_expires_at=None)
+    return _lost(token, ids)
+
+
+def release(token, ids):
+    """Put claimed flags back in the queue; returns the ids no longer held under token"""
+    lost = _lost(token, ids)
+    _held(token, ids).update(status='OPEN', claimed_by=None, claim_token=None, lease_expires_at=None)
+    return lost
+
+
+def extend(token, ids):
+    """Renew the lease of flags still held under token; returns the ids no longer held"""
+    _held(token, ids).update(lease_expires_at=timezone.now() + settings.MODERATION_CLAIM_LEASE)
+    return _lost(token, ids)
+
+
+def stats():
+    """Open, under review and overdue (past the SLA, not yet completed) flag counts"""
+    overdue = timezone.now() - settings.MODERATION_FLAG_SLA
+    return ReviewFlag.objects.filter(status__in=('OPEN', 'UNDER_REVIEW')).aggregate(
+        open=Count('id', filter=Q(status='OPEN')),
+        under_review=Count('id', filter=Q(status='UNDER_REVIEW')),
+        overdue=Count('id', filter=Q(created_at__lt=overdue)),
+    )
@@ -0,0 +1,144 @@
+"""
+Ingestion of reviews from other platforms (see reviews.sources).
+
+Each `ReviewSourceLink` ties a restaurant to its listing on a platform and
+keeps the cursor after the last page saved. A run fetches pages for many
+links at once on a bounded thread pool (one page in flight per link, as
+each page's cursor is needed for the next) while the calling thread saves
+what has arrived, in batches:
+
+* reviews are upserted on (source, external_id) with one
+  bulk_create(update_conflicts=True), so re-fetching a page is harmless;
+* the rating summaries and daily stats of the batch's restaurants are then
+  rebuilt once, since bulk_create skips the per-review signals, and the
+  batch is scanned for keyword alerts (withdrawing those of reviews whose
+  new text no longer matches, as for local edits);
+* the links' cursors are saved in the same transaction, so an interrupted
+  run resumes after the last saved batch.
+
+New reviews, and re-fetched ones whose text changed, are (re)queued for
+moderation; re-fetching an unchanged review keeps its moderation state.
+"""
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.db import transaction
+from django.utils import timezone
+
+from .aggregates import rebuild_daily_stats, rebuild_summaries
+from .alerts import scan_reviews
+from .models import Review, ReviewSourceLink
+from .sources import get_source
+
+UPSERT_FIELDS = ['rating', 'text', 'author_name', 'created_at', 'updated_at']
+
+
+class Batch:
+    def __init__(self):
+        self.reviews = {}
+        self.links = {}
+
+    def __len__(self):
+        return len(self.reviews)
+
+    def add(self, link, page):
+        link.last_error = ''
+        self.links[link.pk] = link
+        for review in page.reviews:
+            if not 1 <= review.rating <= 5:
+                continue
+            # Keyed so a review seen twice in one batch is written once, as last seen
+            self.reviews[link.source, review.external_id] = Review(
+                restaurant_id=link.restaurant_id, source=link.source, external_id=review.external_id,
+                rating=review.rating, text=review.text, author_name=review.author_name[:150],
+                created_at=review.created_at, moderation_state='PENDING', updated_at=timezone.now(),
+            )
+
+    def save(self):
+        now = timezone.now()
+        restaurant_ids = sorted({link.restaurant_id for link in self.links.values()})
+        with transaction.atomic():
+            if self.reviews:
+                external_ids = defaultdict(list)
+                for source, external_id in self.reviews:
+                    external_ids[source].append(external_id)
+                unchanged, edited = set(), set()
+                for source, ids in external_ids.items():
+                    stored = Review.objects.filter(source=source, external_id__in=ids).values_list('external_id', 'text')
+                    for external_id, text in stored:
+                        key = (source, external_id)
+                        (unchanged if self.reviews[key].text == text else edited).add(key)
+                # Only new and edited reviews go back to moderation
+                requeued = [review for key, review in self.reviews.items() if key not in unchanged]
+                kept = [self.reviews[key] for key in unchanged]
+                for reviews, fields in ((requeued, UPSERT_FIELDS + ['moderation_state']), (kept, UPSERT_FIELDS)):
+                    if reviews:
+                        Review.objects.bulk_create(
+                            reviews, update_conflicts=True, unique_fields=['source', 'external_id'],
+                            update_fields=fields,
+                        )
+                rebuild_summaries(restaurant_ids)
+                rebuild_daily_stats(restaurant_ids)
+                for source, ids in external_ids.items():
+                    # Edited reviews lose the alert their new text no longer earns
+                    reviews = Review.objects.filter(source=source, external_id__in=ids)
+                    edited_ids = [external_id for external_id in ids if (source, external_id) in edited]
+                    scan_reviews(reviews.exclude(external_id__in=edited_ids))
+                    if edited_ids:
+                        scan_reviews(reviews.filter(external_id__in=edited_ids), withdraw=True)
+            for link in self.links.values():
+                link.last_synced_at = now
+            ReviewSourceLink.objects.bulk_update(self.links.values(), ['cursor', 'last_synced_at', 'last_error'])
+        saved = len(self.reviews)
+        self.reviews, self.links = {}, {}
+        return saved
+
+
+def ingest(links, max_workers=4, batch_size=500, max_pages=None):
+    """Fetch and save new reviews for the given ReviewSourceLinks
+
+    Returns counts of pages fetched, reviews saved and links that failed.
+    """
+    stats = {'pages': 0, 'reviews': 0, 'errors': 0}
+    sources = {}
+    batch = Batch()
+
+    def fail(link, error):
+        stats['errors'] += 1
+        link.last_error = f'{type(error).__name__}: {error}'[:2000]
+        ReviewSourceLink.objects.filter(pk=link.pk).update(last_error=link.last_error)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        in_flight = {}
+
+        def fetch(link, cursor, pages):
+            in_flight[pool.submit(sources[link.source].fetch, link.place_id, cursor or None)] = (link, pages)
+
+        for link in links:
+            try:
+                if link.source not in sources:
+                    sources[link.source] = get_source(link.source)
+            except Exception as error:
+                fail(link, error)
+                continue
+            fetch(link, link.cursor, 1)
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                link, pages = in_flight.pop(future)
+                try:
+                    page = future.result()
+                except Exception as error:
+                    # Pages of this link already in the batch are still saved
+                    fail(link, error)
+                    continue
+                stats['pages'] += 1
+                batch.add(link, page)
+                if page.cursor:
+                    link.cursor = page.cursor
+                if page.has_more and (max_pages is None or pages < max_pages):
+                    fetch(link, page.cursor, pages + 1)
+            if len(batch) >= batch_size or not in_flight:
+                stats['reviews'] += batch.save()
+    return stats
@@ -0,0 +1,172 @@
+"""
+Top rated restaurants per city and per cuisine.
+
+Ranking a city's restaurants by score on every request would sort every
+rating summary in the city. Instead each city and cuisine has a
+`Leaderboard` holding its TOP_RATED_SIZE best scored restaurants (approved,
+not deleted, with at least one review), ordered by score then id, and a
+request reads it as is. A board is built on its first read.
+
+Boards are kept current as review writes change a restaurant's score,
+without re-ranking: for each of the restaurant's boards, a few aggregates
+(size, the restaurant's entry, the lowest entry) decide whether anything
+moves. A restaurant that rises is updated, one that overtakes the lowest
+entry of a full board replaces it, and anything else leaves the board as
+it is. Only a board member falling to the bottom of a full board, where a
+restaurant outside might now rank above it, rebuilds the board from the
+summaries. Changes are made under a row lock on the board, after checking
+again, so concurrent writes can't push a board past its size; reviews of
+restaurants far from the top never take the lock.
+
+Changes to a restaurant's city, cuisines or visibility rebuild its boards.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from restaurants.models import Restaurant
+from .models import Leaderboard, LeaderboardEntry, RatingSummary
+
+
+def city_key(city):
+    return city.lower()
+
+
+def _eligible(kind, key):
+    summaries = RatingSummary.objects.filter(
+        review_count__gt=0, restaurant__is_approved=True, restaurant__is_deleted=False,
+    )
+    if kind == 'CITY':
+        return summaries.filter(restaurant__city__iexact=key)
+    return summaries.filter(restaurant__cuisine_styles=key)
+
+
+def _rebuild(board):
+    """Replace the entries of a board locked by the caller"""
+    top = _eligible(board.kind, board.key).order_by('-score', 'restaurant_id').values_list(
+        'restaurant_id', 'score'
+    )[:settings.TOP_RATED_SIZE]
+    board.entries.all().delete()
+    LeaderboardEntry.objects.bulk_create([
+        LeaderboardEntry(board=board, restaurant_id=restaurant_id, score=score) for restaurant_id, score in top
+    ])
+    board.built_at = timezone.now()
+    board.save(update_fields=['built_at'])
+
+
+def top(kind, key):
+    """Restaurant ids of a board, best first"""
+    key = city_key(key) if kind == 'CITY' else str(key)
+    board = Leaderboard.objects.filter(kind=kind, key=key).first()
+    if board is None:
+        if not _eligible(kind, key).exists():
+            return []  # No board is kept for a city or cuisine nobody has reviewed
+        Leaderboard.objects.bulk_create([Leaderboard(kind=kind, key=key)], ignore_conflicts=True)
+        with transaction.atomic():
+            board = Leaderboard.objects.select_for_update().get(kind=kind, key=key)
+            if not board.entries.exists():  # Or a concurrent first read built it
+                _rebuild(board)
+    return list(board.entries.order_by('-score', 'restaurant_id').values_list('restaurant_id', flat=True))
+
+
+def _standings(boards, restaurant_id):
+    """Annotate boards with what a change to restaurant_id's score is decided on"""
+    entries = LeaderboardEntry.objects.filter(board=OuterRef('pk'))
+    lowest = entries.order_by('score', '-restaurant_id')
+    return boards.annotate(
+        size=Count('entries'),
+        member_score=Subquery(entries.filter(restaurant_id=restaurant_id).values('score')[:1]),
+        lowest_score=Subquery(lowest.values('score')[:1]),
+        lowest_id=Subquery(lowest.values('restaurant_id')[:1]),
+    )
+
+
+def _decide(board, restaurant_id, score):
+    """'update', 'insert', 'replace', 'remove', 'rebuild' or None for a restaurant now at `score`
+
+    `score` is None for a restaurant no longer eligible.
+    """
+    full = board.size >= settings.TOP_RATED_SIZE
+    if board.member_score is not None:
+        if score is None:
+            return 'rebuild' if full else 'remove'
+        if score >= board.member_score or not full:
+            return 'update' if score != board.member_score else None
+        # Falling: a restaurant outside may now rank above it if it's the lowest
+        if (score, -restaurant_id) <= (board.lowest_score, -board.lowest_id):
+            return 'rebuild'
+        return 'update'
+    if score is None:
+        return None
+    if not full:
+        return 'insert'
+    if (score, -restaurant_id) > (board.lowest_score, -board.lowest_id):
+        return 'replace'
+    return None
+
+
+def _apply(board, action, restaurant_id, score):
+    entries = board.entries.all()
+    if action == 'update':
+        entries.filter(restaurant_id=restaurant_id).update(score=score)
+    elif action == 'remove':
+        entries.filter(restaurant_id=restaurant_id).delete()
+    elif action == 'rebuild':
+        _rebuild(board)
+    else:
+        if action == 'replace':
+            entries.filter(restaurant_id=board.lowest_id).delete()
+        LeaderboardEntry.objects.create(board=board, restaurant_id=restaurant_id, score=score)
+
+
+def _boards(restaurant):
+    """Existing boards the restaurant is on or belongs on"""
+    cuisines = [str(pk) for pk in restaurant.cuisine_styles.values_list('pk', flat=True)]
+    return Leaderboard.objects.filter(
+        Q(kind='CITY', key=city_key(restaurant.city))
+        | Q(kind='CUISINE', key__in=cuisines)
+        | Q(pk__in=LeaderboardEntry.objects.filter(restaurant=restaurant).values('board_id'))
+    )
+
+
+def update_restaurants(restaurant_ids):
+    """Bring the boards of restaurants whose score changed up to date"""
+    restaurants = Restaurant.all_objects.filter(pk__in=restaurant_ids).select_related('rating_summary')
+    for restaurant in restaurants:
+        summary = getattr(restaurant, 'rating_summary', None)
+        eligible = restaurant.is_approved and not restaurant.is_deleted and summary and summary.review_count
+        score = summary.score if eligible else None
+        for board in _standings(_boards(restaurant), restaurant.pk):
+            if _decide(board, restaurant.pk, score) is None:
+                continue
+            with transaction.atomic():
+                Leaderboard.objects.select_for_update().get(pk=board.pk)
+                board = _standings(Leaderboard.objects.filter(pk=board.pk), restaurant.pk).get()
+                action = _decide(board, restaurant.pk, score)
+                if action is not None:
+                    _apply(board, action, restaurant.pk, score)
+
+
+def rebuild_restaurant_boards(restaurant):
+    """Rebuild every existing board the restaurant is on or belongs on"""
+    for board in _boards(restaurant):
+        with transaction.atomic():
+            _rebuild(Leaderboard.objects.select_for_update().get(pk=board.pk))
+
+
+def rebuild_leaderboards(dry_run=False):
+    """Rebuild every board; returns the boards whose entries had drifted"""
+    drifted = []
+    for board in Leaderboard.objects.order_by('pk'):
+        with transaction.atomic():
+            board = Leaderboard.objects.select_for_update().get(pk=board.pk)
+            expected = list(_eligible(board.kind, board.key).order_by('-score', 'restaurant_id').values_list(
+                'restaurant_id', 'score'
+            )[:settings.TOP_RATED_SIZE])
+            stored = list(board.entries.order_by('-score', 'restaurant_id').values_list('restaurant_id', 'score'))
+            if stored != expected:
+                drifted.append(board)
+                if not dry_run:
+                    _rebuild(board)
+    return drifted
@@ -0,0 +1,79 @@
+import random
+import re
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.alerts import KeywordMatcher
+
+
+def _word(rng):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark keyword alert matching in memory: --keywords keywords (1k by default) "
+        "spread over --owners owners, scanned against --reviews synthetic reviews (100k by "
+        "default) with the Aho-Corasick matcher, compared with one regex per keyword on "
+        "a sample of the reviews."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reviews', type=int, default=100_000)
+        parser.add_argument('--keywords', type=int, default=1000)
+        parser.add_argument('--owners', type=int, default=100)
+        parser.add_argument('--words', type=int, default=60, help='Words per review')
+        parser.add_argument('--regex-sample', type=int, default=2000, help='Reviews to scan with regexes')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocabulary = [_word(rng) for _ in range(20_000)]
+        keywords = []
+        for index in range(options['keywords']):
+            # Some multi-word phrases, and some keywords shared between owners
+            phrase = ' '.join(rng.sample(vocabulary[:5000], rng.choice((1, 1, 1, 2))))
+            keywords.append((phrase, rng.randrange(options['owners'])))
+        common = vocabulary[:5000]
+        reviews = [
+            (' '.join(rng.choice(common) for _ in range(options['words'])), rng.randrange(options['owners']))
+            for _ in range(options['reviews'])
+        ]
+        characters = sum(len(text) for text, _ in reviews)
+        self.stdout.write(
+            f"{len(keywords)} keywords over {options['owners']} owners; "
+            f"{len(reviews)} reviews, {characters / 1e6:.1f}M characters"
+        )
+
+        started = time.perf_counter()
+        matcher = KeywordMatcher(keywords)
+        self.stdout.write(f"build automaton: {(time.perf_counter() - started) * 1000:.1f} ms ({len(matcher.goto)} states)")
+
+        started = time.perf_counter()
+        alerts = sum(1 for text, owner_id in reviews if matcher.match(text, owner_id))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"aho-corasick: {elapsed:.2f}s, {len(reviews) / elapsed:,.0f} reviews/s, {alerts} alerts"
+        )
+
+        sample = reviews[:options['regex_sample']]
+        patterns = [(re.compile(rf'\b{re.escape(keyword)}\b'), keyword, owner_id) for keyword, owner_id in keywords]
+        started = time.perf_counter()
+        regex_results = []
+        for text, owner_id in sample:
+            text = text.lower()
+            regex_results.append(sorted({
+                keyword for pattern, keyword, keyword_owner in patterns
+                if keyword_owner == owner_id and pattern.search(text)
+            }))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"regex per owner keyword ({len(sample)} reviews): {elapsed:.2f}s, {len(sample) / elapsed:,.0f} reviews/s, "
+            f"~{elapsed * len(reviews) / len(sample):.1f}s for all"
+        )
+        mismatches = sum(
+            matcher.match(text, owner_id) != expected for (text, owner_id), expected in zip(sample, regex_results)
+        )
+        self.stdout.write(f"results differ on {mismatches} of {len(sample)} sampled reviews")
@@ -0,0 +1,118 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.utils import timezone
+
+from restaurants.models import Restaurant
+from reviews.models import Review
+from reviews.pagination import keyset_filter
+from reviews.views import SORT_ORDERINGS
+from users.models import User
+
+BENCH_OWNER = 'bench-reviews-owner'
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the review listing: seed a restaurant with --reviews reviews (100k by "
+        "default), then time first and deep pages for every sort and a star filter, and "
+        "compare a deep keyset page with the same page fetched by OFFSET."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reviews', type=int, default=100_000)
+        parser.add_argument('--restaurant', type=int, help='Benchmark an existing restaurant instead of seeding one')
+        parser.add_argument('--pages', type=int, default=200, help='Pages to walk for the deep page timings')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--keep', action='store_true', help="Don't delete the seeded restaurant afterwards")
+
+    def handle(self, *args, **options):
+        if options['restaurant']:
+            try:
+                restaurant = Restaurant.objects.get(pk=options['restaurant'], is_approved=True)
+            except Restaurant.DoesNotExist:
+                raise CommandError('No approved restaurant with that id')
+        else:
+            restaurant = self.seed(options['reviews'])
+
+        try:
+            count = Review.objects.filter(restaurant=restaurant).count()
+            self.stdout.write(f"Restaurant {restaurant.pk}: {count} reviews, page size {options['page_size']}")
+            self.stdout.write(f"{'query':<28} {'first ms':>9} {'median ms':>10} {'last ms':>9} {'pages':>6}")
+            client = Client(HTTP_HOST='localhost')
+            base = f'/api/restaurants/{restaurant.pk}/reviews/?page_size={options["page_size"]}'
+            for label, query in (
+                ('sort=newest', '&sort=newest'),
+                ('sort=oldest', '&sort=oldest'),
+                ('sort=highest', '&sort=highest'),
+                ('sort=lowest', '&sort=lowest'),
+                ('rating=1 sort=newest', '&rating=1&sort=newest'),
+            ):
+                timings = walk(client, base + query, options['pages'])
+                self.stdout.write(
+                    f"{label:<28} {timings[0]:>9.1f} {statistics.median(timings):>10.1f} "
+                    f"{timings[-1]:>9.1f} {len(timings):>6}"
+                )
+            self.compare_offset(restaurant, options['pages'], options['page_size'])
+        finally:
+            if not options['restaurant'] and not options['keep']:
+                Restaurant.all_objects.filter(pk=restaurant.pk).delete()
+
+    def seed(self, count):
+        owner, _ = User.objects.get_or_create(
+            username=BENCH_OWNER, defaults={'email': f'{BENCH_OWNER}@example.com', 'user_type': 'OWNER'}
+        )
+        restaurant = Restaurant.objects.create(
+            owner=owner, name='Review Bench Bistro', phone='0200000000', email='bench@example.com',
+            country='Australia', street_address='1 George St', city='Sydney', state='NSW',
+            postal_code='2000', is_approved=True,
+        )
+        now = timezone.now()
+        started = time.perf_counter()
+        batch = []
+        for index in range(count):
+            batch.append(Review(
+                restaurant=restaurant, rating=random.choice((1, 2, 3, 4, 4, 5, 5, 5)),
+                author_name=f'Guest {index}', text='Lovely food, slow service. ' * 4,
+                created_at=now - timedelta(seconds=random.randrange(3 * 365 * 86400)),
+            ))
+            if len(batch) == 5000:
+                Review.objects.bulk_create(batch)
+                batch = []
+        Review.objects.bulk_create(batch)
+        self.stdout.write(f"Seeded {count} reviews in {time.perf_counter() - started:.1f}s")
+        return restaurant
+
+    def compare_offset(self, restaurant, pages, page_size):
+        """The deepest walked page, fetched both ways, with the listing's query shape"""
+        ordering = SORT_ORDERINGS['newest']
+        reviews = Review.objects.filter(restaurant=restaurant).select_related('user').order_by(*ordering)
+        offset = (pages - 1) * page_size
+        started = time.perf_counter()
+        rows = list(reviews[offset:offset + page_size + 1])
+        offset_ms = (time.perf_counter() - started) * 1000
+        if not rows:
+            return
+        previous = reviews[offset - 1] if offset else None
+        started = time.perf_counter()
+        if previous is not None:
+            list(keyset_filter(reviews, ordering, [previous.created_at, previous.id])[:page_size + 1])
+        keyset_ms = (time.perf_counter() - started) * 1000
+        self.stdout.write(f"page {pages} by OFFSET {offset}: {offset_ms:.1f} ms, by keyset: {keyset_ms:.1f} ms")
+
+
+def walk(client, url, pages):
+    """Follow `next` links for up to `pages` pages, returning each page's time in ms"""
+    timings = []
+    while url and len(timings) < pages:
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise CommandError(f"{url} returned {response.status_code}")
+        url = response.json()['next']
+    return timings
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from reviews.ingestion import ingest
+from reviews.models import ReviewSourceLink
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetch new reviews from the platforms in REVIEW_SOURCES for every active "
+        "restaurant listing, and save them in batches. Run it at least daily (e.g. hourly "
+        "from cron); each run continues from where the last one stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', action='append', help='Only these sources, e.g. GOOGLE (repeatable)')
+        parser.add_argument('--restaurant', type=int, action='append', help='Only these restaurants (repeatable)')
+        parser.add_argument('--workers', type=int, default=4, help='Pages fetched at once')
+        parser.add_argument('--batch-size', type=int, default=500, help='Reviews saved per transaction')
+        parser.add_argument('--max-pages', type=int, help='Pages per listing in this run')
+
+    def handle(self, *args, **options):
+        links = ReviewSourceLink.objects.filter(is_active=True, restaurant__is_deleted=False).order_by('pk')
+        if options['source']:
+            links = links.filter(source__in=options['source'])
+        if options['restaurant']:
+            links = links.filter(restaurant_id__in=options['restaurant'])
+        stats = ingest(
+            list(links), max_workers=options['workers'], batch_size=options['batch_size'],
+            max_pages=options['max_pages'],
+        )
+        message = f"Fetched {stats['pages']} pages, saved {stats['reviews']} reviews"
+        if stats['errors']:
+            self.stdout.write(self.style.WARNING(f"{message}; {stats['errors']} listings failed, see last_error"))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.moderation import moderate_pending, rescan_step, start_rescan
+
+
+class Command(BaseCommand):
+    help = (
+        "Moderation worker: score pending reviews in batches and flag offensive ones. "
+        "When the moderation terms change it also re-moderates every review, a batch "
+        "at a time between pending batches. Runs until interrupted unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Reviews per batch')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when there is no work')
+        parser.add_argument('--once', action='store_true', help='Exit once there is no work left')
+        parser.add_argument('--rescan', action='store_true', help='Re-moderate every review, even if the terms are unchanged')
+
+    def handle(self, *args, **options):
+        if options['rescan']:
+            start_rescan()
+        moderated = rescanned = 0
+        try:
+            while True:
+                pending = moderate_pending(options['batch_size'])
+                rescan = rescan_step(options['batch_size'])
+                moderated += pending
+                rescanned += rescan
+                if not pending and not rescan:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Moderated {moderated} pending and {rescanned} rescanned reviews"))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from restaurants.models import Restaurant
+from reviews.aggregates import rebuild_daily_stats, rebuild_summaries
+from reviews.leaderboards import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild every restaurant's rating summary and daily review stats from its "
+        "reviews, in batches of restaurants, then every leaderboard, and report the "
+        "ones that had drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Restaurants per aggregate query')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it')
+
+    def handle(self, *args, **options):
+        restaurants = Restaurant.all_objects.order_by('pk').values_list('pk', flat=True)
+        checked = 0
+        drifted = []
+        drifted_days = []
+        last_id = 0
+        while True:
+            ids = list(restaurants.filter(pk__gt=last_id)[:options['batch_size']])
+            if not ids:
+                break
+            last_id = ids[-1]
+            checked += len(ids)
+            drifted += rebuild_summaries(ids, dry_run=options['dry_run'])
+            drifted_days += rebuild_daily_stats(ids, dry_run=options['dry_run'])
+        drifted_boards = [str(board) for board in rebuild_leaderboards(dry_run=options['dry_run'])]
+
+        verb = 'Found' if options['dry_run'] else 'Fixed'
+        message = (
+            f"Checked {checked} restaurants. {verb} {len(drifted)} drifted summaries{self.sample(drifted)} "
+            f"and {len(drifted_days)} drifted daily stats{self.sample(drifted_days)}, "
+            f"then {len(drifted_boards)} drifted leaderboards{self.sample(drifted_boards)}"
+        )
+        if drifted or drifted_days or drifted_boards:
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
+
+    @staticmethod
+    def sample(ids):
+        if not ids:
+            return ''
+        return f" ({', '.join(map(str, ids[:20]))}{' ...' if len(ids) > 20 else ''})"
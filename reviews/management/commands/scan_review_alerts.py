@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from reviews.alerts import scan_reviews
+from reviews.models import Review
+
+
+class Command(BaseCommand):
+    help = (
+        "Scan existing reviews for their owners' alert keywords and write the alerts in "
+        "batches. Reviews saved through the API are scanned as they are written; run this "
+        "after imports that bypass model signals, or to apply new keywords to old reviews."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant', type=int, action='append', help='Only these restaurants (repeatable)')
+        parser.add_argument('--since-id', type=int, default=0, help='Only reviews with a greater id')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Reviews per fetch and alerts per insert')
+
+    def handle(self, *args, **options):
+        reviews = Review.objects.filter(id__gt=options['since_id'])
+        if options['restaurant']:
+            reviews = reviews.filter(restaurant_id__in=options['restaurant'])
+        written = scan_reviews(reviews, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} alerts"))
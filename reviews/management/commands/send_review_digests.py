@@ -0,0 +1,33 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.digests import digest_days, send_digests
+from reviews.models import DigestRun
+
+
+class Command(BaseCommand):
+    help = (
+        "Email the daily or weekly review digest to every subscribed owner. Run the daily "
+        "digest every morning and the weekly one once a week; a period already sent is "
+        "skipped unless --force is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('frequency', choices=['daily', 'weekly'])
+        parser.add_argument('--date', type=date.fromisoformat, help='Send as if today were this date (YYYY-MM-DD)')
+        parser.add_argument('--chunk-size', type=int, default=100, help='Messages per send to the mail backend')
+        parser.add_argument('--force', action='store_true', help='Send even if this period was already sent')
+
+    def handle(self, *args, **options):
+        frequency = options['frequency'].upper()
+        first_day, last_day = digest_days(frequency, options['date'])
+        sent = DigestRun.objects.filter(frequency=frequency, last_day=last_day, status='SUCCEEDED').exists()
+        if sent and not options['force']:
+            raise CommandError(f"The {options['frequency']} digest up to {last_day} was already sent; use --force")
+
+        run = send_digests(frequency, options['date'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {run.emails_sent} digests for {first_day} to {last_day} covering {run.reviews} reviews "
+            f"at {run.restaurants} restaurants in {run.duration.total_seconds():.2f}s"
+        ))
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.5 on 2026-10-19 07:45
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('restaurants', '0003_soft_delete'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Review',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author_name', models.CharField(blank=True, max_length=150)),
+                ('rating', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)])),
+                ('text', models.TextField(blank=True)),
+                ('source', models.CharField(choices=[('DIRECT', 'Restaurant Reviews'), ('GOOGLE', 'Google'), ('YELP', 'Yelp'), ('TRIPADVISOR', 'Tripadvisor')], default='DIRECT', max_length=20)),
+                ('status', models.CharField(choices=[('NEW', 'New'), ('RESPONDED', 'Responded'), ('FLAGGED', 'Flagged')], default='NEW', max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='restaurants.restaurant')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviews', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['restaurant', 'created_at', 'id'], name='review_restaurant_recent_idx'), models.Index(fields=['restaurant', 'rating', 'created_at', 'id'], name='review_restaurant_rating_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.5 on 2026-10-19 07:52
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_daily_review_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alert_keywords', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['keyword'],
+                'constraints': [models.UniqueConstraint(fields=('owner', 'keyword'), name='alert_keyword_owner_keyword')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReviewAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keywords', models.JSONField(default=list)),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_alerts', to=settings.AUTH_USER_MODEL)),
+                ('review', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='reviews.review')),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['owner', 'created_at', 'id'], name='review_alert_owner_recent_idx')],
+                'constraints': [models.UniqueConstraint(fields=('review', 'owner'), name='review_alert_review_owner')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.5 on 2026-10-19 07:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0003_soft_delete'),
+        ('reviews', '0004_review_alerts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100, unique=True)),
+                ('weight', models.FloatField(default=1.0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['term'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReviewFlag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('AUTO', 'Automatic moderation')], default='AUTO', max_length=20)),
+                ('terms', models.JSONField(default=list)),
+                ('score', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='moderation_state',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('CLEAN', 'Clean'), ('FLAGGED', 'Flagged')], default='PENDING', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('moderation_state', 'PENDING')), fields=['id'], name='review_moderation_pending_idx'),
+        ),
+        migrations.AddField(
+            model_name='reviewflag',
+            name='review',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flags', to='reviews.review'),
+        ),
+        migrations.AddConstraint(
+            model_name='reviewflag',
+            constraint=models.UniqueConstraint(fields=('review', 'source'), name='review_flag_review_source'),
+        ),
+    ]
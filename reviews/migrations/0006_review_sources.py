@@ -0,0 +1,47 @@
+# Generated by Django 5.1.5 on 2026-10-19 07:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0003_soft_delete'),
+        ('reviews', '0005_moderation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewSourceLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('GOOGLE', 'Google'), ('YELP', 'Yelp'), ('TRIPADVISOR', 'Tripadvisor')], max_length=20)),
+                ('place_id', models.CharField(max_length=255)),
+                ('cursor', models.CharField(blank=True, max_length=255)),
+                ('is_active', models.BooleanField(default=True)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(fields=('source', 'external_id'), name='review_source_external_id'),
+        ),
+        migrations.AddField(
+            model_name='reviewsourcelink',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_source_links', to='restaurants.restaurant'),
+        ),
+        migrations.AddConstraint(
+            model_name='reviewsourcelink',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'source'), name='review_source_link_restaurant_source'),
+        ),
+    ]
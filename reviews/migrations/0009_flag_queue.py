@@ -0,0 +1,50 @@
+# Generated by Django 5.1.5 on 2026-10-19 08:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_review_replies'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reviewflag',
+            name='claim_token',
+            field=models.UUIDField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reviewflag',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claimed_flags', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='reviewflag',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reviewflag',
+            name='note',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='reviewflag',
+            name='resolved_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reviewflag',
+            name='status',
+            field=models.CharField(choices=[('OPEN', 'Open'), ('UNDER_REVIEW', 'Under Review'), ('FORWARDED', 'Forwarded'), ('RESOLVED', 'Resolved')], default='OPEN', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='reviewflag',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='review_flag_queue_idx'),
+        ),
+    ]
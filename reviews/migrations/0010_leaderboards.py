@@ -0,0 +1,66 @@
+# Generated by Django 5.1.5 on 2026-10-19 08:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0003_soft_delete'),
+        ('reviews', '0009_flag_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Leaderboard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('CITY', 'City'), ('CUISINE', 'Cuisine')], max_length=10)),
+                ('key', models.CharField(max_length=100)),
+                ('built_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+            ],
+            options={
+                'verbose_name_plural': 'leaderboard entries',
+            },
+        ),
+        migrations.AddField(
+            model_name='ratingsummary',
+            name='score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='ratingsummary',
+            index=models.Index(fields=['-score', 'restaurant'], name='rating_summary_score_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboard',
+            constraint=models.UniqueConstraint(fields=('kind', 'key'), name='leaderboard_kind_key'),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='board',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='reviews.leaderboard'),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='restaurants.restaurant'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['board', '-score', 'restaurant'], name='leaderboard_entry_rank_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('board', 'restaurant'), name='leaderboard_entry_board_restaurant'),
+        ),
+    ]
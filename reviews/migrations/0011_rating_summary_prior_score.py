@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-19 08:34
+
+import reviews.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_leaderboards'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ratingsummary',
+            name='score',
+            field=models.FloatField(default=reviews.models.prior_score),
+        ),
+    ]
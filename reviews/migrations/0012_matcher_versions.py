@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-19 08:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_rating_summary_prior_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertkeyword',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='moderationterm',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
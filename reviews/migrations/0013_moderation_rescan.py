@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-19 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_matcher_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationRescan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('terms_version', models.CharField(max_length=100)),
+                ('last_id', models.PositiveBigIntegerField(default=0)),
+                ('done', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
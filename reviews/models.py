@@ -1,3 +1,355 @@
+from django.conf import settings
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+from restaurants.models import Restaurant
+
+
+class Review(models.Model):
+    SOURCE_CHOICES = (
+        ('DIRECT', 'Restaurant Reviews'),
+        ('GOOGLE', 'Google'),
+        ('YELP', 'Yelp'),
+        ('TRIPADVISOR', 'Tripadvisor'),
+    )
+
+    STATUS_CHOICES = (
+        ('NEW', 'New'),
+        ('RESPONDED', 'Responded'),
+        ('FLAGGED', 'Flagged'),
+    )
+
+    MODERATION_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('CLEAN', 'Clean'),
+        ('FLAGGED', 'Flagged'),
+    )
+
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='reviews')
+    # Null for reviews imported from other platforms
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='reviews'
+    )
+    author_name = models.CharField(max_length=150, blank=True)
+    rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
+    text = models.TextField(blank=True)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='DIRECT')
+    # The review's id on its source platform; null for direct reviews
+    external_id = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='NEW')
+    # The owner's public reply, changed only through reviews.replies
+    reply = models.TextField(blank=True)
+    reply_version = models.PositiveIntegerField(default=0)
+    replied_at = models.DateTimeField(null=True, blank=True)
+    replied_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='review_replies'
+    )
+    # Set by the moderation worker (reviews.moderation); back to PENDING when the text changes
+    moderation_state = models.CharField(max_length=20, choices=MODERATION_CHOICES, default='PENDING')
+    # Not auto_now_add: imported reviews keep their original date
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Keyset pagination: every listing order is a prefix-equality on
+            # restaurant (and rating when filtered) plus a scan of these
+            models.Index(fields=['restaurant', 'created_at', 'id'], name='review_restaurant_recent_idx'),
+            models.Index(fields=['restaurant', 'rating', 'created_at', 'id'], name='review_restaurant_rating_idx'),
+            # The moderation worker's queue
+            models.Index(fields=['id'], condition=models.Q(moderation_state='PENDING'),
+                         name='review_moderation_pending_idx'),
+        ]
+        constraints = [
+            # Conflict target of ingestion upserts; nulls never conflict
+            models.UniqueConstraint(fields=['source', 'external_id'], name='review_source_external_id'),
+        ]
+
+    def __str__(self):
+        return f"{self.rating}* review of {self.restaurant_id}"
+
+
+class ReviewSourceLink(models.Model):
+    """A restaurant's listing on another platform, and how far its reviews have been ingested"""
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='review_source_links')
+    source = models.CharField(max_length=20, choices=Review.SOURCE_CHOICES[1:])
+    place_id = models.CharField(max_length=255)
+    # Opaque to us; handed back to the source to fetch what came after
+    cursor = models.CharField(max_length=255, blank=True)
+    is_active = models.BooleanField(default=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'source'], name='review_source_link_restaurant_source'),
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant_id} on {self.source}: {self.place_id}"
+
+
+def prior_score():
+    """The score of a restaurant without reviews, aggregates.bayesian_score(0, 0)"""
+    return settings.RATING_PRIOR_MEAN
+
+
+class RatingSummary(models.Model):
+    """Per-restaurant rating aggregates, kept current by reviews.aggregates"""
+    restaurant = models.OneToOneField(
+        Restaurant, on_delete=models.CASCADE, primary_key=True, related_name='rating_summary'
+    )
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    last_review_at = models.DateTimeField(null=True, blank=True)
+    # Average shrunk towards RATING_PRIOR_MEAN, see aggregates.bayesian_score.
+    # With no reviews the average is None and the score is the prior itself.
+    score = models.FloatField(default=prior_score)
+
+    class Meta:
+        verbose_name_plural = 'rating summaries'
+        indexes = [
+            # Leaderboard rebuilds take the best scores of a city or cuisine
+            models.Index(fields=['-score', 'restaurant'], name='rating_summary_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant_id}: {self.average} from {self.review_count}"
+
+    @property
+    def average(self):
+        return round(self.rating_sum / self.review_count, 2) if self.review_count else None
+
+    @property
+    def histogram(self):
+        return {stars: getattr(self, f'stars_{stars}') for stars in range(1, 6)}
+
+
+class Leaderboard(models.Model):
+    """The TOP_RATED_SIZE best scored restaurants of a city or cuisine, kept current by reviews.leaderboards"""
+    KIND_CHOICES = (
+        ('CITY', 'City'),
+        ('CUISINE', 'Cuisine'),
+    )
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Lower-cased city name, or CuisineType id
+    key = models.CharField(max_length=100)
+    built_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'key'], name='leaderboard_kind_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.key}"
+
+
+class LeaderboardEntry(models.Model):
+    board = models.ForeignKey(Leaderboard, on_delete=models.CASCADE, related_name='entries')
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    score = models.FloatField()
+
+    class Meta:
+        verbose_name_plural = 'leaderboard entries'
+        constraints = [
+            models.UniqueConstraint(fields=['board', 'restaurant'], name='leaderboard_entry_board_restaurant'),
+        ]
+        indexes = [
+            models.Index(fields=['board', '-score', 'restaurant'], name='leaderboard_entry_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.board}: {self.restaurant_id} ({self.score:.3f})"
+
+
+class DailyReviewStats(models.Model):
+    """Review counts per restaurant per day (in TIME_ZONE), kept current by reviews.aggregates"""
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='daily_review_stats')
+    day = models.DateField()
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    # Reviews from that day with status RESPONDED
+    responded_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'daily review stats'
+        constraints = [
+            # Also the index for dashboard range scans
+            models.UniqueConstraint(fields=['restaurant', 'day'], name='daily_review_stats_restaurant_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant_id} on {self.day}: {self.review_count} reviews"
+
+
+class AlertKeyword(models.Model):
+    """A word or phrase an owner wants to hear about when it appears in a review of their restaurants"""
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='alert_keywords')
+    # Stored lowercased; matched case-insensitively on whole words
+    keyword = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Part of the keyword-set version, see reviews.alerts.table_version
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['keyword']
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'keyword'], name='alert_keyword_owner_keyword'),
+        ]
+
+    def __str__(self):
+        return self.keyword
+
+
+class ReviewAlert(models.Model):
+    """A review that contained some of its restaurant owner's keywords"""
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='alerts')
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='review_alerts')
+    keywords = models.JSONField(default=list)
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        constraints = [
+            models.UniqueConstraint(fields=['review', 'owner'], name='review_alert_review_owner'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'created_at', 'id'], name='review_alert_owner_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"Alert for review {self.review_id}: {', '.join(self.keywords)}"
+
+
+class ModerationTerm(models.Model):
+    """Offensive word or phrase; a review scoring at least MODERATION_FLAG_THRESHOLD is flagged"""
+    # Stored normalized, see reviews.moderation.normalize_term
+    term = models.CharField(max_length=100, unique=True)
+    weight = models.FloatField(default=1.0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Part of the term-set version, see reviews.alerts.table_version
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['term']
+
+    def __str__(self):
+        return self.term
+
+
+class ModerationRescan(models.Model):
+    """Progress of re-moderating every review after the terms changed; a single row, see reviews.moderation"""
+    # The term-set version the pass is for
+    terms_version = models.CharField(max_length=100)
+    last_id = models.PositiveBigIntegerField(default=0)
+    done = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Rescan for terms {self.terms_version}: {'done' if self.done else f'after {self.last_id}'}"
+
+
+class ReviewFlag(models.Model):
+    SOURCE_CHOICES = (
+        ('AUTO', 'Automatic moderation'),
+    )
+
+    STATUS_CHOICES = (
+        ('OPEN', 'Open'),
+        ('UNDER_REVIEW', 'Under Review'),
+        ('FORWARDED', 'Forwarded'),
+        ('RESOLVED', 'Resolved'),
+    )
+
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='flags')
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='AUTO')
+    terms = models.JSONField(default=list)
+    score = models.FloatField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Work queue state, see reviews.flagqueue
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='OPEN')
+    claimed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='claimed_flags'
+    )
+    claim_token = models.UUIDField(null=True, blank=True, db_index=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    note = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        constraints = [
+            models.UniqueConstraint(fields=['review', 'source'], name='review_flag_review_source'),
+        ]
+        indexes = [
+            # Claims take the oldest open flags, or ones whose lease ran out
+            models.Index(fields=['status', 'created_at', 'id'], name='review_flag_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"Flag on review {self.review_id}: {', '.join(self.terms)}"
+
+
+class DigestSubscription(models.Model):
+    """An owner's review digest email preference"""
+    FREQUENCY_CHOICES = (
+        ('DAILY', 'Daily'),
+        ('WEEKLY', 'Weekly'),
+    )
+
+    owner = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='digest_subscription'
+    )
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default='WEEKLY')
+    is_active = models.BooleanField(default=True)
+    last_sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_frequency_display()} digest for {self.owner_id}"
+
+
+class DigestRun(models.Model):
+    """One run of the digest job, for monitoring"""
+    STATUS_CHOICES = (
+        ('RUNNING', 'Running'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED', 'Failed'),
+    )
+
+    frequency = models.CharField(max_length=10, choices=DigestSubscription.FREQUENCY_CHOICES)
+    # The days covered, inclusive
+    first_day = models.DateField()
+    last_day = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='RUNNING')
+    started_at = models.DateTimeField(default=timezone.now)
+    duration = models.DurationField(null=True, blank=True)
+    # Owners sent a digest
+    owners = models.PositiveIntegerField(default=0)
+    restaurants = models.PositiveIntegerField(default=0)
+    reviews = models.PositiveIntegerField(default=0)
+    emails_sent = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['frequency', 'last_day'], name='digest_run_frequency_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.frequency} digest for {self.first_day}-{self.last_day}: {self.status}"
@@ -0,0 +1,160 @@
+"""
+Automatic moderation of review text.
+
+Submitting a review doesn't wait for moderation: new and edited reviews are
+saved with moderation_state PENDING and a worker (`manage.py
+moderate_reviews`) scores them in batches, then writes the states and
+flags with one UPDATE per state and one INSERT of flags per batch.
+
+Scoring normalizes the text (accents stripped, common digit/symbol letter
+substitutions undone, letters repeated 3+ times squeezed) and finds every
+`ModerationTerm` in one pass with the same word-level Aho-Corasick matcher
+as keyword alerts; the score is the sum of the weights of the distinct
+terms found. Terms are normalized the same way when saved.
+
+When the term list changes the worker also re-moderates the whole corpus,
+one id-ordered batch per loop between pending batches, so new submissions
+keep being moderated during a rescan. The term-set version and the pass's
+progress are kept in the database (`ModerationRescan`), so any worker, or
+the next cron run, continues it and only a real term change starts one.
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import transaction
+
+from .alerts import KeywordMatcher, MatcherCache, normalize_keyword, table_version
+from .models import ModerationRescan, ModerationTerm, Review, ReviewFlag
+
+RESCAN_ID = 1
+
+SUBSTITUTIONS = str.maketrans({'0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '@': 'a', '$': 's'})
+REPEATS = re.compile(r'(\w)\1{2,}')
+
+
+def normalize_text(text):
+    if not text.isascii():
+        text = ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+    return REPEATS.sub(r'\1', text.lower().translate(SUBSTITUTIONS))
+
+
+def normalize_term(term):
+    return normalize_keyword(normalize_text(term))
+
+
+class TermScorer:
+    def __init__(self, terms):
+        self.weights = dict(terms)
+        self.matcher = KeywordMatcher((term, None) for term in self.weights)
+
+    def score(self, text):
+        """(score, sorted terms found)"""
+        terms = sorted(self.matcher.find(normalize_text(text)))
+        return sum(self.weights[term] for term in terms), terms
+
+
+scorers = MatcherCache(
+    lambda: table_version(ModerationTerm.objects),
+    lambda: TermScorer(ModerationTerm.objects.values_list('term', 'weight')),
+)
+
+
+def _moderate(rows):
+    scorer = scorers.get()
+    threshold = settings.MODERATION_FLAG_THRESHOLD
+    clean, flags = [], []
+    for review_id, text in rows:
+        score, terms = scorer.score(text)
+        if terms and score >= threshold:
+            flags.append(ReviewFlag(review_id=review_id, source='AUTO', terms=terms, score=score))
+        else:
+            clean.append(review_id)
+
+    Review.objects.filter(id__in=clean).update(moderation_state='CLEAN')
+    # Flags a moderator has already picked up are theirs to close
+    ReviewFlag.objects.filter(review_id__in=clean, source='AUTO', status='OPEN').delete()
+    if flags:
+        flagged = [flag.review_id for flag in flags]
+        Review.objects.filter(id__in=flagged).update(moderation_state='FLAGGED')
+        # A flag scored as before is left as it is. One whose terms or score
+        # changed is raised afresh, even if it was closed: open, unclaimed
+        # and with a new SLA.
+        current = {
+            review_id: (terms, score) for review_id, terms, score in
+            ReviewFlag.objects.filter(review_id__in=flagged, source='AUTO').values_list('review_id', 'terms', 'score')
+        }
+        raised = [flag for flag in flags if current.get(flag.review_id) != (flag.terms, flag.score)]
+        ReviewFlag.objects.bulk_create(
+            raised, update_conflicts=True, unique_fields=['review', 'source'], update_fields=[
+                'terms', 'score', 'created_at', 'status', 'claimed_by', 'claim_token', 'lease_expires_at',
+                'resolved_at', 'note',
+            ],
+        )
+    return len(flags)
+
+
+def moderate_batch(reviews, batch_size):
+    """Moderate the first batch_size of `reviews` in id order; returns their ids
+
+    Rows locked by another worker, or by a request editing them, are skipped.
+    """
+    with transaction.atomic():
+        rows = list(
+            reviews.order_by('id').select_for_update(skip_locked=True).values_list('id', 'text')[:batch_size]
+        )
+        if rows:
+            _moderate(rows)
+    return [review_id for review_id, _ in rows]
+
+
+def moderate_pending(batch_size=500):
+    """Moderate the oldest pending reviews; returns how many there were"""
+    return len(moderate_batch(Review.objects.filter(moderation_state='PENDING'), batch_size))
+
+
+def _terms_version():
+    """The version of the scorer the next batch uses, as stored in ModerationRescan"""
+    scorers.get(force=True)
+    return ':'.join(str(part) for part in scorers.version)
+
+
+def start_rescan():
+    """Re-moderate the whole corpus from the start, whatever the progress of a current rescan"""
+    ModerationRescan.objects.update_or_create(
+        pk=RESCAN_ID, defaults={'terms_version': _terms_version(), 'last_id': 0, 'done': False}
+    )
+
+
+def rescan_step(batch_size=1000):
+    """Re-moderate the next batch of the corpus if the terms changed since the last full pass
+
+    Rows the batch passed over because they were locked are queued as
+    PENDING for moderate_pending, rather than left scored on the old terms.
+    Returns how many reviews were moderated or queued; 0 once the pass is
+    complete.
+    """
+    version = _terms_version()
+    with transaction.atomic():
+        # Without a row yet, reviews have only been moderated on the current terms
+        state, _ = ModerationRescan.objects.select_for_update().get_or_create(
+            pk=RESCAN_ID, defaults={'terms_version': version, 'done': True}
+        )
+        if state.terms_version != version:
+            state.terms_version, state.last_id, state.done = version, 0, False
+        elif state.done:
+            return 0
+        reviews = Review.objects.filter(id__gt=state.last_id)
+        ids = moderate_batch(reviews, batch_size)
+        # Passed over below the last moderated row, or the whole batch if every row was locked
+        passed = reviews.exclude(id__in=ids).filter(id__lt=ids[-1]) if ids else reviews
+        skipped = list(passed.order_by('id').values_list('id', flat=True)[:batch_size])
+        if skipped:
+            # Waits for the lock holders, which only hold their rows for one batch or request
+            Review.objects.filter(id__in=skipped).update(moderation_state='PENDING')
+        if ids or skipped:
+            state.last_id = max(ids[-1:] + skipped[-1:])
+        else:
+            state.done = True
+        state.save()
+    return len(ids) + len(skipped)
@@ -0,0 +1,103 @@
+"""
+Keyset ("seek") pagination for review listings.
+
+OFFSET pagination reads and discards every row before the requested page,
+so deep pages of a 10k+ review restaurant get slower the further you go.
+Here each page ends with an opaque cursor holding the sort key of its last
+row, and the next page asks for rows strictly after that key, which is an
+index range scan whatever the depth.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import F, Field, Func, Value
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode(values):
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode(cursor, fields):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise ValueError(cursor)
+        return [
+            datetime.fromisoformat(value) if field.lstrip('-') == 'created_at' else int(value)
+            for field, value in zip(fields, values)
+        ]
+    except (ValueError, TypeError):
+        raise ValidationError({'cursor': 'Invalid cursor.'})
+
+
+class RowValue(Func):
+    """`(a, b, c)`, compared element by element, which the database can turn into an index range"""
+    function = ''
+    output_field = Field()
+
+
+def keyset_filter(queryset, ordering, values):
+    """Rows strictly after `values` in `ordering` (all ascending or all descending)"""
+    descending = {field.startswith('-') for field in ordering}
+    if len(descending) != 1:
+        raise ValueError(f"Keyset ordering must use one direction: {ordering}")
+    key = RowValue(*[F(field.lstrip('-')) for field in ordering])
+    bound = RowValue(*[Value(value) for value in values])
+    lookup = 'lt' if descending.pop() else 'gt'
+    return queryset.alias(_keyset=key).filter(**{f'_keyset__{lookup}': bound})
+
+
+class KeysetPagination(BasePagination):
+    """Pages ordered by `view.get_ordering()`, which must end in a unique field"""
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = view.get_ordering()
+        page_size = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+        queryset = queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = keyset_filter(queryset, self.ordering, _decode(cursor, self.ordering))
+
+        # One extra row tells whether there is a next page
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        cursor = _encode([getattr(last, field.lstrip('-')) for field in self.ordering])
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
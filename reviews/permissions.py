@@ -0,0 +1,15 @@
+from rest_framework import permissions
+
+
+class IsReviewAuthorOrReadOnly(permissions.BasePermission):
+    def has_object_permission(self, request, view, obj):
+        if request.method in permissions.SAFE_METHODS:
+            return True
+        return request.user.is_staff or obj.user_id == request.user.id
+
+
+class IsRestaurantOwnerOrStaff(permissions.BasePermission):
+    """For views whose object is the restaurant itself"""
+
+    def has_object_permission(self, request, view, obj):
+        return request.user.is_staff or obj.owner_id == request.user.id
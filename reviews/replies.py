@@ -0,0 +1,78 @@
+"""
+Owner replies to reviews, with optimistic concurrency.
+
+Locking a review while someone types a reply would hold a row lock for as
+long as they take, blocking the moderation worker and every other writer.
+Instead each review carries a reply_version: a client sends back the
+version it started from, and the reply is written by a single
+compare-and-swap UPDATE that only matches while the version is unchanged
+(and bumps it). If someone else replied in between, nothing is written and
+the caller gets the current reply to merge with. No lock outlives the
+UPDATE statement.
+
+Replying marks a NEW review RESPONDED, and removing the reply marks it NEW
+again; as the UPDATE skips model signals, the daily stats are adjusted
+here.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import aggregates
+from .models import Review
+
+REPLY_FIELDS = ('reply', 'reply_version', 'replied_at', 'replied_by_id')
+
+
+class ReplyConflict(Exception):
+    def __init__(self, current):
+        super().__init__('The reply was changed since this version')
+        self.current = current
+
+
+def current_reply(review_id):
+    return Review.objects.values(*REPLY_FIELDS).get(pk=review_id)
+
+
+def save_reply(review_id, text, version, user=None):
+    """Replace the reply of a review still at reply_version `version`; an empty text removes it
+
+    Returns the new reply fields, or raises ReplyConflict with the current ones.
+    """
+    with transaction.atomic():
+        review = Review.objects.values('restaurant_id', 'rating', 'created_at', 'status', 'reply_version').get(
+            pk=review_id
+        )
+        if review['reply_version'] != version:
+            raise ReplyConflict(current_reply(review_id))
+
+        status = review['status']
+        if text and status == 'NEW':
+            status = 'RESPONDED'
+        elif not text and status == 'RESPONDED':
+            status = 'NEW'
+        now = timezone.now()
+        # The status read above is part of the condition, so the daily stats
+        # change below is exactly the one this UPDATE made
+        updated = Review.objects.filter(pk=review_id, reply_version=version, status=review['status']).update(
+            reply=text,
+            reply_version=F('reply_version') + 1,
+            replied_at=now if text else None,
+            replied_by=user if text else None,
+            status=status,
+            updated_at=now,
+        )
+        if not updated:
+            raise ReplyConflict(current_reply(review_id))
+
+        if status != review['status']:
+            counted = (review['restaurant_id'], review['rating'], review['created_at'])
+            aggregates.update_daily_stats(
+                counted + (review['status'] == 'RESPONDED',), counted + (status == 'RESPONDED',)
+            )
+    return {
+        'reply': text,
+        'reply_version': version + 1,
+        'replied_at': now if text else None,
+        'replied_by_id': user.pk if text and user else None,
+    }
@@ -0,0 +1,114 @@
+from django.conf import settings
+from rest_framework import serializers
+
+from .alerts import normalize_keyword
+from .models import AlertKeyword, DigestSubscription, RatingSummary, Review, ReviewAlert, ReviewFlag
+
+
+class ReviewSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True, default=None)
+
+    class Meta:
+        model = Review
+        fields = ['id', 'restaurant', 'user', 'username', 'author_name', 'rating', 'text',
+                  'source', 'status', 'moderation_state', 'reply', 'reply_version', 'replied_at',
+                  'created_at', 'updated_at']
+        read_only_fields = ['restaurant', 'user', 'author_name', 'source', 'status', 'moderation_state',
+                            'reply', 'reply_version', 'replied_at', 'created_at', 'updated_at']
+
+    def update(self, instance, validated_data):
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        # Only the edited fields: a full save would write back a reply (and
+        # status) the owner saved since this instance was loaded
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
+
+class ReviewReplySerializer(serializers.Serializer):
+    text = serializers.CharField(source='reply', max_length=2000)
+    # The reply_version the reply was written against; 0 for a first reply
+    version = serializers.IntegerField(source='reply_version', min_value=0)
+    replied_at = serializers.DateTimeField(read_only=True)
+    replied_by = serializers.IntegerField(source='replied_by_id', read_only=True)
+
+
+class RatingSummarySerializer(serializers.ModelSerializer):
+    average = serializers.FloatField(read_only=True)
+    histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+
+    class Meta:
+        model = RatingSummary
+        fields = ['review_count', 'average', 'score', 'histogram', 'last_review_at']
+
+
+class ReviewAnalyticsQuerySerializer(serializers.Serializer):
+    period = serializers.ChoiceField(choices=['day', 'week', 'month'], default='week')
+    since = serializers.DateField(required=False)
+    until = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get('since') and attrs.get('until') and attrs['since'] > attrs['until']:
+            raise serializers.ValidationError({'since': 'Must not be after until.'})
+        return attrs
+
+
+class AlertKeywordSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AlertKeyword
+        fields = ['id', 'keyword', 'created_at']
+        read_only_fields = ['created_at']
+
+    def validate_keyword(self, value):
+        keyword = normalize_keyword(value)
+        if not keyword:
+            raise serializers.ValidationError('Enter a word or phrase.')
+        owner = self.context['request'].user
+        if AlertKeyword.objects.filter(owner=owner, keyword=keyword).exists():
+            raise serializers.ValidationError('You already have this keyword.')
+        if owner.alert_keywords.count() >= settings.REVIEW_ALERT_MAX_KEYWORDS:
+            raise serializers.ValidationError(
+                f'You can have at most {settings.REVIEW_ALERT_MAX_KEYWORDS} keywords.'
+            )
+        return keyword
+
+
+class ReviewAlertSerializer(serializers.ModelSerializer):
+    review = ReviewSerializer(read_only=True)
+
+    class Meta:
+        model = ReviewAlert
+        fields = ['id', 'review', 'keywords', 'is_read', 'created_at']
+        read_only_fields = ['keywords', 'created_at']
+
+
+class DigestSubscriptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DigestSubscription
+        fields = ['frequency', 'is_active', 'last_sent_at']
+        read_only_fields = ['last_sent_at']
+
+
+class ReviewFlagSerializer(serializers.ModelSerializer):
+    review = ReviewSerializer(read_only=True)
+    due_at = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReviewFlag
+        fields = ['id', 'review', 'source', 'terms', 'score', 'status', 'created_at', 'due_at', 'lease_expires_at']
+
+    def get_due_at(self, obj):
+        return serializers.DateTimeField().to_representation(obj.created_at + settings.MODERATION_FLAG_SLA)
+
+
+class FlagClaimSerializer(serializers.Serializer):
+    batch_size = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+class FlagUpdateSerializer(serializers.Serializer):
+    ACTIONS = ('forward', 'resolve', 'release', 'extend')
+
+    token = serializers.UUIDField()
+    flags = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=100)
+    action = serializers.ChoiceField(choices=ACTIONS)
+    note = serializers.CharField(required=False, allow_blank=True, default='')
@@ -0,0 +1,112 @@
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from restaurants.models import Restaurant
+from . import aggregates, alerts, leaderboards, moderation
+from .models import AlertKeyword, ModerationTerm, Review
+
+COUNTED_FIELDS = ('restaurant_id', 'rating', 'created_at', 'status')
+# What decides which leaderboards a restaurant is on
+RANKED_FIELDS = ('city', 'is_approved', 'is_deleted')
+
+
+def _counted(instance):
+    return (instance.restaurant_id, instance.rating, instance.created_at, instance.status == 'RESPONDED')
+
+
+@receiver(post_init, sender=Review)
+def remember_counted(sender, instance, **kwargs):
+    """Snapshot what the aggregates counted for this review, so saves can diff it without a query"""
+    # Read __dict__ so deferred fields aren't loaded here
+    values = instance.__dict__
+    if instance.pk is not None and all(values.get(field) is not None for field in COUNTED_FIELDS):
+        instance._counted = _counted(instance)
+    else:
+        instance._counted = None
+    instance._saved_text = values.get('text') if instance.pk is not None else None
+
+
+def _text_changed(instance, created):
+    return created or ('text' in instance.__dict__ and instance.text != instance._saved_text)
+
+
+@receiver(post_save, sender=Review)
+def update_aggregates(sender, instance, created, **kwargs):
+    counted, current = instance._counted, _counted(instance)
+    rescored = []
+    if created:
+        aggregates.review_added(instance.restaurant_id, instance.rating, instance.created_at)
+        aggregates.update_daily_stats(new=current)
+        rescored = [instance.restaurant_id]
+    elif counted is not None:  # None when loaded with deferred fields
+        old_restaurant_id, old_rating = counted[:2]
+        if old_restaurant_id != instance.restaurant_id:
+            aggregates.review_removed(old_restaurant_id, old_rating, instance.created_at)
+            aggregates.review_added(instance.restaurant_id, instance.rating, instance.created_at)
+            rescored = [old_restaurant_id, instance.restaurant_id]
+        elif old_rating != instance.rating:
+            aggregates.rating_changed(instance.restaurant_id, old_rating, instance.rating)
+            rescored = [instance.restaurant_id]
+        if counted != current:
+            aggregates.update_daily_stats(counted, current)
+    instance._counted = current
+    if rescored:
+        leaderboards.update_restaurants(rescored)
+
+
+@receiver(post_delete, sender=Review)
+def remove_from_aggregates(sender, instance, **kwargs):
+    if instance._counted is not None:
+        restaurant_id, rating = instance._counted[:2]
+        aggregates.review_removed(restaurant_id, rating, instance.created_at)
+        aggregates.update_daily_stats(old=instance._counted)
+        leaderboards.update_restaurants([restaurant_id])
+
+
+@receiver(post_save, sender=Review)
+def scan_new_text(sender, instance, created, **kwargs):
+    if not _text_changed(instance, created):
+        return
+    alerts.scan_review(instance, edited=not created)
+    if not created:
+        # New reviews start out pending; edits go back into the moderation queue
+        Review.objects.filter(pk=instance.pk).update(moderation_state='PENDING')
+        instance.moderation_state = 'PENDING'
+    instance._saved_text = instance.text
+
+
+@receiver(post_save, sender=AlertKeyword)
+@receiver(post_delete, sender=AlertKeyword)
+def alert_keywords_changed(sender, **kwargs):
+    alerts.matchers.bump()
+
+
+@receiver(pre_save, sender=ModerationTerm)
+def normalize_moderation_term(sender, instance, **kwargs):
+    instance.term = moderation.normalize_term(instance.term)
+
+
+@receiver(post_save, sender=ModerationTerm)
+@receiver(post_delete, sender=ModerationTerm)
+def moderation_terms_changed(sender, **kwargs):
+    moderation.scorers.bump()
+
+
+@receiver(post_init, sender=Restaurant)
+def remember_ranked(sender, instance, **kwargs):
+    values = instance.__dict__
+    instance._ranked = tuple(values.get(field) for field in RANKED_FIELDS) if instance.pk is not None else None
+
+
+@receiver(post_save, sender=Restaurant)
+def restaurant_moved(sender, instance, created, **kwargs):
+    ranked = tuple(getattr(instance, field) for field in RANKED_FIELDS)
+    if not created and instance._ranked != ranked:
+        leaderboards.rebuild_restaurant_boards(instance)
+    instance._ranked = ranked
+
+
+@receiver(m2m_changed, sender=Restaurant.cuisine_styles.through)
+def cuisines_changed(sender, instance, action, reverse, **kwargs):
+    if action.startswith('post_') and not reverse:
+        leaderboards.rebuild_restaurant_boards(instance)
@@ -0,0 +1,84 @@
+"""
+Sources of reviews from other platforms, for reviews.ingestion.
+
+A source fetches one page at a time of a place's reviews, oldest change
+first, starting after an opaque cursor it returned earlier (None for the
+first page). Sources are configured per Review.source in REVIEW_SOURCES:
+
+    REVIEW_SOURCES = {
+        'GOOGLE': {'BACKEND': 'path.to.GoogleSource', 'OPTIONS': {'api_key': ...}},
+    }
+"""
+import json
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+class ExternalReview(NamedTuple):
+    external_id: str
+    rating: int
+    text: str
+    author_name: str
+    created_at: datetime
+
+
+class Page(NamedTuple):
+    reviews: list
+    # Where the next fetch starts; stored once this page has been saved
+    cursor: Optional[str]
+    has_more: bool
+
+
+class ReviewSource:
+    """Base class for review sources"""
+
+    def __init__(self, name, **options):
+        self.name = name
+
+    def fetch(self, place_id, cursor=None):
+        """The page of `place_id`'s reviews following `cursor`, as a Page"""
+        raise NotImplementedError
+
+
+class FixtureSource(ReviewSource):
+    """Serves reviews from a dict or a JSON file of {place_id: [review, ...]}, for tests and development
+
+    Reviews are dicts with the ExternalReview fields (`created_at` in ISO
+    format) and are served in list order; the cursor is the list position.
+    """
+
+    def __init__(self, name, data=None, path=None, page_size=50):
+        super().__init__(name)
+        if data is None:
+            with open(path) as fixture:
+                data = json.load(fixture)
+        self.data = data
+        self.page_size = page_size
+
+    def fetch(self, place_id, cursor=None):
+        reviews = self.data.get(place_id, [])
+        start = int(cursor or 0)
+        end = start + self.page_size
+        return Page(
+            reviews=[
+                ExternalReview(**{
+                    **review,
+                    'created_at': datetime.fromisoformat(review['created_at'])
+                    if isinstance(review['created_at'], str) else review['created_at'],
+                })
+                for review in reviews[start:end]
+            ],
+            cursor=str(min(end, len(reviews))),
+            has_more=end < len(reviews),
+        )
+
+
+def get_source(name):
+    config = getattr(settings, 'REVIEW_SOURCES', {}).get(name)
+    if config is None:
+        raise ImproperlyConfigured(f"No review source configured for {name} in REVIEW_SOURCES")
+    return import_string(config['BACKEND'])(name, **config.get('OPTIONS', {}))
@@ -1,3 +1,949 @@
-from django.test import TestCase
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db import OperationalError, close_old_connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from restaurants.models import CuisineType, Restaurant
+from users.models import User
+from .alerts import KeywordMatcher, matchers
+from . import flagqueue, leaderboards, moderation
+from .digests import send_digests
+from .ingestion import ingest
+from .replies import ReplyConflict, current_reply, save_reply
+from .moderation import TermScorer, normalize_term
+from .aggregates import DAILY_FIELDS, bayesian_score, compute_daily_stats, compute_summaries, rebuild_daily_stats
+from .models import (
+    AlertKeyword, DailyReviewStats, DigestRun, DigestSubscription, LeaderboardEntry, ModerationRescan, ModerationTerm, RatingSummary, Review, ReviewAlert, ReviewFlag, ReviewSourceLink,
+)
+from .sources import FixtureSource
+
+
+class ReviewTestMixin:
+    @classmethod
+    def create_restaurant(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'testpass123', user_type='OWNER')
+        cls.customer = User.objects.create_user('diner', 'diner@example.com', 'testpass123', user_type='CUSTOMER')
+        cls.restaurant = Restaurant.objects.create(
+            owner=cls.owner, name='Test Bistro', phone='0200000000', email='bistro@example.com',
+            country='Australia', street_address='1 George St', city='Sydney',
+            state='NSW', postal_code='2000', is_approved=True
+        )
+
+    @classmethod
+    def create_reviews(cls, count):
+        # Pairs share a timestamp, so orderings depend on the id tie-breaker
+        now = timezone.now()
+        return Review.objects.bulk_create([
+            Review(restaurant=cls.restaurant, rating=index % 5 + 1, text=f'Review {index}',
+                   created_at=now - timedelta(minutes=index // 2))
+            for index in range(count)
+        ])
+
+
+class ReviewListTests(ReviewTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_restaurant()
+        cls.create_reviews(45)
+
+    def walk(self, query):
+        url = f'/api/restaurants/{self.restaurant.id}/reviews/?page_size=10&{query}'
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [review['id'] for review in response.json()['results']]
+            url = response.json()['next']
+        return ids
+
+    def test_keyset_pages_match_full_ordering(self):
+        reviews = Review.objects.filter(restaurant=self.restaurant)
+        self.assertEqual(self.walk('sort=newest'), list(reviews.order_by('-created_at', '-id').values_list('id', flat=True)))
+        self.assertEqual(self.walk('sort=oldest'), list(reviews.order_by('created_at', 'id').values_list('id', flat=True)))
+        self.assertEqual(
+            self.walk('sort=highest'),
+            list(reviews.order_by('-rating', '-created_at', '-id').values_list('id', flat=True)),
+        )
+
+    def test_rating_filter(self):
+        ids = self.walk('rating=1,2&sort=lowest')
+        ratings = list(Review.objects.filter(id__in=ids).values_list('rating', flat=True))
+        self.assertEqual(len(ids), 18)
+        self.assertEqual(set(ratings), {1, 2})
+
+    def test_deep_page_does_not_use_offset(self):
+        first = self.client.get(f'/api/restaurants/{self.restaurant.id}/reviews/?page_size=20').json()
+        with self.assertNumQueries(2):
+            self.client.get(first['next'])
+
+    def test_invalid_parameters(self):
+        url = f'/api/restaurants/{self.restaurant.id}/reviews/'
+        self.assertEqual(self.client.get(url + '?cursor=garbage').status_code, 400)
+        self.assertEqual(self.client.get(url + '?sort=random').status_code, 400)
+        self.assertEqual(self.client.get(url + '?rating=five').status_code, 400)
+        self.assertEqual(self.client.get('/api/restaurants/0/reviews/').status_code, 404)
+
+
+class ReviewWriteTests(ReviewTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_restaurant()
+
+    def test_create_and_edit_own_review(self):
+        url = f'/api/restaurants/{self.restaurant.id}/reviews/'
+        self.assertEqual(self.client.post(url, {'rating': 4, 'text': 'Good'}).status_code, 401)
+
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        response = client.post(url, {'rating': 4, 'text': 'Good'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['username'], 'diner')
+        self.assertEqual(client.post(url, {'rating': 6}).status_code, 400)
+
+        detail = f"/api/reviews/{response.data['id']}/"
+        self.assertEqual(client.patch(detail, {'rating': 5}).data['rating'], 5)
+        client.force_authenticate(self.owner)
+        self.assertEqual(client.patch(detail, {'rating': 1}).status_code, 403)
+
+    def test_reviews_of_unlisted_restaurants_are_hidden(self):
+        review = Review.objects.create(restaurant=self.restaurant, user=self.customer, rating=4, text='Good')
+        detail = f'/api/reviews/{review.id}/'
+        self.assertEqual(self.client.get(detail).status_code, 200)
+
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(is_approved=False)
+        self.assertEqual(self.client.get(detail).status_code, 404)
+        Restaurant.all_objects.filter(pk=self.restaurant.pk).update(is_approved=True, is_deleted=True)
+        self.assertEqual(self.client.get(detail).status_code, 404)
+
+
+class RatingSummaryTests(ReviewTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_restaurant()
+
+    def assertSummaryCurrent(self):
+        expected = compute_summaries([self.restaurant.id]).get(self.restaurant.id) or RatingSummary()
+        summary = RatingSummary.objects.get(restaurant=self.restaurant)
+        for field in ('review_count', 'rating_sum', 'stars_1', 'stars_2', 'stars_3', 'stars_4',
+                      'stars_5', 'last_review_at'):
+            self.assertEqual(getattr(summary, field), getattr(expected, field), field)
+        return summary
+
+    def test_review_writes_keep_summary_current(self):
+        first = Review.objects.create(restaurant=self.restaurant, rating=5)
+        latest = Review.objects.create(restaurant=self.restaurant, rating=2)
+        summary = self.assertSummaryCurrent()
+        self.assertEqual(summary.average, 3.5)
+        self.assertEqual(summary.histogram, {1: 0, 2: 1, 3: 0, 4: 0, 5: 1})
+
+        first.rating = 4
+        first.save()
+        self.assertSummaryCurrent()
+        latest.delete()
+        summary = self.assertSummaryCurrent()
+        self.assertEqual(summary.last_review_at, first.created_at)
+        first.delete()
+        summary = self.assertSummaryCurrent()
+        self.assertEqual(summary.average, None)
+        self.assertEqual(summary.score, settings.RATING_PRIOR_MEAN)
+
+    def test_restaurant_without_reviews_scores_the_prior(self):
+        summary = self.client.get('/api/restaurants/').json()[0]['rating_summary']
+        self.assertEqual(summary['review_count'], 0)
+        self.assertEqual(summary['average'], None)
+        self.assertEqual(summary['score'], bayesian_score(0, 0))
+
+    def test_restaurant_list_reads_summaries_without_extra_queries(self):
+        Review.objects.create(restaurant=self.restaurant, rating=4)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/restaurants/')
+        restaurant = response.json()[0]
+        self.assertEqual(restaurant['rating_summary']['review_count'], 1)
+        self.assertEqual(restaurant['rating_summary']['average'], 4.0)
+        summary_queries = [query['sql'] for query in queries if 'reviews_' in query['sql']]
+        # Joined into the restaurant query itself
+        self.assertEqual(len(summary_queries), 1)
+        self.assertIn('restaurants_restaurant', summary_queries[0])
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        Review.objects.create(restaurant=self.restaurant, rating=3)
+        self.create_reviews(10)  # bulk_create skips the signals
+
+        out = StringIO()
+        call_command('reconcile_ratings', '--dry-run', stdout=out)
+        self.assertIn('Found 1 drifted', out.getvalue())
+        self.assertEqual(RatingSummary.objects.get(restaurant=self.restaurant).review_count, 1)
+
+        call_command('reconcile_ratings', stdout=StringIO())
+        self.assertEqual(self.assertSummaryCurrent().review_count, 11)
+
+
+@override_settings(TOP_RATED_SIZE=3)
+class LeaderboardTests(ReviewTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_restaurant()
+        cls.thai = CuisineType.objects.create(name='Thai', code='THAI')
+        cls.restaurants = [cls.restaurant] + [
+            Restaurant.objects.create(
+                owner=cls.owner, name=f'Bistro {index}', phone='0200000000', email='bistro@example.com',
+                country='Australia', street_address='1 George St', city='Sydney' if index < 5 else 'Perth',
+                state='NSW', postal_code='2000', is_approved=True,
+            )
+            for index in range(1, 7)
+        ]
+        for restaurant in cls.restaurants[::2]:
+            restaurant.cuisine_styles.add(cls.thai)
+
+    def rate(self, restaurant, *ratings):
+        return [Review.objects.create(restaurant=restaurant, rating=rating) for rating in ratings]
+
+    def assertBoardsCurrent(self):
+        self.assertEqual([str(board) for board in leaderboards.rebuild_leaderboards(dry_run=True)], [])
+
+    def test_shrunk_score_ranks_volume_over_a_single_review(self):
+        lucky, steady = self.restaurants[:2]
+        self.rate(lucky, 5)
+        self.rate(steady, *[5, 4] * 10)
+        self.assertAlmostEqual(RatingSummary.objects.get(restaurant=lucky).score, bayesian_score(5, 1))
+        self.assertAlmostEqual(RatingSummary.objects.get(restaurant=steady).score, bayesian_score(90, 20))
+        self.assertEqual(leaderboards.top('CITY', 'Sydney'), [steady.id, lucky.id])
+
+    def test_review_writes_keep_boards_current(self):
+        random.seed(7)
+        for restaurant in self.restaurants:
+            self.rate(restaurant, random.randint(1, 5))
+        self.assertEqual(len(leaderboards.top('CITY', 'sydney')), 3)
+        self.assertEqual(len(leaderboards.top('CUISINE', self.thai.id)), 3)
+        reviews = list(Review.objects.all())
+        for _ in range(60):
+            step = random.random()
+            if step < 0.5:
+                reviews += self.rate(random.choice(self.restaurants), random.randint(1, 5))
+            elif step < 0.8:
+                review = random.choice(reviews)
+                review.rating = random.randint(1, 5)
+                review.save()
+            elif len(reviews) > 1:
+                reviews.pop(random.randrange(len(reviews))).delete()
+            self.assertBoardsCurrent()
+
+    def test_restaurant_changes_rebuild_its_boards(self):
+        for rating, restaurant in zip([5, 4, 3, 2], self.restaurants):
+            self.rate(restaurant, rating)
+        top, second, third, fourth = self.restaurants[:4]
+        self.assertEqual(leaderboards.top('CITY', 'Sydney'), [top.id, second.id, third.id])
+        self.assertEqual(leaderboards.top('CUISINE', self.thai.id), [top.id, third.id])
+
+        top.soft_delete()
+        self.assertEqual(leaderboards.top('CITY', 'Sydney'), [second.id, third.id, fourth.id])
+        second.city = 'Perth'
+        second.save()
+        fourth.cuisine_styles.add(self.thai)
+        self.assertEqual(leaderboards.top('CITY', 'Sydney'), [third.id, fourth.id])
+        self.assertEqual(leaderboards.top('CUISINE', self.thai.id), [third.id, fourth.id])
+        self.assertBoardsCurrent()
+
+    def test_top_rated_list_reads_the_board(self):
+        for rating, restaurant in zip([3, 5, 4, 1], self.restaurants):
+            self.rate(restaurant, rating)
+        self.assertEqual(self.client.get('/api/restaurants/?sort=top_rated').status_code, 400)
+        url = '/api/restaurants/?sort=top_rated&city=sydney'
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual([restaurant['id'] for restaurant in response.json()],
+                         [self.restaurants[1].id, self.restaurants[2].id, self.restaurants[0].id])
+        self.assertAlmostEqual(response.json()[0]['rating_summary']['score'], bayesian_score(5, 1))
+        self.assertFalse([query for query in queries if 'ORDER BY "reviews_ratingsummary"' in query['sql']])
+
+    def test_reconcile_fixes_scores_and_boards(self):
+        self.rate(self.restaurant, 4)
+        leaderboards.top('CITY', 'Sydney')
+        RatingSummary.objects.update(score=0)
+        out = StringIO()
+        call_command('reconcile_ratings', stdout=out)
+        self.assertIn('Fixed 1 drifted summaries', out.getvalue())
+        self.assertAlmostEqual(RatingSummary.objects.get().score, bayesian_score(4, 1))
+        self.assertBoardsCurrent()
+
+        LeaderboardEntry.objects.all().delete()
+        out = StringIO()
+        call_command('reconcile_ratings', stdout=out)
+        self.assertIn('0 drifted summaries', out.getvalue())
+        self.assertIn('1 drifted leaderboards (City sydney)', out.getvalue())
+        self.assertEqual(leaderboards.top('CITY', 'Sydney'), [self.restaurant.id])
+
+
+class ReviewAnalyticsTests(ReviewTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_restaurant()
+
+    def review(self, day, rating, status='NEW'):
+        created_at = datetime.combine(day, datetime.min.time(), tzinfo=dt_timezone.utc) + timedelta(hours=12)
+        return Review.objects.create(restaurant=self.restaurant, rating=rating, status=status, created_at=created_at)
+
+    def assertDailyStatsCurrent(self):
+        expected = compute_daily_stats([self.restaurant.id])
+        stored = {(row.restaurant_id, row.day): row for row in DailyReviewStats.objects.all()}
+        self.assertEqual(
+            {key: [getattr(row, field) for field in DAILY_FIELDS] for key, row in stored.items()
+             if row.review_count},
+            {key: [getattr(row, field) for field in DAILY_FIELDS] for key, row in expected.items()},
+        )
+
+    def test_review_writes_keep_daily_stats_current(self):
+        first = self.review(date(2026, 3, 2), 5)
+        second = self.review(date(2026, 3, 2), 2)
+        self.review(date(2026, 3, 9), 4, status='RESPONDED')
+        self.assertDailyStatsCurrent()
+
+        first.status = 'RESPONDED'
+        first.rating = 3
+        first.save()
+        self.assertDailyStatsCurrent()
+        second.created_at += timedelta(days=1)
+        second.save()
+        self.assertDailyStatsCurrent()
+        second.delete()
+        self.assertDailyStatsCurrent()
+        self.assertEqual(rebuild_daily_stats([self.restaurant.id], dry_run=True), [])
+
+    def test_weekly_and_monthly_buckets(self):
+        self.review(date(2026, 3, 2), 5)  # Monday
+        self.review(date(2026, 3, 8), 3, status='RESPONDED')  # Sunday, same week
+        self.review(date(2026, 3, 9), 4)
+        self.review(date(2026, 4, 1), 1, status='RESPONDED')
+
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        url = f'/api/restaurants/{self.restaurant.id}/reviews/analytics/'
+        with CaptureQueriesContext(connection) as queries:
+            weekly = client.get(url, {'since': '2026-03-01', 'until': '2026-04-30'}).json()
+        self.assertFalse([query for query in queries if 'reviews_review' in query['sql']])
+        self.assertEqual([bucket['start'] for bucket in weekly['buckets']], ['2026-03-02', '2026-03-09', '2026-03-30'])
+        self.assertEqual(weekly['buckets'][0]['review_count'], 2)
+        self.assertEqual(weekly['buckets'][0]['average'], 4.0)
+        self.assertEqual(weekly['buckets'][0]['response_rate'], 0.5)
+
+        monthly = client.get(url, {'period': 'month', 'since': '2026-01-01', 'until': '2026-12-31'}).json()
+        self.assertEqual([bucket['review_count'] for bucket in monthly['buckets']], [3, 1])
+        self.assertEqual(monthly['buckets'][0]['histogram'], {'1': 0, '2': 0, '3': 1, '4': 1, '5': 1})
+        self.assertEqual(monthly['totals']['review_count'], 4)
+        self.assertEqual(monthly['totals']['responded_count'], 2)
+
+    def test_only_owner_or_staff(self):
+        url = f'/api/restaurants/{self.restaurant.id}/reviews/analytics/'
+        self.assertEqual(self.client.get(url).status_code, 401)
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        self.assertEqual(client.get(url).status_code, 403)
+        client.force_authenticate(self.owner)
+        self.assertEqual(client.get(url, {'period': 'year'}).status_code, 400)
+        response = client.get(url, {'period': 'month', 'until': '2026-10-19'})
+        self.assertEqual(response.data['since'], date(2025, 11, 1))
+
+    def test_reconcile_rebuilds_daily_stats(self):
+        self.create_reviews(10)
+        out = StringIO()
+        call_command('reconcile_ratings', stdout=out)
+        self.assertIn('1 drifted daily stats', out.getvalue())
+        self.assertDailyStatsCurrent()
+
+
+class KeywordAlertTests(ReviewTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_restaurant()
+        cls.other_owner = User.objects.create_user('other', 'other@example.com', 'testpass123', user_type='OWNER')
+
+    def test_matcher_finds_overlapping_keywords_on_whole_words(self):
+        matcher = KeywordMatcher([
+            ('nut', 1), ('nut allergy', 1), ('allergy', 2), ('food poisoning', 1), ('poison', 1),
+        ])
+        self.assertEqual(
+            matcher.find('Severe NUT ALLERGY; minute wait. Food-poisoning?'),
+            {'nut', 'nut allergy', 'allergy', 'food poisoning'},
+        )
+        self.assertEqual(matcher.match('nut allergy', 2), ['allergy'])
+        self.assertEqual(matcher.match('Great coconut cake', 1), [])
+
+    def test_owner_keywords_alert_on_new_reviews(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        url = '/api/review-alerts/keywords/'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(client.post(url, {'keyword': '  Allergy '}).data['keyword'], 'allergy')
+            self.assertEqual(client.post(url, {'keyword': 'ALLERGY'}).status_code, 400)
+            client.post(url, {'keyword': 'cold food'})
+            AlertKeyword.objects.create(owner=self.other_owner, keyword='rude')
+
+        Review.objects.create(restaurant=self.restaurant, rating=1, text='Cold food, rude staff, allergy ignored')
+        Review.objects.create(restaurant=self.restaurant, rating=5, text='Lovely')
+        self.assertEqual(list(ReviewAlert.objects.values_list('owner_id', 'keywords')),
+                         [(self.owner.id, ['allergy', 'cold food'])])
+
+        alerts = client.get('/api/review-alerts/?unread=true').json()['results']
+        self.assertEqual(alerts[0]['keywords'], ['allergy', 'cold food'])
+        client.patch(f"/api/review-alerts/{alerts[0]['id']}/", {'is_read': True})
+        self.assertEqual(client.get('/api/review-alerts/?unread=true').json()['results'], [])
+
+        client.force_authenticate(self.other_owner)
+        self.assertEqual(client.get('/api/review-alerts/').json()['results'], [])
+        client.force_authenticate(self.customer)
+        self.assertEqual(client.get('/api/review-alerts/').status_code, 403)
+
+    def test_edited_reviews_rewrite_or_withdraw_their_alert(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            AlertKeyword.objects.create(owner=self.owner, keyword='allergy')
+            AlertKeyword.objects.create(owner=self.owner, keyword='cold')
+        review = Review.objects.create(restaurant=self.restaurant, rating=1, text='Allergy ignored')
+        review.text = 'Allergy ignored, cold soup'
+        review.save()
+        self.assertEqual(list(ReviewAlert.objects.values_list('keywords', flat=True)), [['allergy', 'cold']])
+        review.text = 'All fine after all'
+        review.save()
+        self.assertFalse(ReviewAlert.objects.exists())
+
+    def test_matcher_is_rebuilt_only_when_keywords_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            AlertKeyword.objects.create(owner=self.owner, keyword='allergy')
+        matcher = matchers.get()
+        self.assertIs(matchers.get(), matcher)
+        with self.captureOnCommitCallbacks(execute=True):
+            AlertKeyword.objects.create(owner=self.owner, keyword='mould')
+        self.assertEqual(len(matchers.get()), 2)
+
+    def test_keyword_changes_in_other_processes_are_picked_up(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            AlertKeyword.objects.create(owner=self.owner, keyword='allergy')
+        self.assertEqual(len(matchers.get()), 1)
+        # Written by another worker: nothing runs in this process, nor reaches its cache
+        AlertKeyword.objects.create(owner=self.owner, keyword='mould')
+        AlertKeyword.objects.filter(keyword='allergy').delete()
+        self.assertEqual(len(matchers.get()), 1)  # Within the poll interval
+        matchers.checked_at = 0
+        Review.objects.create(restaurant=self.restaurant, rating=1, text='Allergy ignored, mould on the walls')
+        self.assertEqual(list(ReviewAlert.objects.values_list('keywords', flat=True)), [['mould']])
+
+    def test_scan_command_covers_bulk_imports(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            AlertKeyword.objects.create(owner=self.owner, keyword='review')
+        self.create_reviews(25)  # bulk_create skips the signals
+        self.assertFalse(ReviewAlert.objects.exists())
+        out = StringIO()
+        call_command('scan_review_alerts', '--batch-size', '10', stdout=out)
+        self.assertIn('Wrote 25 alerts', out.getvalue())
+        self.assertEqual(ReviewAlert.objects.filter(owner=self.owner).count(), 25)
+
+
+class ModerationTests(ReviewTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_restaurant()
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ModerationTerm.objects.create(term='Scumbag')
+            ModerationTerm.objects.create(term='rubbish', weight=0.5)
+
+    def moderate(self):
+        call_command('moderate_reviews', '--once', '--batch-size', '2', stdout=StringIO())
+
+    def test_normalized_matching_and_scoring(self):
+        scorer = TermScorer([(normalize_term('sh1t'), 1.0), ('crap', 0.5), ('idiot', 0.5)])
+        self.assertEqual(scorer.score('What a load of CRAAAP'), (0.5, ['crap']))
+        self.assertEqual(scorer.score('Sh1t service, crap food, idiöt waiter'), (2.0, ['crap', 'idiot', 'shit']))
+        self.assertEqual(scorer.score('Shiitake were great'), (0, []))
+
+    def test_submission_is_moderated_later_by_the_worker(self):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        url = f'/api/restaurants/{self.restaurant.id}/reviews/'
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(url, {'rating': 1, 'text': 'The manager is a scumbag'})
+        self.assertEqual(response.data['moderation_state'], 'PENDING')
+        self.assertFalse([query for query in queries if 'moderationterm' in query['sql'] or 'reviewflag' in query['sql']])
+        client.post(url, {'rating': 2, 'text': 'Rubbish parking'})
+        client.post(url, {'rating': 5, 'text': 'Lovely'})
+
+        self.moderate()
+        states = dict(Review.objects.values_list('text', 'moderation_state'))
+        self.assertEqual(states, {
+            'The manager is a scumbag': 'FLAGGED', 'Rubbish parking': 'CLEAN', 'Lovely': 'CLEAN',
+        })
+        flag = ReviewFlag.objects.get()
+        self.assertEqual((flag.review_id, flag.terms, flag.score), (response.data['id'], ['scumbag'], 1.0))
+
+        client.patch(f"/api/reviews/{response.data['id']}/", {'text': 'The manager was rude'})
+        self.assertEqual(Review.objects.get(pk=response.data['id']).moderation_state, 'PENDING')
+        self.moderate()
+        self.assertEqual(Review.objects.get(pk=response.data['id']).moderation_state, 'CLEAN')
+        self.assertFalse(ReviewFlag.objects.exists())
+
+    def test_reflagged_reviews_go_back_into_the_queue(self):
+        review = Review.objects.create(restaurant=self.restaurant, rating=1, text='The manager is a scumbag')
+        self.moderate()
+        token, flags = flagqueue.claim()
+        flagqueue.complete(token, [flags[0].id], 'RESOLVED', 'Fair comment')
+
+        # Rescored as before: the moderator's decision stands
+        review.text = 'The manager is a SCUMBAG'
+        review.save()
+        self.moderate()
+        self.assertEqual(ReviewFlag.objects.get().status, 'RESOLVED')
+
+        review.text = 'The manager is a scumbag, rubbish food'
+        review.save()
+        self.moderate()
+        flag = ReviewFlag.objects.get()
+        self.assertEqual((flag.status, flag.terms, flag.score), ('OPEN', ['rubbish', 'scumbag'], 1.5))
+        self.assertEqual((flag.claim_token, flag.resolved_at, flag.note), (None, None, ''))
+        self.assertEqual([flag.id for flag in flagqueue.claim()[1]], [flag.id])
+
+    def test_term_changes_rescan_the_corpus(self):
+        self.create_reviews(5)
+        Review.objects.create(restaurant=self.restaurant, rating=1, text='Rubbish, rubbish food')
+        self.moderate()
+        self.assertFalse(Review.objects.filter(moderation_state='FLAGGED').exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ModerationTerm.objects.filter(term='rubbish').update(weight=1.0)
+            ModerationTerm.objects.create(term='review 3')
+        self.moderate()
+        self.assertEqual(
+            sorted(Review.objects.filter(moderation_state='FLAGGED').values_list('text', flat=True)),
+            ['Review 3', 'Rubbish, rubbish food'],
+        )
+
+
+    def test_term_changes_in_other_processes_are_picked_up(self):
+        review = Review.objects.create(restaurant=self.restaurant, rating=1, text='Total muppet')
+        self.moderate()
+        self.assertEqual(Review.objects.get(pk=review.pk).moderation_state, 'CLEAN')
+        # Added in the admin: no on-commit callback here, nothing in this process's cache
+        ModerationTerm.objects.create(term='muppet')
+        cache.clear()
+        self.moderate()
+        self.assertEqual(Review.objects.get(pk=review.pk).moderation_state, 'FLAGGED')
+
+    def test_unchanged_terms_do_not_start_a_rescan(self):
+        self.create_reviews(3)
+        self.moderate()
+        # A fresh worker process: empty cache, no scorer yet
+        cache.clear()
+        moderation.scorers.version = None
+        self.assertEqual(moderation.rescan_step(), 0)
+        self.assertTrue(ModerationRescan.objects.get().done)
+
+    def test_rescan_requeues_rows_it_could_not_lock(self):
+        reviews = self.create_reviews(5)
+        self.moderate()
+        locked = {reviews[1].id}
+        real_batch = moderation.moderate_batch
+
+        def batch_skipping_locked(queryset, batch_size):
+            return real_batch(queryset.exclude(id__in=locked), batch_size)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ModerationTerm.objects.create(term='review')
+        with mock.patch.object(moderation, 'moderate_batch', batch_skipping_locked):
+            self.assertEqual(moderation.rescan_step(batch_size=2), 3)
+            self.assertEqual(Review.objects.get(id=reviews[1].id).moderation_state, 'PENDING')
+            # A batch whose rows are all locked is queued too, and the pass goes on
+            locked.update(review.id for review in reviews[3:])
+            self.assertEqual(moderation.rescan_step(batch_size=2), 2)
+            self.assertEqual(moderation.rescan_step(batch_size=2), 0)
+        self.moderate()
+        self.assertEqual(Review.objects.filter(moderation_state='FLAGGED').count(), 5)
+
+
+class FlagQueueTests(ReviewTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_restaurant()
+        cls.moderator = User.objects.create_user('moderator', 'mod@example.com', 'testpass123', is_staff=True)
+        now = timezone.now()
+        cls.flags = ReviewFlag.objects.bulk_create([
+            ReviewFlag(review=review, terms=['rubbish'], score=1.0, created_at=now - timedelta(minutes=50 - index))
+            for index, review in enumerate(cls.create_reviews(5))
+        ])
+
+    def test_claims_take_the_oldest_and_are_disjoint(self):
+        first, flags = flagqueue.claim(self.moderator, batch_size=2)
+        self.assertEqual([flag.id for flag in flags], [flag.id for flag in self.flags[:2]])
+        self.assertTrue(all(flag.status == 'UNDER_REVIEW' and flag.claimed_by_id == self.moderator.id
+                            for flag in flags))
+        _, others = flagqueue.claim(batch_size=10)
+        self.assertEqual([flag.id for flag in others], [flag.id for flag in self.flags[2:]])
+        self.assertEqual(flagqueue.claim()[1], [])
+
+        ids = [flag.id for flag in flags]
+        with self.assertNumQueries(2):
+            self.assertEqual(flagqueue.complete(first, ids, 'RESOLVED', 'Fine'), [])
+        self.assertEqual(ReviewFlag.objects.filter(status='RESOLVED').count(), 2)
+        self.assertEqual(flagqueue.stats(), {'open': 0, 'under_review': 3, 'overdue': 0})
+
+    def test_expired_leases_are_reclaimed_and_the_old_claimer_loses_them(self):
+        stale, flags = flagqueue.claim(batch_size=2)
+        ids = [flag.id for flag in flags]
+        ReviewFlag.objects.filter(id=ids[0]).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        fresh, reclaimed = flagqueue.claim(batch_size=1)
+        self.assertEqual([flag.id for flag in reclaimed], ids[:1])
+        self.assertEqual(flagqueue.complete(stale, ids, 'FORWARDED'), ids[:1])
+        self.assertEqual(ReviewFlag.objects.get(id=ids[0]).status, 'UNDER_REVIEW')
+        self.assertEqual(ReviewFlag.objects.get(id=ids[1]).status, 'FORWARDED')
+        self.assertEqual(flagqueue.extend(fresh, ids[:1]), [])
+        self.assertEqual(flagqueue.release(fresh, ids[:1]), [])
+        self.assertEqual(ReviewFlag.objects.get(id=ids[0]).status, 'OPEN')
+
+    def test_sla_and_rescans_keep_claimed_flags(self):
+        with override_settings(MODERATION_FLAG_SLA=timedelta(minutes=48, seconds=30)):
+            self.assertEqual(flagqueue.stats(), {'open': 5, 'under_review': 0, 'overdue': 2})
+        _, flags = flagqueue.claim(batch_size=1)
+        Review.objects.filter(id=flags[0].review_id).update(text='Lovely')
+        Review.objects.filter(id=self.flags[1].review_id).update(text='Lovely')
+        call_command('moderate_reviews', '--once', '--rescan', stdout=StringIO())
+        self.assertTrue(ReviewFlag.objects.filter(id=flags[0].id).exists())
+        self.assertFalse(ReviewFlag.objects.filter(id=self.flags[1].id).exists())
+
+    def test_api_is_staff_only(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        self.assertEqual(client.post('/api/moderation/claim/').status_code, 403)
+
+        client.force_authenticate(self.moderator)
+        response = client.post('/api/moderation/claim/', {'batch_size': 3}, format='json')
+        self.assertEqual(len(response.data['flags']), 3)
+        self.assertEqual(response.data['flags'][0]['review']['text'], self.flags[0].review.text)
+        ids = [flag['id'] for flag in response.data['flags']]
+        response = client.post('/api/moderation/update/', {
+            'token': response.data['token'], 'flags': ids + [self.flags[4].id], 'action': 'resolve', 'note': 'ok',
+        }, format='json')
+        self.assertEqual(response.data, {'lost': [self.flags[4].id]})
+        self.assertEqual(client.get('/api/moderation/queue/').data, {'open': 2, 'under_review': 0, 'overdue': 0})
+
+
+def external_reviews(prefix, count, rating=4):
+    return [
+        {'external_id': f'{prefix}-{index}', 'rating': rating, 'text': f'Imported {index}',
+         'author_name': f'Guest {index}', 'created_at': f'2026-03-{index + 1:02d}T12:00:00+00:00'}
+        for index in range(count)
+    ]
+
+
+FIXTURE_DATA = {'g-1': external_reviews('g', 5), 'y-1': external_reviews('y', 3, rating=2)}
+
+
+class FailingSource(FixtureSource):
+    def fetch(self, place_id, cursor=None):
+        raise ConnectionError('Source unavailable')
+
+
+@override_settings(REVIEW_SOURCES={
+    'GOOGLE': {'BACKEND': 'reviews.sources.FixtureSource', 'OPTIONS': {'data': FIXTURE_DATA, 'page_size': 2}},
+    'YELP': {'BACKEND': 'reviews.sources.FixtureSource', 'OPTIONS': {'data': FIXTURE_DATA, 'page_size': 2}},
+    'TRIPADVISOR': {'BACKEND': 'reviews.tests.FailingSource', 'OPTIONS': {'data': {}}},
+})
+class IngestionTests(ReviewTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_restaurant()
+        cls.google = ReviewSourceLink.objects.create(restaurant=cls.restaurant, source='GOOGLE', place_id='g-1')
+        cls.yelp = ReviewSourceLink.objects.create(restaurant=cls.restaurant, source='YELP', place_id='y-1')
+
+    def test_ingests_pages_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            stats = ingest(ReviewSourceLink.objects.all(), max_workers=2, batch_size=3)
+        self.assertEqual(stats, {'pages': 5, 'reviews': 8, 'errors': 0})
+        upserts = [query for query in queries if query['sql'].startswith('INSERT INTO "reviews_review"')]
+        # compute_summaries is the only query taking MAX(created_at)
+        rebuilds = [query for query in queries if 'MAX("reviews_review"."created_at")' in query['sql']]
+        self.assertLess(len(upserts), 5)
+        self.assertEqual(len(rebuilds), len(upserts))
+
+        summary = RatingSummary.objects.get(restaurant=self.restaurant)
+        self.assertEqual((summary.review_count, summary.rating_sum), (8, 26))
+        self.assertEqual(DailyReviewStats.objects.filter(restaurant=self.restaurant).count(), 5)
+        self.assertEqual(dict(ReviewSourceLink.objects.values_list('source', 'cursor')), {'GOOGLE': '5', 'YELP': '3'})
+        self.assertEqual(Review.objects.filter(moderation_state='PENDING').count(), 8)
+
+    def test_reingesting_updates_instead_of_duplicating(self):
+        ingest(ReviewSourceLink.objects.all())
+        FIXTURE_DATA['g-1'][0]['rating'] = 1
+        self.addCleanup(FIXTURE_DATA['g-1'][0].update, {'rating': 4})
+        ReviewSourceLink.objects.update(cursor='')
+        self.assertEqual(ingest(ReviewSourceLink.objects.all())['reviews'], 8)
+        self.assertEqual(Review.objects.count(), 8)
+        self.assertEqual(Review.objects.get(source='GOOGLE', external_id='g-0').rating, 1)
+        self.assertEqual(RatingSummary.objects.get(restaurant=self.restaurant).rating_sum, 23)
+
+    def test_reingesting_requeues_only_changed_text(self):
+        ingest(ReviewSourceLink.objects.all())
+        Review.objects.update(moderation_state='CLEAN')
+        self.addCleanup(FIXTURE_DATA['g-1'][0].update, {'text': FIXTURE_DATA['g-1'][0]['text']})
+        FIXTURE_DATA['g-1'][0]['text'] += ' Edited.'
+        ReviewSourceLink.objects.update(cursor='')
+        ingest(ReviewSourceLink.objects.all())
+        self.assertEqual(
+            list(Review.objects.filter(moderation_state='PENDING').values_list('external_id', flat=True)), ['g-0']
+        )
+        self.assertEqual(Review.objects.filter(moderation_state='CLEAN').count(), 7)
+
+    def test_reingesting_withdraws_alerts_edited_text_no_longer_earns(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            AlertKeyword.objects.create(owner=self.owner, keyword='imported')
+        ingest(ReviewSourceLink.objects.all())
+        self.assertEqual(ReviewAlert.objects.count(), 8)
+        self.addCleanup(FIXTURE_DATA['g-1'][0].update, {'text': FIXTURE_DATA['g-1'][0]['text']})
+        FIXTURE_DATA['g-1'][0]['text'] = 'Lovely'
+        ReviewSourceLink.objects.update(cursor='')
+        ingest(ReviewSourceLink.objects.all())
+        self.assertFalse(ReviewAlert.objects.filter(review__external_id='g-0').exists())
+        self.assertEqual(ReviewAlert.objects.count(), 7)
+
+    def test_failing_source_is_recorded(self):
+        failing = ReviewSourceLink.objects.create(restaurant=self.restaurant, source='TRIPADVISOR', place_id='t-1')
+        out = StringIO()
+        call_command('ingest_reviews', stdout=out)
+        self.assertIn('saved 8 reviews; 1 listings failed', out.getvalue())
+        failing.refresh_from_db()
+        self.assertEqual(failing.last_error, 'ConnectionError: Source unavailable')
+        self.assertEqual(failing.cursor, '')
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class DigestTests(ReviewTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_restaurant()
+        DigestSubscription.objects.create(owner=cls.owner, frequency='DAILY')
+        cls.second = Restaurant.objects.create(
+            owner=cls.owner, name='Second Bistro', phone='0200000001', email='second@example.com',
+            country='Australia', street_address='2 George St', city='Sydney', state='NSW', postal_code='2000',
+        )
+        # Many more subscribers, to show the query count doesn't grow with them
+        for index in range(10):
+            owner = User.objects.create_user(f'owner{index}', f'owner{index}@example.com', 'x', user_type='OWNER')
+            DigestSubscription.objects.create(owner=owner, frequency='DAILY')
+            restaurant = Restaurant.objects.create(
+                owner=owner, name=f'Bistro {index}', phone='0200000000', email='b@example.com',
+                country='Australia', street_address='1 George St', city='Sydney', state='NSW', postal_code='2000',
+            )
+            Review.objects.create(restaurant=restaurant, rating=3, created_at=cls.at(date(2026, 3, 9)))
+        DigestSubscription.objects.create(owner=cls.customer, frequency='WEEKLY')
+
+    @staticmethod
+    def at(day, hour=12):
+        return datetime.combine(day, datetime.min.time(), tzinfo=dt_timezone.utc) + timedelta(hours=hour)
+
+    def test_daily_digest_is_sent_in_chunks_with_few_queries(self):
+        yesterday = date(2026, 3, 9)
+        for index, rating in enumerate((5, 4, 2, 1)):
+            Review.objects.create(restaurant=self.restaurant, rating=rating, text=f'Visit {index}',
+                                  status='RESPONDED' if index == 0 else 'NEW', created_at=self.at(yesterday, index))
+        Review.objects.create(restaurant=self.second, rating=4, text='Second visit', created_at=self.at(yesterday))
+        Review.objects.create(restaurant=self.restaurant, rating=1, text='Too old', created_at=self.at(date(2026, 3, 8)))
+
+        with CaptureQueriesContext(connection) as queries:
+            run = send_digests('DAILY', today=date(2026, 3, 10), chunk_size=4)
+        # Run row, three digest queries, a last_sent_at update per chunk, run save
+        self.assertEqual(len(queries), 1 + 3 + 3 + 1)
+        self.assertEqual((run.status, run.owners, run.restaurants, run.reviews, run.emails_sent),
+                         ('SUCCEEDED', 11, 12, 15, 11))
+        self.assertIsNotNone(run.duration)
+        self.assertEqual(len(mail.outbox), 11)
+
+        message = next(message for message in mail.outbox if message.to == ['owner@example.com'])
+        self.assertIn('Monday 9 March', message.body)
+        self.assertIn('Test Bistro\n  4 new reviews, average 3.0 stars\n  1 responded to, 3 awaiting a response',
+                      message.body)
+        self.assertIn('Second Bistro', message.body)
+        # The latest three of the day, newest first
+        self.assertLess(message.body.index('Visit 3'), message.body.index('Visit 1'))
+        self.assertNotIn('Visit 0', message.body)
+        self.assertNotIn('Too old', message.body)
+        self.assertIsNotNone(DigestSubscription.objects.get(owner=self.owner).last_sent_at)
+
+    def test_command_skips_a_period_already_sent(self):
+        call_command('send_review_digests', 'weekly', '--date', '2026-03-10', stdout=StringIO())
+        self.assertEqual(DigestRun.objects.get().emails_sent, 0)
+        with self.assertRaisesMessage(Exception, 'already sent'):
+            call_command('send_review_digests', 'weekly', '--date', '2026-03-10', stdout=StringIO())
+
+    def test_owner_manages_subscription(self):
+        client = APIClient()
+        client.force_authenticate(self.second.owner)
+        self.assertEqual(client.get('/api/review-digest/').data['frequency'], 'DAILY')
+        client.force_authenticate(User.objects.create_user('new', 'new@example.com', 'x', user_type='OWNER'))
+        self.assertFalse(client.get('/api/review-digest/').data['is_active'])
+        response = client.put('/api/review-digest/', {'frequency': 'DAILY', 'is_active': True})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(DigestSubscription.objects.filter(owner__username='new', frequency='DAILY').exists())
+
+
+class ReplyTests(ReviewTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_restaurant()
+        cls.review = Review.objects.create(restaurant=cls.restaurant, rating=2, text='Slow',
+                                           user=cls.customer, created_at=datetime(2026, 3, 2, tzinfo=dt_timezone.utc))
+
+    def test_reply_with_version_and_conflict(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        url = f'/api/reviews/{self.review.id}/reply/'
+        response = client.put(url, {'text': 'Sorry, we were short staffed', 'version': 0})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], 1)
+
+        # A second editor who also started from version 0 is told about the first reply
+        response = client.put(url, {'text': 'Thanks for the feedback', 'version': 0})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['reply']['text'], 'Sorry, we were short staffed')
+        self.assertEqual(response.data['reply']['version'], 1)
+
+        review = Review.objects.get(pk=self.review.pk)
+        self.assertEqual((review.status, review.replied_by_id), ('RESPONDED', self.owner.id))
+        self.assertEqual(DailyReviewStats.objects.get(restaurant=self.restaurant).responded_count, 1)
+
+        self.assertEqual(client.delete(url + '?version=1').status_code, 200)
+        review.refresh_from_db()
+        self.assertEqual((review.reply, review.reply_version, review.status), ('', 2, 'NEW'))
+        self.assertEqual(DailyReviewStats.objects.get(restaurant=self.restaurant).responded_count, 0)
+
+    def test_only_the_owner_replies_and_author_edits_keep_the_reply(self):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        url = f'/api/reviews/{self.review.id}/reply/'
+        self.assertEqual(client.put(url, {'text': 'Fake reply', 'version': 0}).status_code, 403)
+
+        stale = Review.objects.get(pk=self.review.pk)
+        save_reply(self.review.id, 'Sorry!', 0, self.owner)
+        client.patch(f'/api/reviews/{self.review.id}/', {'text': 'Slow but tasty'})
+        stale.rating = 3
+        stale.save(update_fields=['rating'])
+        review = Review.objects.get(pk=self.review.pk)
+        self.assertEqual((review.text, review.reply, review.status), ('Slow but tasty', 'Sorry!', 'RESPONDED'))
+
+
+class ConcurrentReplyTests(ReviewTestMixin, TransactionTestCase):
+    """Parallel responders, each retrying on conflict from the version it was handed"""
+
+    def test_parallel_responders_lose_no_updates(self):
+        self.create_restaurant()
+        review = Review.objects.create(restaurant=self.restaurant, rating=3)
+        responders, attempts = 8, []
+        barrier = threading.Barrier(responders)
+        errors = []
+
+        def respond(name):
+            try:
+                barrier.wait()
+                current = None
+                while True:
+                    try:
+                        current = current or current_reply(review.id)
+                        attempts.append(name)
+                        # Each responder appends its line to the reply it saw
+                        text = '\n'.join(filter(None, [current['reply'], name]))
+                        save_reply(review.id, text, current['reply_version'], self.owner)
+                        return
+                    except ReplyConflict as conflict:
+                        current = conflict.current
+                    except OperationalError:
+                        # SQLite's shared in-memory test database refuses
+                        # concurrent access instead of queueing it
+                        if connection.vendor != 'sqlite':
+                            raise
+                        time.sleep(0.001)
+                        current = None
+            except Exception as error:
+                errors.append(error)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=respond, args=(f'responder {index}',)) for index in range(responders)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        self.assertEqual(errors, [])
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+
+        review.refresh_from_db()
+        # Every responder's line survived, each write bumped the version once
+        self.assertEqual(sorted(review.reply.split('\n')), sorted(f'responder {index}' for index in range(responders)))
+        self.assertEqual(review.reply_version, responders)
+        self.assertGreaterEqual(len(attempts), responders)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT count(*) FROM pg_locks WHERE relation = 'reviews_review'::regclass "
+                    "AND pid != pg_backend_pid()"
+                )
+                self.assertEqual(cursor.fetchone()[0], 0)
+
+
+class ConcurrentFlagClaimTests(ReviewTestMixin, TransactionTestCase):
+    """Parallel moderators draining the queue"""
+
+    def test_parallel_claimers_never_share_a_flag(self):
+        self.create_restaurant()
+        ReviewFlag.objects.bulk_create([ReviewFlag(review=review) for review in self.create_reviews(40)])
+        workers, claimed, errors = 6, [], []
+        barrier = threading.Barrier(workers)
+
+        def retrying(call, *args):
+            while True:
+                try:
+                    return call(*args)
+                except OperationalError:
+                    # See ConcurrentReplyTests
+                    if connection.vendor != 'sqlite':
+                        raise
+                    time.sleep(0.001)
+
+        def work():
+            try:
+                barrier.wait()
+                while True:
+                    token, flags = retrying(flagqueue.claim, None, 3)
+                    if not flags:
+                        return
+                    ids = [flag.id for flag in flags]
+                    claimed.extend(ids)
+                    self.assertEqual(retrying(flagqueue.complete, token, ids, 'RESOLVED'), [])
+            except Exception as error:
+                errors.append(error)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=work) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        self.assertEqual(errors, [])
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+        self.assertEqual(len(claimed), 40)
+        self.assertEqual(sorted(claimed), sorted(ReviewFlag.objects.values_list('id', flat=True)))
+        self.assertEqual(ReviewFlag.objects.exclude(status='RESOLVED').count(), 0)
@@ -0,0 +1,20 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('restaurants/<int:restaurant_id>/reviews/', views.RestaurantReviewListView.as_view(),
+         name='restaurant-reviews'),
+    path('restaurants/<int:restaurant_id>/reviews/analytics/', views.ReviewAnalyticsView.as_view(),
+         name='restaurant-review-analytics'),
+    path('reviews/<int:pk>/', views.ReviewDetailView.as_view(), name='review-detail'),
+    path('reviews/<int:pk>/reply/', views.ReviewReplyView.as_view(), name='review-reply'),
+    path('review-alerts/', views.ReviewAlertListView.as_view(), name='review-alerts'),
+    path('review-alerts/<int:pk>/', views.ReviewAlertDetailView.as_view(), name='review-alert-detail'),
+    path('review-alerts/keywords/', views.AlertKeywordListView.as_view(), name='alert-keywords'),
+    path('moderation/queue/', views.ModerationQueueView.as_view(), name='moderation-queue'),
+    path('moderation/claim/', views.ModerationClaimView.as_view(), name='moderation-claim'),
+    path('moderation/update/', views.ModerationUpdateView.as_view(), name='moderation-update'),
+    path('review-digest/', views.DigestSubscriptionView.as_view(), name='review-digest'),
+    path('review-alerts/keywords/<int:pk>/', views.AlertKeywordDetailView.as_view(), name='alert-keyword-detail'),
+]
@@ -1,3 +1,271 @@
-from django.shortcuts import render
+from datetime import timedelta
 
-# Create your views here.
+from django.db.models import Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from restaurants.models import Restaurant
+from restaurants.permissions import IsRestaurantOwner
+from . import flagqueue
+from .aggregates import DAILY_FIELDS
+from .models import AlertKeyword, DailyReviewStats, DigestSubscription, Review, ReviewAlert
+from .pagination import KeysetPagination
+from .permissions import IsRestaurantOwnerOrStaff, IsReviewAuthorOrReadOnly
+from .replies import ReplyConflict, save_reply
+from .serializers import (
+    AlertKeywordSerializer, DigestSubscriptionSerializer, FlagClaimSerializer, FlagUpdateSerializer,
+    ReviewAlertSerializer, ReviewAnalyticsQuerySerializer, ReviewFlagSerializer, ReviewReplySerializer,
+    ReviewSerializer,
+)
+
+# Each ordering ends in id so the keyset is unique, and keeps one direction
+# so it maps onto a single index scan
+SORT_ORDERINGS = {
+    'newest': ('-created_at', '-id'),
+    'oldest': ('created_at', 'id'),
+    'highest': ('-rating', '-created_at', '-id'),
+    'lowest': ('rating', 'created_at', 'id'),
+}
+
+
+class RestaurantReviewListView(generics.ListCreateAPIView):
+    """Reviews of one restaurant, filtered by `rating` and ordered by `sort`"""
+    serializer_class = ReviewSerializer
+    pagination_class = KeysetPagination
+
+    def get_permissions(self):
+        if self.request.method == 'POST':
+            return [permissions.IsAuthenticated()]
+        return [permissions.AllowAny()]
+
+    def get_restaurant(self):
+        if not hasattr(self, '_restaurant'):
+            self._restaurant = get_object_or_404(
+                Restaurant.objects.only('id'), pk=self.kwargs['restaurant_id'], is_approved=True
+            )
+        return self._restaurant
+
+    def get_ordering(self):
+        sort = self.request.query_params.get('sort', 'newest')
+        if sort not in SORT_ORDERINGS:
+            raise ValidationError({'sort': f"Choose one of: {', '.join(SORT_ORDERINGS)}"})
+        return SORT_ORDERINGS[sort]
+
+    def get_queryset(self):
+        queryset = Review.objects.filter(restaurant=self.get_restaurant()).select_related('user')
+        rating = self.request.query_params.get('rating')
+        if rating:
+            try:
+                ratings = {int(value) for value in rating.split(',')}
+            except ValueError:
+                raise ValidationError({'rating': 'Use star ratings 1-5, comma separated.'})
+            queryset = queryset.filter(rating__in=ratings)
+        return queryset
+
+    def perform_create(self, serializer):
+        user = self.request.user
+        serializer.save(
+            restaurant=self.get_restaurant(), user=user, author_name=user.get_full_name() or user.username
+        )
+
+
+class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """A review of a listed restaurant, like those RestaurantReviewListView returns"""
+    serializer_class = ReviewSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsReviewAuthorOrReadOnly]
+    queryset = Review.objects.filter(
+        restaurant__is_approved=True, restaurant__is_deleted=False
+    ).select_related('user')
+
+
+class ReviewReplyView(APIView):
+    """The restaurant owner's reply: PUT {text, version} to write it, DELETE ?version= to remove it
+
+    Answers 409 Conflict with the current reply when it changed since `version`.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsRestaurantOwnerOrStaff]
+
+    def check_review(self, request, pk):
+        review = get_object_or_404(Review.objects.select_related('restaurant').only('restaurant', 'restaurant__owner'), pk=pk)
+        self.check_object_permissions(request, review.restaurant)
+
+    def write(self, request, pk, text, version):
+        try:
+            reply = save_reply(pk, text, version, request.user)
+        except ReplyConflict as conflict:
+            return Response(
+                {'detail': 'The reply was changed by someone else.',
+                 'reply': ReviewReplySerializer(conflict.current).data},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(ReviewReplySerializer(reply).data)
+
+    def put(self, request, pk):
+        self.check_review(request, pk)
+        serializer = ReviewReplySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self.write(request, pk, serializer.validated_data['reply'], serializer.validated_data['reply_version'])
+
+    def delete(self, request, pk):
+        self.check_review(request, pk)
+        try:
+            version = int(request.query_params['version'])
+        except (KeyError, ValueError):
+            raise ValidationError({'version': 'Pass the reply_version being removed.'})
+        return self.write(request, pk, '', version)
+
+
+PERIOD_TRUNCS = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+
+
+def _default_since(period, until):
+    """Start of the 30th day, 12th week or 12th month back from `until`"""
+    if period == 'day':
+        return until - timedelta(days=29)
+    if period == 'week':
+        return until - timedelta(days=until.weekday(), weeks=11)
+    month = until.year * 12 + until.month - 1 - 11
+    return until.replace(year=month // 12, month=month % 12 + 1, day=1)
+
+
+def _figures(counts):
+    review_count = counts['review_count']
+    return {
+        'review_count': review_count,
+        'average': round(counts['rating_sum'] / review_count, 2) if review_count else None,
+        'histogram': {stars: counts[f'stars_{stars}'] for stars in range(1, 6)},
+        'responded_count': counts['responded_count'],
+        'response_rate': round(counts['responded_count'] / review_count, 4) if review_count else None,
+    }
+
+
+class ReviewAnalyticsView(APIView):
+    """Owner dashboard figures per day, week or month, read only from the daily rollups"""
+    permission_classes = [permissions.IsAuthenticated, IsRestaurantOwnerOrStaff]
+
+    def get(self, request, restaurant_id):
+        restaurant = get_object_or_404(Restaurant.objects.only('id', 'owner_id'), pk=restaurant_id)
+        self.check_object_permissions(request, restaurant)
+
+        query = ReviewAnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        period = query.validated_data['period']
+        until = query.validated_data.get('until') or timezone.localdate()
+        since = query.validated_data.get('since') or _default_since(period, until)
+
+        rows = DailyReviewStats.objects.filter(
+            restaurant_id=restaurant.id, day__range=(since, until), review_count__gt=0
+        ).annotate(start=PERIOD_TRUNCS[period]('day')).values('start').order_by('start').annotate(
+            **{field: Sum(field) for field in DAILY_FIELDS}
+        )
+        buckets = [{'start': row['start'], **_figures(row)} for row in rows]
+        totals = {field: sum(row[field] for row in rows) for field in DAILY_FIELDS}
+        return Response({
+            'period': period,
+            'since': since,
+            'until': until,
+            'totals': _figures(totals),
+            'buckets': buckets,
+        })
+
+
+class AlertKeywordListView(generics.ListCreateAPIView):
+    """The signed-in owner's alert keywords"""
+    serializer_class = AlertKeywordSerializer
+    permission_classes = [IsRestaurantOwner]
+
+    def get_queryset(self):
+        return AlertKeyword.objects.filter(owner=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+
+class AlertKeywordDetailView(generics.DestroyAPIView):
+    permission_classes = [IsRestaurantOwner]
+
+    def get_queryset(self):
+        return AlertKeyword.objects.filter(owner=self.request.user)
+
+
+class ReviewAlertListView(generics.ListAPIView):
+    """Alerts for the signed-in owner, newest first; `unread=true` leaves out read ones"""
+    serializer_class = ReviewAlertSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [IsRestaurantOwner]
+
+    def get_ordering(self):
+        return ('-created_at', '-id')
+
+    def get_queryset(self):
+        queryset = ReviewAlert.objects.filter(owner=self.request.user).select_related('review__user')
+        if self.request.query_params.get('unread') in ('1', 'true'):
+            queryset = queryset.filter(is_read=False)
+        return queryset
+
+
+class ReviewAlertDetailView(generics.UpdateAPIView):
+    """Mark an alert read or unread"""
+    serializer_class = ReviewAlertSerializer
+    permission_classes = [IsRestaurantOwner]
+    http_method_names = ['patch', 'options']
+
+    def get_queryset(self):
+        return ReviewAlert.objects.filter(owner=self.request.user).select_related('review__user')
+
+
+class DigestSubscriptionView(generics.RetrieveUpdateAPIView):
+    """The signed-in owner's review digest preference; unsubscribed until first saved"""
+    serializer_class = DigestSubscriptionSerializer
+    permission_classes = [IsRestaurantOwner]
+
+    def get_object(self):
+        user = self.request.user
+        subscription = DigestSubscription.objects.filter(owner=user).first()
+        return subscription or DigestSubscription(owner=user, is_active=False)
+
+
+class ModerationQueueView(APIView):
+    """Counts of open, under review and overdue flags"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(flagqueue.stats())
+
+
+class ModerationClaimView(APIView):
+    """Claim the oldest flags; they stay yours while the lease lasts"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        serializer = FlagClaimSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token, flags = flagqueue.claim(request.user, serializer.validated_data['batch_size'])
+        return Response({
+            'token': token,
+            'lease_expires_at': flags[0].lease_expires_at if flags else None,
+            'flags': ReviewFlagSerializer(flags, many=True).data,
+        })
+
+
+class ModerationUpdateView(APIView):
+    """Forward, resolve, release or extend claimed flags, in bulk"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        serializer = FlagUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token, ids, action = (serializer.validated_data[field] for field in ('token', 'flags', 'action'))
+        if action in ('forward', 'resolve'):
+            status_ = 'FORWARDED' if action == 'forward' else 'RESOLVED'
+            lost = flagqueue.complete(token, ids, status_, serializer.validated_data['note'])
+        elif action == 'release':
+            lost = flagqueue.release(token, ids)
+        else:
+            lost = flagqueue.extend(token, ids)
+        return Response({'lost': lost})
@@ -3,7 +3,7 @@ from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
 from django.utils.html import format_html
-from .models import User
+from .models import User, RevokedToken, TokenCutoff
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -61,3 +61,18 @@ class CustomUserAdmin(UserAdmin):
             obj.groups.add(admin_group)
         else:
             super().save_model(request, obj, form, change)
+
+
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ('jti', 'user', 'token_type', 'expires_at', 'created_at')
+    list_filter = ('token_type',)
+    search_fields = ('jti', 'user__username')
+    raw_id_fields = ('user',)
+
+
+@admin.register(TokenCutoff)
+class TokenCutoffAdmin(admin.ModelAdmin):
+    list_display = ('user', 'not_before', 'updated_at')
+    search_fields = ('user__username',)
+    raw_id_fields = ('user',)
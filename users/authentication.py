@@ -0,0 +1,51 @@
+from django.utils.translation import gettext_lazy as _
+from ninja.security import HttpBearer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import get_cached_user
+from .revocation import registry
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication that resolves the user from `users.cache` instead of the database"""
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if registry.is_revoked(validated_token):
+            raise InvalidToken(_("Token has been revoked"), code="token_revoked")
+        return validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id, api_settings.USER_ID_FIELD)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+class NinjaJWTAuth(HttpBearer):
+    """The same access tokens on django-ninja operations: `auth=NinjaJWTAuth()`; request.auth is the user"""
+
+    def authenticate(self, request, token):
+        authentication = CachedJWTAuthentication()
+        try:
+            user = authentication.get_user(authentication.get_validated_token(token.encode()))
+        except (InvalidToken, AuthenticationFailed, TokenError):
+            return None
+        request.user = user
+        return user
@@ -0,0 +1,74 @@
+"""
+Cached user lookups for token authentication.
+
+Every authenticated request used to load its user row. Users are now cached
+under their id together with a per-user version, and any write to the user
+(profile edits, password changes, deactivation, group changes) bumps that
+version, so a stale entry is never served again. As with the menu cache,
+bumps run on transaction commit and the version is read before the row is
+loaded: an entry written from pre-commit data carries an old version.
+
+Bumps reach other workers only through a shared cache (REDIS_URL). With the
+default per-process cache, another worker's entry stays until it expires,
+which is why AUTH_USER_CACHE_TIMEOUT is then only a few seconds.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _version_key(user_id):
+    return f'users:version:{user_id}'
+
+
+def _entry_key(user_id):
+    return f'users:auth:{user_id}'
+
+
+def _initial_version():
+    # Seeded from the clock so an evicted counter never restarts at a value
+    # that older cached entries were written under.
+    return int(time.time() * 1000)
+
+
+def get_cached_user(user_id, field='id'):
+    """Return the user whose `field` equals user_id, or None if there is none
+
+    Each call returns its own copy, so per-request attributes set on the user
+    never leak into other requests.
+    """
+    version_key, entry_key = _version_key(user_id), _entry_key(user_id)
+    values = cache.get_many([version_key, entry_key])
+    version = values.get(version_key)
+    if version is None:
+        cache.add(version_key, _initial_version(), timeout=None)
+        version = cache.get(version_key)
+
+    entry = values.get(entry_key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    user = get_user_model()._default_manager.filter(**{field: user_id}).first()
+    if user is not None:
+        cache.set(entry_key, (version, user), getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 300))
+    return user
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=None)
+
+
+def bump_user_version(*user_ids):
+    """Invalidate the cached copies of the given users."""
+    keys = [_version_key(user_id) for user_id in set(user_ids)]
+
+    def bump():
+        for key in keys:
+            _bump(key)
+    transaction.on_commit(bump)
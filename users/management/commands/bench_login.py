@@ -0,0 +1,77 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.management.base import BaseCommand
+
+from users.models import User
+from users.serializers import LoginSerializer
+
+USERNAME_PREFIX = 'bench-login-'
+PASSWORD = 'bench-password-1'
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure login throughput and latency through LoginSerializer with the "
+        "current PASSWORD_HASHERS, for successful, wrong-password and "
+        "unknown-account attempts. Use it to pick hasher cost against the p99 target."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=500, help='Login attempts per case')
+        parser.add_argument('--threads', type=int, default=4,
+                            help='Concurrent logins; roughly one per CPU a worker process gets')
+
+    def handle(self, *args, **options):
+        # One hash shared by every bench user keeps setup fast
+        encoded = make_password(PASSWORD)
+        summary = get_hasher().safe_summary(encoded)
+        self.stdout.write('Hasher: ' + ', '.join(f'{key}={value}' for key, value in summary.items()
+                                                 if key not in ('salt', 'hash')))
+
+        count = options['users']
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        User.objects.bulk_create([
+            User(username=f'{USERNAME_PREFIX}{index}', email=f'{USERNAME_PREFIX}{index}@example.com',
+                 password=encoded, user_type='CUSTOMER')
+            for index in range(count)
+        ])
+
+        cases = [
+            ('success (email)', lambda i: (f'{USERNAME_PREFIX}{i % count}@EXAMPLE.com', PASSWORD)),
+            ('success (username)', lambda i: (f'{USERNAME_PREFIX}{i % count}', PASSWORD)),
+            ('wrong password', lambda i: (f'{USERNAME_PREFIX}{i % count}', 'wrong-password')),
+            ('unknown account', lambda i: (f'nobody-{i}@example.com', PASSWORD)),
+        ]
+        try:
+            self.stdout.write(f"{'case':<20} {'logins/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'ok':>6}")
+            for label, credentials in cases:
+                stats = run_logins(credentials, options['requests'], options['threads'])
+                self.stdout.write(
+                    f"{label:<20} {stats['rps']:>9.1f} {stats['p50']:>8.1f} {stats['p99']:>8.1f} {stats['ok']:>6}"
+                )
+        finally:
+            User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+
+def run_logins(credentials, total, threads):
+    def login(index):
+        identifier, password = credentials(index)
+        started = time.perf_counter()
+        ok = LoginSerializer(data={'email_or_username': identifier, 'password': password}).is_valid()
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(login, range(total)))
+    duration = time.perf_counter() - started
+
+    latencies = sorted(elapsed for elapsed, _ in results)
+    return {
+        'rps': total / duration,
+        'p50': latencies[len(latencies) // 2] * 1000,
+        'p99': latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000,
+        'ok': sum(ok for _, ok in results),
+    }
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users.revocation import prune_expired
+
+
+class Command(BaseCommand):
+    help = "Delete token revocations for tokens that have expired anyway. Run it daily from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        removed = prune_expired(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} expired revocations"))
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.5 on 2026-10-19 08:32
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Upper
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """Refuse to migrate while accounts share an email up to case, listing them to merge by hand"""
+    User = apps.get_model('users', 'User')
+    duplicates = (
+        User.objects.exclude(email='').annotate(email_upper=Upper('email'))
+        .values('email_upper').annotate(count=Count('pk')).filter(count__gt=1)
+        .values_list('email_upper', flat=True)
+    )
+    users = (
+        User.objects.annotate(email_upper=Upper('email')).filter(email_upper__in=list(duplicates))
+        .order_by('email_upper', 'pk')
+    )
+    if users:
+        listing = '\n'.join(f'  id={user.pk} username={user.username!r} email={user.email!r}' for user in users)
+        raise RuntimeError(
+            'These accounts have emails differing only in case, which logins can no longer tell apart. '
+            'Change or merge them, then migrate again:\n' + listing
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0005_revoked_tokens'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Upper('email'), condition=models.Q(('email', ''), _negated=True), name='user_email_upper_uniq'),
+        ),
+    ]
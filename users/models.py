@@ -1,6 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-import os
+from django.db.models.functions import Upper
 
 # Create your models here.
 
@@ -46,6 +46,19 @@ class User(AbstractUser):
     )
     
     
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Login matches emails with email__iexact, i.e. UPPER(email) = UPPER(%s)
+            models.Index(Upper('email'), name='user_email_upper_idx'),
+        ]
+        constraints = [
+            # Registration rejects emails differing only in case, so login
+            # matches at most one account; blank emails (createsuperuser) aside
+            models.UniqueConstraint(
+                Upper('email'), condition=~models.Q(email=''), name='user_email_upper_uniq'
+            ),
+        ]
+
     def is_restaurant_owner(self):
         return self.user_type == 'OWNER'
         
@@ -55,22 +68,27 @@ class User(AbstractUser):
     def is_customer(self):
         return self.user_type == 'CUSTOMER'
 
-    def save(self, *args, **kwargs):
-        # If this is an update and there's a new profile picture
-        if self.pk:
-            try:
-                old_instance = User.objects.get(pk=self.pk)
-                if old_instance.profile_picture and self.profile_picture != old_instance.profile_picture:
-                    # Delete the old profile picture
-                    if os.path.isfile(old_instance.profile_picture.path):
-                        os.remove(old_instance.profile_picture.path)
-            except User.DoesNotExist:
-                pass
-        super().save(*args, **kwargs)
+    # Replaced or deleted profile pictures are released by mediafiles.signals
+    # and removed from disk by the sweep_media command
+
+
+class RevokedToken(models.Model):
+    """A single revoked JWT, kept until it would have expired anyway"""
+    jti = models.CharField(max_length=255, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='revoked_tokens')
+    token_type = models.CharField(max_length=16)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.token_type} {self.jti}"
+
+
+class TokenCutoff(models.Model):
+    """Tokens of this user issued before `not_before` are revoked (logout everywhere, deactivation)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='token_cutoff')
+    not_before = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
-    def delete(self, *args, **kwargs):
-        # Delete the profile picture file when the user is deleted
-        if self.profile_picture:
-            if os.path.isfile(self.profile_picture.path):
-                os.remove(self.profile_picture.path)
-        super().delete(*args, **kwargs)
+    def __str__(self):
+        return f"{self.user_id} before {self.not_before}"
@@ -0,0 +1,208 @@
+"""
+Token revocation without a per-request query.
+
+Revocations are stored in the database (`RevokedToken` for single tokens,
+`TokenCutoff` for "every token issued before", used by logout-everywhere,
+password changes and deactivation) and mirrored in each process:
+
+* revoked jtis go into a Bloom filter, about 1.8 bytes per token at a 0.1%
+  false positive rate. A miss proves the token is not revoked; a hit is
+  confirmed against the database, and the answer cached under the jti
+  (until the token expires if revoked, for a poll interval if not).
+* cutoffs are a dict of user id -> not-before timestamp.
+
+Processes learn about revocations made elsewhere by polling the database at
+most every REVOCATION_POLL_INTERVAL seconds: one small aggregate over each
+table (row counts, the last token id, the last cutoff change) tells whether
+anything was written, and only then are the rows written since the last
+sync loaded. The cache can't carry this signal, since by default it isn't
+shared between processes. A check is therefore a few hash probes and a dict
+lookup, plus that poll once per interval.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import RevokedToken, TokenCutoff
+
+# Rows committed slightly out of order are still picked up by the next sync
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def _exact_key(jti):
+    return f'users:revoked:{jti}'
+
+
+def _poll_interval():
+    return getattr(settings, 'REVOCATION_POLL_INTERVAL', 1)
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(capacity, 1)
+        self.size = math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        """Add an item; `count` only grows for items not already (seemingly) present"""
+        new = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.bloom = None
+        self.not_before = {}
+        self.version = None
+        self.synced_at = None
+        self.checked_at = 0.0
+
+    def sync(self, force=False):
+        """Pick up revocations made by other processes since the last sync"""
+        now = time.monotonic()
+        if not force and now - self.checked_at < _poll_interval():
+            return
+        self.checked_at = now
+        version = _db_version()
+        if version == self.version and not force:
+            return
+
+        with self._lock:
+            started = timezone.now()
+            tokens = RevokedToken.objects.filter(expires_at__gt=started)
+            cutoffs = TokenCutoff.objects.all()
+            if self.bloom is None or self.bloom.count >= self.bloom.capacity:
+                # (Re)build, sized for growth; expired tokens drop out here.
+                # is_revoked reads without the lock, so the new filter and
+                # cutoffs are built aside and swapped in together.
+                bloom = BloomFilter(max(2 * tokens.count(), 1024))
+                not_before = {}
+            else:
+                # Only ever added to, so updated in place. The overlap
+                # re-reads tokens already added, which add() doesn't count.
+                bloom, not_before = self.bloom, self.not_before
+                since = self.synced_at - SYNC_OVERLAP
+                tokens = tokens.filter(created_at__gte=since)
+                cutoffs = cutoffs.filter(updated_at__gte=since)
+            for jti in tokens.values_list('jti', flat=True).iterator():
+                bloom.add(jti)
+            for user_id, cutoff in cutoffs.values_list('user_id', 'not_before'):
+                not_before[user_id] = cutoff.timestamp()
+            self.bloom, self.not_before = bloom, not_before
+            self.synced_at = started
+            self.version = version
+
+    def is_revoked(self, token):
+        """Whether a validated simplejwt token has been revoked"""
+        self.sync()
+        cutoff = self.not_before.get(token.get(api_settings.USER_ID_CLAIM))
+        if cutoff is not None and token.get('iat', 0) < int(cutoff):
+            return True
+        jti = token.get(api_settings.JTI_CLAIM)
+        bloom = self.bloom
+        if jti is None or (bloom is not None and jti not in bloom):
+            return False
+
+        # Confirm a hit (or check directly if no sync has succeeded yet)
+        revoked = cache.get(_exact_key(jti))
+        if revoked is None:
+            revoked = RevokedToken.objects.filter(jti=jti).exists()
+            # Not revoked now may be revoked by the next poll
+            cache.set(_exact_key(jti), revoked, _seconds_left(token) if revoked else _poll_interval())
+        return revoked
+
+    def record(self, jtis, cutoffs):
+        """Apply this process's own revocations immediately; others see them on their next poll"""
+        with self._lock:
+            if self.bloom is not None:
+                for jti in jtis:
+                    self.bloom.add(jti)
+            self.not_before.update(cutoffs)
+
+
+def _db_version():
+    """Changes whenever a revocation is committed, or pruned"""
+    tokens = RevokedToken.objects.aggregate(count=Count('id'), last=Max('id'))
+    cutoffs = TokenCutoff.objects.aggregate(count=Count('pk'), last=Max('updated_at'))
+    return tokens['count'], tokens['last'], cutoffs['count'], cutoffs['last']
+
+
+def _seconds_left(token):
+    return max(int(token.get('exp', 0) - time.time()), 1)
+
+
+def revoke_tokens(*tokens):
+    """Revoke validated simplejwt tokens (access or refresh)"""
+    rows = [
+        RevokedToken(
+            jti=token[api_settings.JTI_CLAIM],
+            user_id=token[api_settings.USER_ID_CLAIM],
+            token_type=token.get(api_settings.TOKEN_TYPE_CLAIM, ''),
+            expires_at=datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc),
+        )
+        for token in tokens
+    ]
+    RevokedToken.objects.bulk_create(rows, ignore_conflicts=True)
+
+    def publish():
+        cache.set_many({_exact_key(token[api_settings.JTI_CLAIM]): True for token in tokens},
+                       max(_seconds_left(token) for token in tokens))
+        registry.record([row.jti for row in rows], {})
+    transaction.on_commit(publish)
+
+
+def revoke_user_tokens(user_id):
+    """Revoke every token issued to the user until now"""
+    # Whole seconds, like the tokens' iat; tokens issued later in the
+    # current second stay valid so an immediate re-login works
+    not_before = timezone.now().replace(microsecond=0)
+    TokenCutoff.objects.update_or_create(user_id=user_id, defaults={'not_before': not_before})
+    transaction.on_commit(lambda: registry.record([], {user_id: not_before.timestamp()}))
+
+
+def prune_expired(batch_size=1000):
+    """Delete revocations that no longer matter; returns the number of rows removed"""
+    now = timezone.now()
+    removed = 0
+    while True:
+        ids = list(RevokedToken.objects.filter(expires_at__lte=now).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        removed += RevokedToken.objects.filter(id__in=ids).delete()[0]
+    # Every token issued before these cutoffs has expired by now
+    oldest_live = now - api_settings.REFRESH_TOKEN_LIFETIME
+    removed += TokenCutoff.objects.filter(not_before__lt=oldest_live).delete()[0]
+    return removed
+
+
+registry = RevocationRegistry()
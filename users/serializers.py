@@ -1,7 +1,11 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.password_validation import validate_password
-from django.contrib.auth import authenticate
 from .models import User
+from .revocation import registry, revoke_tokens
 
 class UserSerializer(serializers.ModelSerializer):
     gender_display = serializers.CharField(source='get_gender_display', read_only=True)
@@ -45,36 +49,31 @@ class LoginSerializer(serializers.Serializer):
                 'error': 'Both email/username and password are required.'
             })
 
-        # Check if input is an email
+        # One indexed lookup (emails match case-insensitively, see
+        # user_email_upper_idx); the password is checked directly rather than
+        # through authenticate(), which would load the user a second time
         if '@' in email_or_username:
-            try:
-                user = User.objects.get(email=email_or_username)
-                username = user.username
-            except User.DoesNotExist:
-                raise serializers.ValidationError({
-                    'error': f'No account found with email: {email_or_username}'
-                })
+            lookup = {'email__iexact': email_or_username}
         else:
-            username = email_or_username
-            try:
-                user = User.objects.get(username=username)
-            except User.DoesNotExist:
-                raise serializers.ValidationError({
-                    'error': f'No account found with username: {username}'
-                })
-
-        # Try to authenticate
-        user = authenticate(
-            request=self.context.get('request'),
-            username=username,
-            password=password
-        )
+            lookup = {'username': email_or_username}
+        try:
+            user = User.objects.get(**lookup)
+        except User.DoesNotExist:
+            user = None
+
+        if user is None:
+            # Hash anyway so unknown accounts take as long as wrong passwords
+            User().set_password(password)
+            valid = False
+        else:
+            # Rehashes and saves the password when the hasher settings changed
+            valid = user.check_password(password)
 
-        if not user:
+        if not valid:
             raise serializers.ValidationError({
                 'error': 'Invalid credentials. Please check your email/username and password.'
             })
-        
+
         if not user.is_active:
             raise serializers.ValidationError({
                 'error': 'This account is inactive or has been disabled.'
@@ -111,8 +110,8 @@ class RegisterSerializer(serializers.ModelSerializer):
         if attrs['user_type'] not in [choice[0] for choice in User.USER_TYPE_CHOICES]:
             raise serializers.ValidationError({"user_type": "Invalid user type selected."})
         
-        # Validate email is unique
-        if User.objects.filter(email=attrs['email']).exists():
+        # Validate email is unique, in the case-insensitive sense login matches it in
+        if User.objects.filter(email__iexact=attrs['email']).exists():
             raise serializers.ValidationError({"email": "User with this email already exists."})
         
         return attrs
@@ -160,4 +159,32 @@ class UserUpdateSerializer(serializers.ModelSerializer):
                 # If explicitly set to None, remove the profile picture
                 instance.profile_picture = None
         
-        return super().update(instance, validated_data) 
\ No newline at end of file
+        return super().update(instance, validated_data) 
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refuses revoked refresh tokens, and revokes the old one when refresh tokens rotate"""
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        if registry.is_revoked(refresh):
+            raise InvalidToken('Token has been revoked', code='token_revoked')
+        data = super().validate(attrs)
+        if api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION:
+            revoke_tokens(refresh)
+        return data
+
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField(required=False)
+    everywhere = serializers.BooleanField(default=False)
+
+    def validate_refresh(self, value):
+        try:
+            refresh = RefreshToken(value)
+        except TokenError:
+            raise serializers.ValidationError('Invalid refresh token.')
+        if refresh.get(api_settings.USER_ID_CLAIM) != getattr(self.context['request'].user, api_settings.USER_ID_FIELD):
+            raise serializers.ValidationError('This refresh token belongs to another user.')
+        return refresh
+
@@ -1,7 +1,12 @@
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_migrate, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.apps import apps
 from django.contrib.auth.models import Permission, Group
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import bump_user_version
+from .revocation import revoke_user_tokens
+from .models import User
 
 @receiver(post_migrate)
 def create_initial_user_groups(sender, **kwargs):
@@ -21,4 +26,43 @@ def create_initial_user_groups(sender, **kwargs):
             admin_permissions = Permission.objects.filter(
                 content_type__app_label__in=['users', 'restaurants', 'reviews', 'menus']
             )
-            admin_group.permissions.set(admin_permissions) 
\ No newline at end of file
+            admin_group.permissions.set(admin_permissions)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Drop the cached copy used by token authentication on any user write,
+    including password changes and deactivation
+    """
+    bump_user_version(getattr(instance, api_settings.USER_ID_FIELD))
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_credential_change(sender, instance, created, **kwargs):
+    """
+    Revoke the user's existing tokens when the password changes or the
+    account is deactivated
+    """
+    # set_password() leaves the raw password in _password until save() returns
+    if created or (instance.is_active and instance._password is None):
+        return
+    revoke_user_tokens(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_cached_user_permissions(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            bump_user_version(getattr(instance, api_settings.USER_ID_FIELD))
+        return
+    # Changed from the group/permission side: bump every affected user
+    if action in ('post_add', 'post_remove'):
+        users = User.objects.filter(pk__in=pk_set)
+    elif action == 'pre_clear':
+        users = instance.custom_user_set.all()
+    else:
+        return
+    bump_user_version(*users.values_list(api_settings.USER_ID_FIELD, flat=True))
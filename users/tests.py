@@ -1,8 +1,21 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
 from rest_framework.test import APIClient
 from rest_framework import status
+from django.core.cache import cache
 from django.urls import reverse
-from .models import User
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from RestaurantReviews.throttling import LoginIPThrottle, NinjaThrottle, RegisterIPThrottle
+from .models import User, TokenCutoff
+from . import revocation
+from .revocation import registry, revoke_tokens, revoke_user_tokens
+from .serializers import LoginSerializer, RegisterSerializer
 
 class AuthenticationTests(TestCase):
     def setUp(self):
@@ -43,3 +56,306 @@ class AuthenticationTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('access', response.data)
         self.assertIn('refresh', response.data)
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.profile_url = reverse('user-profile')
+        self.user = User.objects.create_user(
+            username='cached', email='cached@example.com', password='testpass123', user_type='CUSTOMER'
+        )
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_repeat_requests_skip_the_database(self):
+        self.assertEqual(self.client.get(self.profile_url).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.profile_url)
+        self.assertEqual(response.data['user']['username'], 'cached')
+
+    def test_user_writes_invalidate_the_cache(self):
+        self.client.get(self.profile_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Renamed'
+            self.user.save()
+        self.assertEqual(self.client.get(self.profile_url).data['user']['first_name'], 'Renamed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get(self.profile_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='login', email='Login@Example.com', password='testpass123', user_type='CUSTOMER'
+        )
+
+    def validate(self, email_or_username, password='testpass123'):
+        serializer = LoginSerializer(data={'email_or_username': email_or_username, 'password': password})
+        return serializer.is_valid(), serializer
+
+    def test_email_login_is_one_case_insensitive_query(self):
+        with self.assertNumQueries(1):
+            valid, serializer = self.validate('login@example.COM')
+        self.assertTrue(valid)
+        self.assertEqual(serializer.validated_data['user'], self.user)
+
+    def test_unknown_account_and_wrong_password_fail_alike(self):
+        unknown_valid, unknown = self.validate('nobody@example.com')
+        wrong_valid, wrong = self.validate('login', 'wrong-password')
+        self.assertFalse(unknown_valid)
+        self.assertFalse(wrong_valid)
+        self.assertEqual(unknown.errors, wrong.errors)
+
+    def test_password_is_rehashed_when_hashers_change(self):
+        with override_settings(PASSWORD_HASHERS=[
+            'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+            'django.contrib.auth.hashers.MD5PasswordHasher',
+        ]):
+            valid, _ = self.validate('login')
+        self.assertTrue(valid)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha1$'))
+
+    def test_email_differing_only_in_case_cannot_register(self):
+        serializer = RegisterSerializer(data={
+            'username': 'other', 'email': 'LOGIN@example.com', 'password': 'Str0ng-pass-123',
+            'confirm_password': 'Str0ng-pass-123', 'user_type': 'CUSTOMER',
+        })
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('email', serializer.errors)
+
+
+@override_settings(
+    RATE_LIMITS={'login_ip': '100/min', 'login_account': '2/min', 'upload_ip': '1/min'},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.login_url = reverse('token_obtain_pair')
+
+    def login(self, ip):
+        return self.client.post(
+            self.login_url, {'email_or_username': 'victim', 'password': 'guess'}, REMOTE_ADDR=ip
+        )
+
+    def test_account_bucket_applies_across_ips(self):
+        self.assertEqual(self.login('10.0.0.1').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.login('10.0.0.2').status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.login('10.0.0.3')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_bucket_refills_over_time(self):
+        now = time.time()
+        with mock.patch('RestaurantReviews.throttling.time.time', return_value=now):
+            self.login('10.0.0.1')
+            self.login('10.0.0.1')
+            self.assertEqual(self.login('10.0.0.1').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        with mock.patch('RestaurantReviews.throttling.time.time', return_value=now + 30):
+            self.assertEqual(self.login('10.0.0.1').status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(self.login('10.0.0.1').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_ninja_upload_is_limited(self):
+        url = '/api/menus/menu-items/0/images/'
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '60')
+
+    @override_settings(RATE_LIMITS={'login_ip': '1/min'})
+    def test_forwarded_for_header_does_not_pick_the_bucket(self):
+        response = self.client.post(
+            self.login_url, {'email_or_username': 'a', 'password': 'b'},
+            REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='1.1.1.1',
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(
+            self.login_url, {'email_or_username': 'a', 'password': 'b'},
+            REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='2.2.2.2',
+        )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(RATE_LIMITS={'login_ip': '1/min', 'register_ip': '2/min'})
+    def test_ninja_throttle_stops_at_the_first_denial(self):
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1')
+        throttle = NinjaThrottle(LoginIPThrottle, RegisterIPThrottle)
+        self.assertTrue(throttle.allow_request(request))
+        self.assertFalse(throttle.allow_request(request))
+        self.assertEqual(throttle.wait(), 60)
+        # The denied request took no token from the register bucket
+        self.assertTrue(RegisterIPThrottle().allow_request(RequestFactory().post('/', REMOTE_ADDR='10.0.0.1')))
+
+    @override_settings(RATE_LIMITS={'login_ip': '1/min', 'login_account': '2/min'})
+    def test_drf_throttles_stop_at_the_first_denial(self):
+        self.assertEqual(self.login('10.0.0.1').status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.login('10.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '60')
+        # The IP denial took no token from the account bucket
+        self.assertEqual(self.login('10.0.0.2').status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RATE_LIMITS={'upload_account': '1/min'})
+    def test_ninja_upload_account_bucket_applies_to_token_clients(self):
+        user = User.objects.create_user(
+            username='uploader', email='uploader@example.com', password='testpass123', user_type='CUSTOMER'
+        )
+        access = RefreshToken.for_user(user).access_token
+        url = '/api/menus/menu-items/0/images/'
+        response = self.client.post(url, REMOTE_ADDR='10.0.0.1', HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(url, REMOTE_ADDR='10.0.0.2', HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # Anonymous clients and bad tokens only have the IP bucket
+        self.assertEqual(self.client.post(url, REMOTE_ADDR='10.0.0.3').status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(url, REMOTE_ADDR='10.0.0.3', HTTP_AUTHORIZATION='Bearer nonsense')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry._reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='revoker', email='revoker@example.com', password='testpass123', user_type='CUSTOMER'
+        )
+        # Issued a while ago, so revocations made "now" are strictly later
+        issued_at = timezone.now() - timedelta(seconds=10)
+        self.refresh = RefreshToken.for_user(self.user)
+        self.refresh.set_iat(at_time=issued_at)
+        self.access = self.refresh.access_token
+        self.access.set_iat(at_time=issued_at)
+
+    def get_profile(self, access):
+        return self.client.get(reverse('user-profile'), HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def refresh_access(self, refresh):
+        return self.client.post(reverse('token_refresh'), {'refresh': str(refresh)})
+
+    def logout(self, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('logout'), data, HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        other = RefreshToken.for_user(self.user)
+        self.assertEqual(self.logout(refresh=str(self.refresh)).status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertEqual(self.get_profile(self.access).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.refresh_access(self.refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+        # Other sessions are untouched, and checking them needs no query
+        self.assertEqual(self.get_profile(other.access_token).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_profile(other.access_token).status_code, status.HTTP_200_OK)
+
+    def test_logout_everywhere_revokes_earlier_tokens(self):
+        self.logout(everywhere=True)
+        self.assertEqual(self.refresh_access(self.refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+        # Logging in again works straight away
+        self.assertEqual(self.refresh_access(RefreshToken.for_user(self.user)).status_code, status.HTTP_200_OK)
+
+    def test_password_change_and_deactivation_revoke_tokens(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('changed-pass-456')
+            self.user.save()
+        self.assertEqual(self.refresh_access(self.refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # A login rehashing an outdated hash is not a password change
+        fresh = RefreshToken.for_user(self.user)
+        with override_settings(PASSWORD_HASHERS=[
+            'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher',
+        ]):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertTrue(self.user.check_password('changed-pass-456'))
+        self.assertEqual(self.refresh_access(fresh).status_code, status.HTTP_200_OK)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.refresh_access(fresh).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertTrue(TokenCutoff.objects.filter(user=self.user).exists())
+
+    def test_revocations_from_other_processes_are_picked_up(self):
+        self.get_profile(self.access)
+        # As if another worker, with a cache of its own, revoked them: only the database changes
+        revoke_tokens(self.access)
+        TokenCutoff.objects.create(user=self.user, not_before=timezone.now())
+        registry.checked_at = 0
+        self.assertEqual(self.get_profile(self.access).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.refresh_access(self.refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tokens_are_checked_in_the_database_before_the_first_sync(self):
+        revoke_tokens(self.access)
+        with mock.patch.object(registry, 'sync'):
+            self.assertTrue(registry.is_revoked(self.access))
+            self.assertFalse(registry.is_revoked(RefreshToken.for_user(self.user).access_token))
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = revocation.BloomFilter(1000)
+        jtis = [f'jti-{index}' for index in range(1000)]
+        for jti in jtis:
+            bloom.add(jti)
+        self.assertTrue(all(jti in bloom for jti in jtis))
+        false_positives = sum(f'other-{index}' in bloom for index in range(10000))
+        self.assertLess(false_positives, 50)
+
+    def test_syncs_do_not_count_tokens_twice(self):
+        revoke_tokens(self.access)
+        registry.sync(force=True)
+        count = registry.bloom.count
+        # The next sync re-reads the overlap window
+        registry.sync(force=True)
+        self.assertEqual(registry.bloom.count, count)
+
+    def test_tokens_stay_revoked_while_the_filter_is_rebuilt(self):
+        revoke_tokens(self.access)
+        with self.captureOnCommitCallbacks(execute=True):
+            revoke_user_tokens(self.user.pk)
+        registry.sync(force=True)
+        registry.bloom.count = registry.bloom.capacity
+        seen = []
+        add = revocation.BloomFilter.add
+
+        def add_and_check(bloom, item):
+            if not seen:
+                # Another thread checking tokens halfway through the rebuild
+                seen.append((registry.is_revoked(self.access), registry.is_revoked(self.refresh)))
+            add(bloom, item)
+
+        with mock.patch.object(revocation.BloomFilter, 'add', add_and_check):
+            registry.sync(force=True)
+        self.assertEqual(seen, [(True, True)])
+
+
+class EmailUniquenessMigrationTests(TransactionTestCase):
+    before = [('users', '0005_revoked_tokens')]
+    after = [('users', '0006_user_email_upper_uniq')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_case_only_duplicate_emails_are_reported(self):
+        User = self.migrate(self.before).get_model('users', 'User')
+        User.objects.create(username='first', email='Diner@example.com')
+        User.objects.create(username='second', email='diner@EXAMPLE.com')
+        User.objects.create(username='other', email='other@example.com')
+        with self.assertRaisesMessage(RuntimeError, "username='second' email='diner@EXAMPLE.com'"):
+            self.migrate(self.after)
+
+        User.objects.filter(username='second').update(email='diner2@example.com')
+        self.migrate(self.after)
+
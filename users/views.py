@@ -5,12 +5,16 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
-from .serializers import UserSerializer, RegisterSerializer, LoginSerializer, UserUpdateSerializer
+from .serializers import UserSerializer, RegisterSerializer, LoginSerializer, UserUpdateSerializer, LogoutSerializer
+from .revocation import revoke_tokens, revoke_user_tokens
 from django.core.exceptions import ValidationError
 from django.db import Error as DBError
 import logging
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
+from RestaurantReviews.throttling import (
+    UPLOAD_THROTTLES, LoginAccountThrottle, LoginIPThrottle, RegisterIPThrottle,
+)
 
 User = get_user_model()
 
@@ -20,6 +24,7 @@ logger = logging.getLogger(__name__)
 
 class RegisterView(APIView):
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = (RegisterIPThrottle,)
 
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
@@ -32,6 +37,8 @@ class RegisterView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class CustomTokenObtainPairView(TokenObtainPairView):
+    throttle_classes = (LoginIPThrottle, LoginAccountThrottle)
+
     def post(self, request, *args, **kwargs):
         try:
             serializer = LoginSerializer(data=request.data, context={'request': request})
@@ -60,9 +67,30 @@ class CustomTokenObtainPairView(TokenObtainPairView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+class LogoutView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """Revoke the current access token and the given refresh token, or every token with `everywhere`"""
+        serializer = LogoutSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        if serializer.validated_data['everywhere']:
+            revoke_user_tokens(request.user.pk)
+        tokens = [request.auth]
+        if 'refresh' in serializer.validated_data:
+            tokens.append(serializer.validated_data['refresh'])
+        revoke_tokens(*tokens)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = (MultiPartParser, FormParser)
+
+    def get_throttles(self):
+        # Profile updates may carry a picture upload
+        if self.request.method == 'PATCH':
+            return [throttle() for throttle in UPLOAD_THROTTLES]
+        return super().get_throttles()
     
     def get(self, request):
         """Get user profile information"""